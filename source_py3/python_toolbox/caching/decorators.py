@@ -11,7 +11,6 @@ See its documentation for more details.
 import datetime as datetime_module
 
 from python_toolbox import misc_tools
-from python_toolbox import binary_search
 from python_toolbox import decorator_tools
 from python_toolbox.sleek_reffing import SleekCallArgs
 
@@ -93,38 +92,21 @@ def cache(max_size=infinity, time_to_keep=None):
         if max_size == infinity:
             
             if time_to_keep:
-
-                sorting_key_function = lambda sleek_call_args: \
-                                              cached._cache[sleek_call_args][1]
-
                 
-                def remove_expired_entries():
-                    almost_cutting_point = \
-                                          binary_search.binary_search_by_index(
-                        list(cached._cache.keys()),
-                        _get_now(), 
-                        sorting_key_function,
-                        rounding=binary_search.LOW
-                    )
-                    if almost_cutting_point is not None:
-                        cutting_point = almost_cutting_point + 1
-                        for key in list(cached._cache.keys())[:cutting_point]:
-                            del cached._cache[key]
-                            
-                @misc_tools.set_attributes(_cache=OrderedDict())        
+                from python_toolbox.nifty_collections import TimestampedDict
+                
+                @misc_tools.set_attributes(_cache=TimestampedDict(
+                    timestamp_function=lambda: _get_now() + time_to_keep
+                ))
                 def cached(function, *args, **kwargs):
-                    remove_expired_entries()
+                    cached._cache.pop_until(_get_now())
                     sleek_call_args = \
                         SleekCallArgs(cached._cache, function, *args, **kwargs)
                     try:
-                        return cached._cache[sleek_call_args][0]
+                        return cached._cache[sleek_call_args]
                     except KeyError:
-                        value = function(*args, **kwargs)
-                        cached._cache[sleek_call_args] = (
-                            value,
-                            _get_now() + time_to_keep
-                        )
-                        cached._cache.sort(key=sorting_key_function)
+                        cached._cache[sleek_call_args] = value = \
+                              function(*args, **kwargs)
                         return value
                 
             else: # not time_to_keep
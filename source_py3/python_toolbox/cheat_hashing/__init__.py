@@ -8,4 +8,4 @@ See its documentation for more details.
 '''
 
 from . import cheat_hash_functions
-from .cheat_hash import cheat_hash
\ No newline at end of file
+from .cheat_hash import cheat_hash, register
\ No newline at end of file
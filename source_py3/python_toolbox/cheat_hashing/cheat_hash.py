@@ -7,19 +7,164 @@ Defines the `cheat_hash` function for cheat-hashing mutable objects.
 See its documentation for more details.
 '''
 
+import array
+
 from .cheat_hash_functions import (cheat_hash_dict, cheat_hash_object, 
-                                   cheat_hash_sequence, cheat_hash_set)
+                                   cheat_hash_sequence, cheat_hash_set,
+                                   cheat_hash_buffer)
 
-infinity = float('inf')
 
 dispatch_map = {
     object: cheat_hash_object,
     tuple: cheat_hash_sequence,
     list: cheat_hash_sequence,
     dict: cheat_hash_dict,
-    set: cheat_hash_set
+    set: cheat_hash_set,
+    bytearray: cheat_hash_buffer,
+    array.array: cheat_hash_buffer,
+}
+'''
+`dict` mapping from a type to a function that cheat-hashes it.
+
+Don't change it directly; use `register`.
+'''
+
+lazy_dispatch_map = {
+    'numpy.ndarray': cheat_hash_buffer,
 }
-'''`dict` mapping from a type to a function that cheat-hashes it.'''
+'''
+`dict` mapping from a type's dotted name to a function that cheat-hashes it.
+
+This is for registering types without importing their modules. Don't change
+it directly; use `register`.
+'''
+
+_dispatch_cache = {}
+'''`dict` mapping from a type to the function that cheat-hashes it.'''
+
+_hashable_types = {int, float, complex, bool, str, bytes, frozenset,
+                   type(None)}
+'''Types that are hashed with `hash`, skipping the dispatch.'''
+
+_container_functions = (cheat_hash_sequence, cheat_hash_dict)
+
+
+def register(type_, function=None):
+    '''
+    Register `function` for cheat-hashing objects of `type_` and subclasses.
+    
+    `type_` may also be a dotted name of a type, like `'numpy.ndarray'`, so
+    its module doesn't need to be imported. `function` takes an object and
+    returns an `int`. Objects that are equal should get the same `int`.
+    
+    You can also use this as a decorator:
+    
+        @cheat_hashing.register(MyType)
+        def cheat_hash_my_type(my_thing):
+            return cheat_hashing.cheat_hash(my_thing.items)
+            
+    '''
+    if function is None:
+        def decorator(function):
+            register(type_, function)
+            return function
+        return decorator
+    if isinstance(type_, str):
+        lazy_dispatch_map[type_] = function
+    else:
+        dispatch_map[type_] = function
+        _hashable_types.discard(type_)
+    _dispatch_cache.clear()
+    return function
+
+
+def _get_function(thing_type):
+    '''Get the function for cheat-hashing objects of `thing_type`.'''
+    try:
+        return _dispatch_cache[thing_type]
+    except KeyError:
+        pass
+    for type_ in thing_type.__mro__:
+        function = dispatch_map.get(type_)
+        if function is None and lazy_dispatch_map:
+            function = lazy_dispatch_map.get(
+                '%s.%s' % (type_.__module__, type_.__qualname__)
+            )
+        if function is not None:
+            break
+    _dispatch_cache[thing_type] = function
+    return function
+
+
+_recursion_hash = hash('<cheat_hash recursion>')
+
+
+def cheat_hash_container(container, function):
+    '''
+    Cheat-hash a sequence or a `dict`, according to `function`.
+    
+    `function` is either `cheat_hash_sequence` or `cheat_hash_dict`. If all
+    the items are hashable, the container is hashed in one go. Otherwise it's
+    traversed with an explicit stack instead of recursion, so deeply-nested
+    containers can't exceed the recursion limit. A container that contains
+    itself gets a fixed hash in the place where it recurs.
+    '''
+    is_dict = function is cheat_hash_dict
+    try:
+        return hash(frozenset(container.items())) if is_dict else \
+               hash(tuple(container))
+    except TypeError:
+        pass
+    
+    # Every frame is `[is_dict, keys, children, child_hashes]`, where
+    # `keys` is `None` for sequences, and `children` are the values for
+    # dicts:
+    stack = [_make_frame(container, is_dict)]
+    active_ids = {id(container)}
+    while True:
+        frame = stack[-1]
+        is_dict, keys, children, child_hashes = frame
+        if len(child_hashes) < len(children):
+            child = children[len(child_hashes)]
+            child_type = type(child)
+            if child_type in _hashable_types:
+                child_hashes.append(hash(child))
+                continue
+            child_function = _get_function(child_type)
+            if child_function not in _container_functions:
+                child_hashes.append(child_function(child))
+                continue
+            if id(child) in active_ids:
+                child_hashes.append(_recursion_hash)
+                continue
+            child_is_dict = child_function is cheat_hash_dict
+            try:
+                child_hashes.append(
+                    hash(frozenset(child.items())) if child_is_dict else
+                    hash(tuple(child))
+                )
+            except TypeError:
+                stack.append(_make_frame(child, child_is_dict))
+                active_ids.add(id(child))
+            continue
+        
+        stack.pop()
+        if is_dict:
+            result = hash(frozenset(zip(keys, child_hashes)))
+        else:
+            result = hash(tuple(child_hashes))
+        if not stack:
+            return result
+        active_ids.discard(id(stack[-1][2][len(stack[-1][3])]))
+        stack[-1][3].append(result)
+
+
+def _make_frame(container, is_dict):
+    if is_dict:
+        keys = list(container)
+        return [True, keys, [container[key] for key in keys], []]
+    else:
+        return [False, None, list(container), []]
 
 
 def cheat_hash(thing):
@@ -33,20 +178,14 @@ def cheat_hash(thing):
     This is intended for situtations where you have mutable objects that you
     never modify, and you want to be able to hash them despite Python not
     letting you.
+    
+    The function for each type is found in `dispatch_map` by the type's MRO,
+    and cached per type. Use `register` to add functions for your own types.
     '''
     thing_type = type(thing)
-    matching_types = \
-        [type_ for type_ in dispatch_map if issubclass(thing_type, type_)]
-    
-    mro = thing_type.mro()
-    
-    matching_type = min(
-        matching_types,
-        key=lambda type_: (mro.index(type_) if type_ in mro else infinity)
-    )
-    
-    return dispatch_map[matching_type](thing)
-    
-        
-        
-            
\ No newline at end of file
+    if thing_type in _hashable_types:
+        return hash(thing)
+    function = _get_function(thing_type)
+    if function in _container_functions:
+        return cheat_hash_container(thing, function)
+    return function(thing)
@@ -3,8 +3,7 @@
 
 '''Defines functions for cheat-hashing various types.'''
 
-# todo: there are some recommended hash implementations in `_abcoll`, maybe
-# they'll help
+import hashlib
 
 
 def cheat_hash_object(thing):
@@ -17,61 +16,47 @@ def cheat_hash_object(thing):
     
 def cheat_hash_set(my_set):
     '''Cheat-hash a `set`.'''
-    hashables = set()
-    unhashables = set()
-    for thing in my_set:
-        try:
-            hash(thing)
-        except Exception:
-            unhashables.add(thing)
-        else:
-            hashables.add(thing)
-            
-    return hash(
-        (
-            frozenset(hashables),
-            tuple(sorted(cheat_hash(thing) for thing in unhashables))
-        )
-    )    
+    # All the items of a set are hashable, so this is as good as it gets:
+    return hash(frozenset(my_set))
 
 
 def cheat_hash_sequence(my_sequence):
-    '''Cheat-hash a sequence.'''
-    hashables = []
-    unhashables = []
-    for thing in my_sequence:
-        try:
-            hash(thing)
-        except Exception:
-            unhashables.append(thing)
-        else:
-            hashables.append(thing)
-            
-    return hash(
-        (
-            tuple(hashables),
-            tuple(cheat_hash(thing) for thing in unhashables)
-        )
-    )    
+    '''
+    Cheat-hash a sequence.
+    
+    This is handled specially by `cheat_hash`, which hashes nested containers
+    without recursion.
+    '''
+    return cheat_hash_container(my_sequence, cheat_hash_sequence)
 
 
 def cheat_hash_dict(my_dict):
-    '''Cheat-hash a `dict`.'''
-    hashable_items = []
-    unhashable_items = []
-    for key, value in my_dict.items():
-        try:
-            hash((key, value))
-        except Exception:
-            unhashable_items.append((key, value))
-        else:
-            hashable_items.append((key, value))
-            
-    return hash(
-        (
-            tuple(sorted(hashable_items)),
-            tuple(cheat_hash(thing) for thing in sorted(unhashable_items))
-        )
-    )
+    '''
+    Cheat-hash a `dict`.
+    
+    This is handled specially by `cheat_hash`, which hashes nested containers
+    without recursion.
+    '''
+    return cheat_hash_container(my_dict, cheat_hash_dict)
+
+
+def cheat_hash_buffer(thing):
+    '''
+    Cheat-hash an object that supports the buffer protocol, by its contents.
+    
+    This is used for `bytearray`, `array.array` and NumPy arrays. The contents
+    are digested with BLAKE2, so big arrays are hashed in one pass without
+    making a Python object per item.
+    '''
+    try:
+        view = memoryview(thing)
+    except (TypeError, ValueError): # E.g. NumPy arrays of objects.
+        return cheat_hash_object(thing)
+    format_and_shape = (view.format, view.shape)
+    if not view.c_contiguous:
+        view = view.tobytes()
+    return hash((type(thing), format_and_shape,
+                 hashlib.blake2b(view, digest_size=8).digest()))
+
 
-from .cheat_hash import cheat_hash
\ No newline at end of file
+from .cheat_hash import cheat_hash_container
@@ -7,9 +7,9 @@ import functools
 import types
 import math
 import numbers
-import inspect
 
 from python_toolbox import caching
+from python_toolbox import cute_inspect
 from python_toolbox import math_tools
 from python_toolbox import sequence_tools
 from python_toolbox import cute_iter_tools
@@ -38,8 +38,8 @@ class PermSpaceType(abc.ABCMeta):
     def __call__(cls, *args, **kwargs):
         if cls == PermSpace and kwargs.get('is_combination', False):
             from .comb_space import CombSpace
-            arguments = PermSpace.__init__.signature.bind(
-                                               None, *args, **kwargs).arguments
+            arguments = cute_inspect.get_binder(PermSpace.__init__). \
+                                          get_call_args(None, *args, **kwargs)
             if arguments.get('fixed_map', None):
                 raise UnallowedVariationSelectionException(
                     {variations.Variation.FIXED: True,
@@ -391,8 +391,6 @@ class PermSpace(_VariationRemovingMixin, _VariationAddingMixin,
             self.unsliced = self
         if not self.is_typed:
             self.untyped = self
-
-    __init__.signature = inspect.signature(__init__)
             
     @caching.CachedProperty
     def _unsliced_length(self):
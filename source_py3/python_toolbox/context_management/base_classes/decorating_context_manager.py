@@ -26,6 +26,8 @@ class DecoratingContextManager:
         
     '''
     
+    __slots__ = ()
+    
     def __call__(self, function):
         '''Decorate `function` to use this context manager when it's called.'''
         def inner(function_, *args, **kwargs):
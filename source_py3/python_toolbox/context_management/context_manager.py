@@ -35,6 +35,14 @@ class ContextManager(DecoratingContextManager, metaclass=ContextManagerType):
     `python_toolbox.context_manager`.
     '''
     
+    __slots__ = ()
+    
+    __args = ()
+    '''Arguments for `manage_context`, for lone generator functions.'''
+    
+    __kwargs = {}
+    '''Keyword arguments for `manage_context`, for lone generator functions.'''
+    
     @abc.abstractmethod
     def __enter__(self):
         '''Prepare for suite execution.'''
@@ -61,15 +69,15 @@ class ContextManager(DecoratingContextManager, metaclass=ContextManagerType):
         This is used as `__enter__` for context managers that use a
         `manage_context` function.
         '''
-        if not hasattr(self, '_ContextManager__generators'):
-            self._ContextManager__generators = []
+        try:
+            generators = self._ContextManager__generators
+        except AttributeError:
+            generators = self._ContextManager__generators = []
         
-        new_generator = self.manage_context(
-            *getattr(self, '_ContextManager__args', ()),
-            **getattr(self, '_ContextManager__kwargs', {})
-        )
+        new_generator = self.manage_context(*self._ContextManager__args,
+                                            **self._ContextManager__kwargs)
         assert isinstance(new_generator, types.GeneratorType)
-        self._ContextManager__generators.append(new_generator)
+        generators.append(new_generator)
         
         
         try:
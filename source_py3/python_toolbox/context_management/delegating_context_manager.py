@@ -7,10 +7,6 @@ This module defines the `DelegatingContextManager` class.
 See its documentation for more information.
 '''
 
-import abc
-
-from python_toolbox import misc_tools
-
 from .context_manager import ContextManager
 
 
@@ -27,6 +23,8 @@ class DelegatingContextManager(ContextManager):
     class, but you don't to inherit all the other methods that it defines.
     '''
     
+    __slots__ = ()
+    
     delegatee_context_manager = None
     '''
     The context manager whose `__enter__` and `__exit__` method will be used.
@@ -34,9 +32,12 @@ class DelegatingContextManager(ContextManager):
     You may implement this as either an instance attribute or a property.
     '''
     
-    __enter__ = misc_tools.ProxyProperty(
-        '.delegatee_context_manager.__enter__'
-    )
-    __exit__ = misc_tools.ProxyProperty(
-        '.delegatee_context_manager.__exit__'
-    )
\ No newline at end of file
+    def __enter__(self):
+        '''Enter the delegatee context manager.'''
+        return self.delegatee_context_manager.__enter__()
+    
+    
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        '''Exit the delegatee context manager.'''
+        return self.delegatee_context_manager.__exit__(exc_type, exc_value,
+                                                       exc_traceback)
\ No newline at end of file
@@ -7,11 +7,6 @@ This module defines the `ReentrantContextManager` class.
 See its documentation for more information.
 '''
 
-import abc
-
-from python_toolbox import caching
-from python_toolbox.misc_tools import ProxyProperty
-
 from .context_manager import ContextManager
 
 
@@ -30,16 +25,16 @@ class ReentrantContextManager(ContextManager):
     no-op `__enter__` actions contained in the outermost suite.
     '''
     
-    depth = caching.CachedProperty(
-        0,
-        doc='''
-            The number of nested suites that entered this context manager.
-            
-            When the context manager is completely unused, it's `0`. When it's
-            first used, it becomes `1`. When its entered again, it becomes `2`.
-            If it is then exited, it returns to `1`, etc.
-            '''
-    )
+    depth = 0
+    '''
+    The number of nested suites that entered this context manager.
+    
+    When the context manager is completely unused, it's `0`. When it's first
+    used, it becomes `1`. When its entered again, it becomes `2`. If it is
+    then exited, it returns to `1`, etc.
+    
+    This is a plain integer attribute, so checking it is as fast as possible.
+    '''
 
     
     def __enter__(self):
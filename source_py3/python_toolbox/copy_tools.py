@@ -3,9 +3,300 @@
 
 '''
 This module defines tools related to copying and deepcopying operations.
+
+The main one is `deepcopy`, a faster replacement for `copy.deepcopy` for big
+graphs of plain objects. See its documentation for more details.
 '''
 
 import copy
+import copyreg
+import types
+import weakref
+
+
+__all__ = ['deepcopy', 'deepcopy_as_simple_object', 'register_passthrough',
+           'Snapshotter']
+
+
+_atomic_types = {
+    type(None), type(Ellipsis), type(NotImplemented), int, float, bool,
+    complex, bytes, str, types.CodeType, type, range,
+    types.BuiltinFunctionType, types.FunctionType, weakref.ref, property,
+}
+'''Types whose instances `copy.deepcopy` returns as they are.'''
+
+_HEAP_TYPE_FLAG = 1 << 9
+'''The `__flags__` bit of classes that were defined in Python.'''
+
+# Kinds of plans:
+_ATOMIC = 0
+'''Return the object itself.'''
+_LIST = 1
+_DICT = 2
+_SET = 3
+_TUPLE = 4
+'''Copy the items, and return the object itself if none of them changed.'''
+_FROZENSET = 5
+'''Like `_TUPLE`.'''
+_OBJECT = 6
+'''Make an empty instance, and copy the `__dict__` and the slots into it.'''
+_CUSTOM = 7
+'''Call the object's `__deepcopy__` method.'''
+_FALLBACK = 8
+'''Let `copy.deepcopy` copy the object.'''
+
+_finish_marker = object()
+
+_plans = {}
+'''
+Mapping from type to the plan for deepcopying its instances.
+
+A plan is a tuple `(kind, data)`. For `_OBJECT`, `data` is a tuple of the
+names of the slots, and for `_CUSTOM` it's a tuple of copy modes under which
+instances aren't copied.
+'''
+
+_passthroughs = {}
+'''Mapping from `__deepcopy__` function to copy modes it doesn't copy under.'''
+
+
+def register_passthrough(cls, copy_mode_type):
+    '''
+    Declare that instances of `cls` aren't copied under `copy_mode_type`.
+
+    This is for classes whose `__deepcopy__` returns the object itself when the
+    memo is an instance of `copy_mode_type`, like `Persistent` does with
+    `DontCopyPersistent`. `deepcopy` will then skip calling `__deepcopy__` in
+    that mode. It applies to subclasses of `cls` that don't override
+    `__deepcopy__`.
+    '''
+    deepcopy_function = cls.__deepcopy__
+    _passthroughs[deepcopy_function] = \
+        _passthroughs.get(deepcopy_function, ()) + (copy_mode_type,)
+    _plans.clear()
+
+
+def _is_simple_class(cls):
+    '''
+    Get whether `copy.deepcopy` would copy instances of `cls` by their state.
+
+    This is true for classes defined in Python that don't customize pickling,
+    so copying them means making an empty instance and copying its `__dict__`
+    and its slots into it.
+    '''
+    if not all(base.__flags__ & _HEAP_TYPE_FLAG for base in cls.__mro__[:-1]):
+        return False
+    if cls in copyreg.dispatch_table or \
+                              cls.__reduce_ex__ is not object.__reduce_ex__ or \
+                              cls.__reduce__ is not object.__reduce__:
+        return False
+    for name in ('__getnewargs__', '__getnewargs_ex__', '__setstate__'):
+        if hasattr(cls, name):
+            return False
+    return getattr(cls, '__getstate__', None) is \
+                                          getattr(object, '__getstate__', None)
+
+
+def _make_plan(cls):
+    if cls in _atomic_types or issubclass(cls, type):
+        return (_ATOMIC, None)
+    elif cls is list:
+        return (_LIST, None)
+    elif cls is dict:
+        return (_DICT, None)
+    elif cls is set:
+        return (_SET, None)
+    elif cls is tuple:
+        return (_TUPLE, None)
+    elif cls is frozenset:
+        return (_FROZENSET, None)
+    deepcopy_function = getattr(cls, '__deepcopy__', None)
+    if deepcopy_function is not None:
+        return (_CUSTOM, _passthroughs.get(deepcopy_function, ()))
+    elif _is_simple_class(cls):
+        return (_OBJECT, tuple(copyreg._slotnames(cls)))
+    else:
+        return (_FALLBACK, None)
+
+
+def _get_plan(cls):
+    try:
+        return _plans[cls]
+    except KeyError:
+        plan = _plans[cls] = _make_plan(cls)
+        return plan
+
+
+def _get_object_state(thing, slot_names):
+    '''Get the `__dict__` (or `None`) and a list of `(slot, value)` pairs.'''
+    dict_ = getattr(thing, '__dict__', None)
+    slot_items = []
+    for slot_name in slot_names:
+        try:
+            slot_items.append((slot_name, getattr(thing, slot_name)))
+        except AttributeError:
+            pass
+    return (dict_, slot_items)
+
+
+def deepcopy(thing, memo=None):
+    '''
+    Deepcopy `thing`, like `copy.deepcopy` but faster for big graphs.
+
+    Lists, dicts, sets, tuples, frozensets and instances of classes that
+    don't customize their copying or pickling are copied here, walking the
+    graph with a loop instead of recursion, so there's no recursion limit.
+    How to copy each class is figured out once and cached. Instances of
+    immutable types are returned as they are, and so are tuples and
+    frozensets whose items didn't need copying. Anything else is given to its
+    `__deepcopy__` method or to `copy.deepcopy`, with the same `memo`.
+
+    You may pass a `CopyMode` as `memo`, and `__deepcopy__` methods will get
+    it, like with `copy.deepcopy`. Classes registered with
+    `register_passthrough` aren't copied in their modes; e.g. `Persistent`
+    objects are kept as they are under `DontCopyPersistent`.
+    '''
+    if memo is None:
+        memo = {}
+    try:
+        return memo[id(thing)]
+    except KeyError:
+        pass
+    plans = _plans
+    atomic_types = _atomic_types
+
+    if type(thing) in atomic_types:
+        return thing
+
+    root = thing
+    keep_alive = memo.setdefault(id(memo), [])
+    get = memo.get
+    stack = [thing]
+    '''
+    Things to copy.
+
+    A copy whose items need copying is pushed as a record `(kind, thing,
+    new_thing, data)`, followed by `_finish_marker` and then by the items, so
+    the record is popped again after its items are copied, and the copy is
+    made or filled right then. Like with recursion, the only copies that
+    aren't filled yet at any time are those of the things being copied.
+    '''
+    push = stack.append
+    pop = stack.pop
+    finish_marker = _finish_marker
+
+    while stack:
+        thing = pop()
+        if thing is finish_marker: # Items are copied, finishing the copy:
+            (kind, thing, new_thing, data) = pop()
+            if kind == _OBJECT:
+                (dict_, slot_items) = data
+                if dict_:
+                    new_dict = new_thing.__dict__
+                    for name, value in dict_.items():
+                        new_dict[name] = get(id(value), value)
+                for slot_name, value in slot_items:
+                    setattr(new_thing, slot_name, get(id(value), value))
+            elif kind == _LIST:
+                new_thing.extend([get(id(item), item) for item in thing])
+            elif kind == _DICT:
+                for key, value in thing.items():
+                    new_thing[get(id(key), key)] = get(id(value), value)
+            elif kind == _SET:
+                new_thing.update([get(id(item), item) for item in thing])
+            else:
+                assert kind == _TUPLE or kind == _FROZENSET
+                thing_id = id(thing)
+                if thing_id in memo:
+                    continue
+                items = [get(id(item), item) for item in thing]
+                for new_item, item in zip(items, thing):
+                    if new_item is not item:
+                        memo[thing_id] = type(thing)(items)
+                        keep_alive.append(thing)
+                        break
+                else:
+                    memo[thing_id] = thing
+            continue
+        thing_id = id(thing)
+        if thing_id in memo:
+            continue
+
+        cls = type(thing)
+        try:
+            (kind, data) = plans[cls]
+        except KeyError:
+            (kind, data) = _get_plan(cls)
+
+        if kind == _OBJECT:
+            new_thing = memo[thing_id] = cls.__new__(cls)
+            if data:
+                (dict_, slot_items) = state = _get_object_state(thing, data)
+                references = [value for slot_name, value in slot_items
+                              if type(value) not in atomic_types]
+            else:
+                (dict_, slot_items) = state = (thing.__dict__, ())
+                references = []
+            if dict_:
+                references.extend([value for value in dict_.values()
+                                   if type(value) not in atomic_types])
+            if references:
+                push((kind, thing, new_thing, state))
+                push(finish_marker)
+                stack.extend(references)
+            else:
+                if dict_:
+                    new_thing.__dict__.update(dict_)
+                for slot_name, value in slot_items:
+                    setattr(new_thing, slot_name, value)
+        elif kind == _DICT:
+            new_thing = memo[thing_id] = {}
+            references = [item for key_and_value in thing.items() for item in
+                          key_and_value if type(item) not in atomic_types]
+            if references:
+                push((kind, thing, new_thing, None))
+                push(finish_marker)
+                stack.extend(references)
+            else:
+                new_thing.update(thing)
+        elif kind == _LIST or kind == _SET:
+            new_thing = memo[thing_id] = cls()
+            references = [item for item in thing
+                          if type(item) not in atomic_types]
+            if references:
+                push((kind, thing, new_thing, None))
+                push(finish_marker)
+                stack.extend(references)
+            elif kind == _LIST:
+                new_thing.extend(thing)
+            else:
+                new_thing.update(thing)
+        elif kind == _TUPLE or kind == _FROZENSET:
+            references = [item for item in thing
+                          if type(item) not in atomic_types]
+            if references:
+                push((kind, thing, None, None))
+                push(finish_marker)
+                stack.extend(references)
+            else:
+                memo[thing_id] = thing
+            continue
+        elif kind == _CUSTOM:
+            if data and isinstance(memo, data):
+                memo[thing_id] = thing
+                continue
+            new_thing = memo[thing_id] = thing.__deepcopy__(memo)
+            if new_thing is thing:
+                continue
+        elif kind == _FALLBACK:
+            copy.deepcopy(thing, memo)
+            continue
+        else:
+            assert kind == _ATOMIC
+            continue
+        keep_alive.append(thing)
+
+    return get(id(root), root)
 
 
 def deepcopy_as_simple_object(thing, memo=None):
@@ -18,7 +309,127 @@ def deepcopy_as_simple_object(thing, memo=None):
     new_thing = klass.__new__(klass)
     memo[id(thing)] = new_thing
     for (name, subthing) in vars(thing).items():
-        new_thing.__dict__[name] = copy.deepcopy(subthing, memo)
+        new_thing.__dict__[name] = deepcopy(subthing, memo)
     return new_thing
-        
-    
\ No newline at end of file
+
+
+class Snapshotter:
+    '''
+    Takes copy-on-write snapshots of an object graph.
+
+    Usage:
+
+        snapshotter = Snapshotter()
+        first_snapshot = snapshotter.snapshot(model)
+        # ... Change some of `model`
+        second_snapshot = snapshotter.snapshot(model)
+
+    Each snapshot is a deepcopy of the graph, made with `deepcopy`, except that
+    the parts of the graph that didn't change since the previous snapshot
+    aren't copied again; the new snapshot shares them with the previous one.
+    An object counts as changed if the objects it refers to aren't the same
+    ones as before, or if anything it refers to, directly or indirectly,
+    changed. Objects that `deepcopy` hands to `__deepcopy__` methods or to
+    `copy.deepcopy` always count as changed.
+
+    This is useful for keeping many versions of a big graph, e.g. for undo,
+    when each version changes only a small part of it. Since snapshots share
+    objects, they must be treated as read-only.
+
+    `copy_mode` is a `CopyMode` subclass to copy in, e.g. `DontCopyPersistent`.
+    '''
+
+    def __init__(self, copy_mode=None):
+        self.copy_mode = copy_mode
+        self._records = {}
+        '''
+        Mapping from object ID to `(thing, references, new_thing)`.
+
+        `references` is a list of what `thing` referred to when it was copied
+        into `new_thing` in the last snapshot.
+        '''
+
+
+    def _make_memo(self):
+        return self.copy_mode() if self.copy_mode is not None else {}
+
+
+    def snapshot(self, thing):
+        '''Take a snapshot of `thing` and everything it refers to.'''
+        memo = self._make_memo()
+        atomic_types = _atomic_types
+        graph = {}
+        '''Mapping from object ID to `(thing, references)`.'''
+        changed_ids = []
+        stack = [thing]
+        while stack:
+            thing_ = stack.pop()
+            thing_id = id(thing_)
+            if thing_id in graph:
+                continue
+            (kind, data) = _get_plan(type(thing_))
+            if kind == _ATOMIC or (kind == _CUSTOM and data and
+                                   isinstance(memo, data)):
+                continue
+            if kind in (_LIST, _SET, _TUPLE, _FROZENSET):
+                references = list(thing_)
+            elif kind == _DICT:
+                references = [item for key_and_value in thing_.items()
+                              for item in key_and_value]
+            elif kind == _OBJECT:
+                (dict_, slot_items) = _get_object_state(thing_, data)
+                references = [item for name_and_value in
+                              (tuple(dict_.items()) if dict_ else ()) +
+                              tuple(slot_items) for item in name_and_value]
+            else:
+                references = None # Opaque, always counts as changed.
+            graph[thing_id] = (thing_, references)
+
+            record = self._records.get(thing_id)
+            if references is None or record is None or \
+                    record[0] is not thing_ or \
+                    not _are_same_references(record[1], references):
+                changed_ids.append(thing_id)
+            if references is not None:
+                stack.extend(reference for reference in references
+                             if type(reference) not in atomic_types)
+
+        # An object also changed if anything it refers to changed:
+        referrers = {}
+        for thing_id, (thing_, references) in graph.items():
+            for reference in references or ():
+                if type(reference) not in atomic_types:
+                    referrers.setdefault(id(reference), []).append(thing_id)
+        changed = set(changed_ids)
+        while changed_ids:
+            for referrer_id in referrers.get(changed_ids.pop(), ()):
+                if referrer_id not in changed:
+                    changed.add(referrer_id)
+                    changed_ids.append(referrer_id)
+
+        keep_alive = memo.setdefault(id(memo), [])
+        for thing_id in graph.keys() - changed:
+            (old_thing, _, new_thing) = self._records[thing_id]
+            memo[thing_id] = new_thing
+            keep_alive.append(old_thing)
+        snapshot = deepcopy(thing, memo)
+
+        self._records = {
+            thing_id: (thing_, references, memo.get(thing_id, thing_))
+            for thing_id, (thing_, references) in graph.items()
+        }
+        return snapshot
+
+
+def _are_same_references(old_references, new_references):
+    '''Get whether two lists of references refer to the same things.'''
+    if len(old_references) != len(new_references):
+        return False
+    for old_reference, new_reference in zip(old_references, new_references):
+        if old_reference is new_reference:
+            continue
+        if type(old_reference) is not type(new_reference) or \
+                                type(old_reference) not in _atomic_types or \
+                                                old_reference != new_reference:
+            return False
+    return True
@@ -3,13 +3,28 @@
 
 '''A fork of the standard-library `inspect` module.'''
 
+import collections
 import types
 import inspect
 
-getargspec = inspect.getargspec
-getcallargs = inspect.getcallargs
+from .binding import Binder, get_binder, getcallargs
+
 getsource = inspect.getsource
 
+try:
+    getargspec = inspect.getargspec
+except AttributeError: # Python 3.11 and upwards
+    ArgSpec = collections.namedtuple('ArgSpec',
+                                     'args varargs keywords defaults')
+    def getargspec(function):
+        '''Get `(args, varargs, keywords, defaults)` of `function`.'''
+        arg_spec = inspect.getfullargspec(function)
+        if arg_spec.kwonlyargs or arg_spec.annotations:
+            raise ValueError('Function has keyword-only parameters or '
+                             'annotations, use `getfullargspec`.')
+        return ArgSpec(arg_spec.args, arg_spec.varargs, arg_spec.varkw,
+                       arg_spec.defaults)
+
 ###############################################################################
 
 # Copied from in-development Python 3.4, with changes from PyPy, for the sake
@@ -0,0 +1,223 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+Defines the `Binder` class and the `get_binder` function.
+
+See their documentation for more details.
+'''
+
+import inspect
+import threading
+import weakref
+
+
+__all__ = ['Binder', 'get_binder', 'getcallargs']
+
+
+_POSITIONAL_ONLY = inspect.Parameter.POSITIONAL_ONLY
+_POSITIONAL_OR_KEYWORD = inspect.Parameter.POSITIONAL_OR_KEYWORD
+_VAR_POSITIONAL = inspect.Parameter.VAR_POSITIONAL
+_KEYWORD_ONLY = inspect.Parameter.KEYWORD_ONLY
+_VAR_KEYWORD = inspect.Parameter.VAR_KEYWORD
+
+_missing = object()
+
+
+class Binder:
+    '''
+    Binds call arguments to the parameters of a function.
+
+    This does what `inspect.Signature.bind` and `inspect.getcallargs` do, but
+    the function is introspected only once, when the `Binder` is made, so
+    binding is much faster. Use `get_binder` to get the cached `Binder` of a
+    function instead of making a new one.
+
+    Binding gives the values of the named parameters in the order they're
+    defined, (positional parameters first, then keyword-only ones,) with the
+    defaults filled in, plus the extraneous `*args` and `**kwargs`.
+    '''
+
+    missing = _missing
+    '''The placeholder in `defaults` for parameters that have no default.'''
+
+    def __init__(self, function):
+        self.name = getattr(function, '__name__', 'function')
+        '''
+        The function's name, for error messages.
+
+        We don't keep the function itself, so the cache in `get_binder`
+        doesn't keep functions alive.
+        '''
+        parameters = tuple(inspect.signature(function).parameters.values())
+
+        self.arg_names = tuple(
+            parameter.name for parameter in parameters
+            if parameter.kind not in (_VAR_POSITIONAL, _VAR_KEYWORD)
+        )
+        '''The names of the named parameters, positional ones first.'''
+
+        self.n_positional_args = sum(
+            parameter.kind in (_POSITIONAL_ONLY, _POSITIONAL_OR_KEYWORD)
+            for parameter in parameters
+        )
+        '''The number of parameters that can be given positionally.'''
+
+        self.star_args_name = self.star_kwargs_name = None
+        for parameter in parameters:
+            if parameter.kind == _VAR_POSITIONAL:
+                self.star_args_name = parameter.name
+            elif parameter.kind == _VAR_KEYWORD:
+                self.star_kwargs_name = parameter.name
+
+        named_parameters = [parameter for parameter in parameters if
+                            parameter.kind not in (_VAR_POSITIONAL,
+                                                   _VAR_KEYWORD)]
+        self.defaults = tuple(
+            _missing if parameter.default is inspect.Parameter.empty else
+            parameter.default for parameter in named_parameters
+        )
+        '''The default of each named parameter, or `missing` if it has none.'''
+
+        self._keyword_indices = {
+            parameter.name: index for index, parameter in
+            enumerate(named_parameters) if parameter.kind != _POSITIONAL_ONLY
+        }
+        '''Mapping from name to index, for parameters that take keywords.'''
+
+        self._fillers = tuple((_missing,) * i for i in
+                              range(len(self.arg_names) + 1))
+        '''`_fillers[i]` is a tuple of `i` placeholders for missing values.'''
+
+
+    def bind(self, *args, **kwargs):
+        '''
+        Bind arguments, returning `(values, star_args, star_kwargs)`.
+
+        `values` is a list of the values of the named parameters, in the
+        order of `arg_names`. `star_args` is a tuple and `star_kwargs` is a
+        `dict`; they're empty if the function doesn't take them. Raises
+        `TypeError` if the arguments don't fit the function.
+        '''
+        n_positional_args = self.n_positional_args
+        n_args = len(args)
+        if n_args > n_positional_args:
+            if self.star_args_name is None:
+                raise TypeError(
+                    '%s() takes %s positional arguments but %s were given' %
+                    (self.name, n_positional_args, n_args)
+                )
+            star_args = args[n_positional_args:]
+            values = list(args[:n_positional_args])
+            n_args = n_positional_args
+        else:
+            star_args = ()
+            values = list(args)
+        n_missing = len(self.arg_names) - n_args
+        if n_missing:
+            values.extend(self._fillers[n_missing])
+
+        star_kwargs = {}
+        if kwargs:
+            keyword_indices = self._keyword_indices
+            for name, value in kwargs.items():
+                index = keyword_indices.get(name)
+                if index is None:
+                    if self.star_kwargs_name is None:
+                        raise TypeError(
+                            '%s() got an unexpected keyword argument %r' %
+                            (self.name, name)
+                        )
+                    star_kwargs[name] = value
+                elif index < n_args:
+                    raise TypeError(
+                        '%s() got multiple values for argument %r' %
+                        (self.name, name)
+                    )
+                else:
+                    values[index] = value
+
+        if n_missing:
+            defaults = self.defaults
+            for index in range(n_args, len(values)):
+                if values[index] is _missing:
+                    value = values[index] = defaults[index]
+                    if value is _missing:
+                        raise TypeError(
+                            '%s() missing required argument %r' %
+                            (self.name, self.arg_names[index])
+                        )
+
+        return (values, star_args, star_kwargs)
+
+
+    def get_call_args(self, *args, **kwargs):
+        '''
+        Get a `dict` from parameter name to its value for the given arguments.
+
+        This is like `inspect.getcallargs`: The `*args` and `**kwargs`
+        parameters, if the function has them, are included too.
+        '''
+        (values, star_args, star_kwargs) = self.bind(*args, **kwargs)
+        call_args = dict(zip(self.arg_names, values))
+        if self.star_args_name is not None:
+            call_args[self.star_args_name] = star_args
+        if self.star_kwargs_name is not None:
+            call_args[self.star_kwargs_name] = star_kwargs
+        return call_args
+
+
+    def __repr__(self):
+        return '<%s for %s>' % (type(self).__name__, self.name)
+
+
+_binders = {}
+'''Mapping from function ID to `(weakref_to_function, binder)`.'''
+
+_binders_lock = threading.Lock()
+
+
+def _forget_binder(function_id):
+    with _binders_lock:
+        _binders.pop(function_id, None)
+
+
+def get_binder(function):
+    '''
+    Get the `Binder` for `function`.
+
+    The binder is made once per function object and cached for as long as
+    the function lives. Bound methods aren't cached, since a new one is made
+    every time a method is accessed; get the binder of the function instead.
+    '''
+    entry = _binders.get(id(function))
+    if entry is not None and entry[0]() is function:
+        return entry[1]
+    binder = Binder(function)
+    if not inspect.ismethod(function):
+        function_id = id(function)
+        try:
+            function_ref = weakref.ref(
+                function,
+                lambda _, function_id=function_id: _forget_binder(function_id)
+            )
+        except TypeError: # Not weakreffable, so we can't tell if it died.
+            pass
+        else:
+            with _binders_lock:
+                _binders[function_id] = (function_ref, binder)
+    return binder
+
+
+def getcallargs(function, *args, **kwargs):
+    '''
+    Get a `dict` from parameter name to its value for a call to `function`.
+
+    This is like `inspect.getcallargs`, but it uses the cached `Binder` of
+    `function`. Bound methods include their `self` argument.
+    '''
+    if inspect.ismethod(function):
+        return get_binder(function.__func__).get_call_args(
+            function.__self__, *args, **kwargs
+        )
+    return get_binder(function).get_call_args(*args, **kwargs)
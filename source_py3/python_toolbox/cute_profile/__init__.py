@@ -8,4 +8,6 @@ See its documentation for more details.
 '''
 
 from . import base_profile
-from .cute_profile import profile_ready
\ No newline at end of file
+from .cute_profile import profile_ready, profile_call
+from .sampling import SamplingProfile
+from .profile_handling import AggregatingProfileHandler
@@ -9,12 +9,14 @@ See its documentation for more details.
 
 import functools
 import marshal
+import random
 
 from python_toolbox import misc_tools
 from python_toolbox import decorator_tools
 
 from . import base_profile
 from . import profile_handling
+from . import sampling
 
 
 def profile(statement, globals_, locals_):
@@ -35,7 +37,28 @@ def profile_expression(expression, globals_, locals_):
     return (locals_['result'], profile_)
 
 
-def profile_ready(condition=None, off_after=True, profile_handler=None):
+def profile_call(function, args, kwargs, sampling_interval=None):
+    '''
+    Profile a call to `function`, and return a tuple of `(result, profile)`.
+
+    If `sampling_interval` is `None`, the call is profiled with `cProfile`.
+    Otherwise it's profiled by a `SamplingProfile` that samples the stack
+    every `sampling_interval` seconds.
+    '''
+    if sampling_interval is None:
+        profile_ = base_profile.Profile()
+    else:
+        profile_ = sampling.SamplingProfile(sampling_interval)
+    try:
+        result = profile_.runcall(function, *args, **kwargs)
+    finally:
+        if sampling_interval is None:
+            profile_.create_stats()
+    return (result, profile_)
+
+
+def profile_ready(condition=None, off_after=True, profile_handler=None,
+                  sampling_interval=None, sample_percentage=None):
     '''
     Decorator for setting a function to be ready for profiling.
     
@@ -80,6 +103,24 @@ def profile_ready(condition=None, off_after=True, profile_handler=None):
     
        'ram@rachum.com\nsmtp.gmail.com\nsmtp_username\nsmtppassword'
        
+    `cProfile` slows the function down a lot. For a cheaper profile, set
+    `sampling_interval` to a number of seconds, and the function's stack will
+    be sampled that often from a background thread instead. (See
+    `SamplingProfile`.) Sampled profiles are handled like the others, except
+    they're in collapsed-stack format, which flame graph tools read.
+    
+    To keep profiling on a part of the calls, set `sample_percentage` to a
+    number between 0 and 100, and each call will be profiled with that
+    probability, regardless of `f.profiling_on`. Combine it with
+    `sampling_interval` to profile production traffic. If it's `None`, the
+    `sample_rate` of the profile handler is used, if it has one.
+    
+    To merge the profiles of many calls into one result, instead of handling
+    each profile on its own, pass an `AggregatingProfileHandler` as
+    `profile_handler`.
+    
+    All of these arguments can also be changed later by setting the
+    attributes of the same names on the decorated function.
     '''
     
     
@@ -104,19 +145,30 @@ def profile_ready(condition=None, off_after=True, profile_handler=None):
                     decorated_function.profiling_on = False
                     decorated_function.condition = None
                     
-                # This line puts it in locals, weird:
-                decorated_function.original_function
+                sampled = True
+                
+            else:
+                sample_percentage = decorated_function.sample_percentage
+                if sample_percentage is None:
+                    sample_rate = getattr(decorated_function.profile_handler,
+                                          'sample_rate', None)
+                    sampled = sample_rate is not None and \
+                                                 random.random() < sample_rate
+                else:
+                    sampled = random.random() * 100 < sample_percentage
+                
+            if sampled:
                 
-                result, profile_ = profile_expression(
-                    'decorated_function.original_function(*args, **kwargs)',
-                    globals(), locals()
+                result, profile_ = profile_call(
+                    decorated_function.original_function, args, kwargs,
+                    decorated_function.sampling_interval
                 )
                 
                 decorated_function.profile_handler(profile_)
 
                 return result
             
-            else: # decorated_function.profiling_on is False
+            else: # Not profiling this call
                 
                 return decorated_function.original_function(*args, **kwargs)
             
@@ -126,6 +178,8 @@ def profile_ready(condition=None, off_after=True, profile_handler=None):
         decorated_function.profiling_on = None
         decorated_function.condition = condition
         decorated_function.off_after = off_after
+        decorated_function.sampling_interval = sampling_interval
+        decorated_function.sample_percentage = sample_percentage
         decorated_function.profile_handler = \
                           profile_handling.get_profile_handler(profile_handler)
         
@@ -3,7 +3,11 @@
 
 import threading
 import datetime as datetime_module
+import collections
 import marshal
+import queue
+import time
+import traceback
 try:
     import pathlib
 except:
@@ -16,24 +20,47 @@ from python_toolbox.third_party import envelopes
 
 from python_toolbox import caching
 from python_toolbox import misc_tools
+from python_toolbox.locking import instrumentation as lock_instrumentation
 
 from . import base_profile
+from . import sampling
 
 
 class BaseProfileHandler(object, metaclass=abc.ABCMeta):
-    '''Profile handler which saves the profiling result in some way.'''
+    '''
+    Profile handler which saves the profiling result in some way.
+    
+    `cProfile` profiles are saved as marshalled stats, in `.profile` files.
+    `SamplingProfile`s are saved as collapsed stacks, in `.collapsed` files.
+    '''
+    
+    sample_rate = None
+    '''
+    Share of calls to profile, between 0 and 1, or `None` to leave it to the
+    `profile_ready` arguments.
+    '''
     
     def __call__(self, profile):
-        self.profile = profile
-        self.profile_data = marshal.dumps(profile.stats)
-        return self.handle()
+        # The profile is passed along instead of being put on `self`, because
+        # the handler may get profiles from several threads at once.
+        return self.handle(profile)
     
     @abc.abstractmethod
-    def handle(self):
+    def handle(self, profile):
         pass
     
-    make_file_name = lambda self: ('%s.profile' %
-                              datetime_module.datetime.now()).replace(':', '.')
+    @staticmethod
+    def get_profile_data(profile):
+        '''Get `(profile_data, file_extension)` for saving `profile`.'''
+        if isinstance(profile, sampling.SamplingProfile):
+            return (profile.get_collapsed_stacks().encode('utf-8'),
+                    'collapsed')
+        else:
+            return (marshal.dumps(profile.stats), 'profile')
+    
+    make_file_name = lambda self, file_extension='profile': ('%s.%s' % (
+        datetime_module.datetime.now(), file_extension
+    )).replace(':', '.')
         
     
 
@@ -41,12 +68,13 @@ class AuxiliaryThreadProfileHandler(BaseProfileHandler):
     '''Profile handler that does its action on a separate thread.'''
     thread = None
     
-    def handle(self):
-        self.thread = threading.Thread(target=self.thread_job)
+    def handle(self, profile):
+        self.thread = threading.Thread(target=self.thread_job,
+                                       args=(profile,))
         self.thread.start()
     
     @abc.abstractmethod
-    def thread_job(self):
+    def thread_job(self, profile):
         pass
     
 
@@ -64,15 +92,17 @@ class EmailProfileHandler(AuxiliaryThreadProfileHandler):
         self.smtp_password = smtp_password
         self.use_tls = use_tls
         
-    def thread_job(self):
+    def thread_job(self, profile):
+        profile_data, file_extension = self.get_profile_data(profile)
         envelope = envelopes.Envelope(
             to_addr=self.email_address,
             subject='Profile data', 
         )
         
-        envelope.add_attachment_from_string(self.profile_data,
-                                            self.make_file_name(), 
-                                            'application/octet-stream')
+        envelope.add_attachment_from_string(
+            profile_data, self.make_file_name(file_extension),
+            'application/octet-stream'
+        )
         
         envelope.send(self.smtp_server, login=self.smtp_user,
                       password=self.smtp_password, tls=self.use_tls)
@@ -81,30 +111,210 @@ class EmailProfileHandler(AuxiliaryThreadProfileHandler):
 
 
 class FolderProfileHandler(AuxiliaryThreadProfileHandler):
-    '''Profile handler that saves the profile to disk on separate thread.'''
+    '''
+    Profile handler that saves the profile to disk on separate thread.
+    
+    If lock instrumentation is enabled, a lock report is saved next to it.
+    '''
     
     def __init__(self, folder):
         self.folder = pathlib.Path(folder)
         
-    def thread_job(self):
-        with (self.folder / self.make_file_name()).open('wb') as output_file:
-            output_file.write(self.profile_data)
+    def thread_job(self, profile):
+        profile_data, file_extension = self.get_profile_data(profile)
+        path = self.folder / self.make_file_name(file_extension)
+        with path.open('wb') as output_file:
+            output_file.write(profile_data)
+        if lock_instrumentation.is_enabled():
+            lock_instrumentation.write_report(self.folder)
         
 
 
 class PrintProfileHandler(BaseProfileHandler):
-    '''Profile handler that prints profile data to standard output.'''
+    '''
+    Profile handler that prints profile data to standard output.
+    
+    If lock instrumentation is enabled, a lock report is printed after it.
+    '''
     def __init__(self, sort_order):
         self.sort_order = sort_order
         
-    def handle(self):
-        self.profile.print_stats(self.sort_order)
+    def handle(self, profile):
+        profile.print_stats(self.sort_order)
+        if lock_instrumentation.is_enabled():
+            print(lock_instrumentation.get_report())
         
         
 
 
+_flush_marker = object()
+
+
+class AggregatingProfileHandler(BaseProfileHandler):
+    '''
+    Profile handler that merges many profiles and saves them together.
+    
+    Usage:
+    
+        handler = AggregatingProfileHandler(folder, n_calls=10000,
+                                            sample_rate=0.01)
+        
+        @profile_ready(profile_handler=handler)
+        def handle_request(request):
+            ...
+    
+    `profile_ready` profiles each call with probability `sample_rate`. The
+    profiles are merged, (with `pstats.Stats.add` for `cProfile` profiles,
+    and by adding up the stacks of `SamplingProfile`s,) and the merged result
+    is saved to `folder` once `n_calls` profiles were merged, or `window`
+    seconds after the first profile that wasn't saved yet, whichever comes
+    first. Either may be `None`. Files are named like `FolderProfileHandler`
+    names them, and if `max_files` is given, only the last `max_files` files
+    this handler saved are kept.
+    
+    Merging and saving happen on a single background thread. If it falls
+    behind by more than `max_pending` profiles, new profiles are dropped and
+    counted in `n_dropped`, so profiling under load doesn't use unbounded
+    memory. Call `flush` to save the profiles merged so far, e.g. before the
+    program exits.
+    '''
+    
+    def __init__(self, folder, n_calls=1000, window=None, sample_rate=None,
+                 max_files=None, max_pending=1000):
+        if n_calls is not None and n_calls < 1:
+            raise ValueError('`n_calls` must be at least 1, got %r.' %
+                             (n_calls,))
+        if window is not None and window <= 0:
+            raise ValueError('`window` must be positive, got %r.' % (window,))
+        if sample_rate is not None and not 0 <= sample_rate <= 1:
+            raise ValueError('`sample_rate` must be between 0 and 1, got %r.' %
+                             (sample_rate,))
+        if max_files is not None and max_files < 1:
+            raise ValueError('`max_files` must be at least 1, got %r.' %
+                             (max_files,))
+        self.folder = pathlib.Path(folder)
+        self.n_calls = n_calls
+        self.window = window
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        
+        self.n_dropped = 0
+        '''The number of profiles dropped because the writer fell behind.'''
+        self._n_dropped_lock = threading.Lock()
+        
+        self.paths = collections.deque()
+        '''The paths of the files this handler saved and didn't rotate out.'''
+        
+        self._queue = queue.Queue(max_pending)
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._reset()
+        
+        
+    def _reset(self):
+        self._stats = None
+        self._stacks = collections.Counter()
+        self._n_pending = 0
+        
+        
+    def _start_thread(self):
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._write_profiles,
+                    name='AggregatingProfileHandler writer', daemon=True
+                )
+                self._thread.start()
+        
+        
+    def handle(self, profile):
+        if self._thread is None:
+            self._start_thread()
+        try:
+            self._queue.put_nowait(profile)
+        except queue.Full:
+            with self._n_dropped_lock:
+                self.n_dropped += 1
+            
+            
+    def flush(self):
+        '''Save the profiles merged so far, waiting until they're saved.'''
+        if self._thread is None:
+            self._start_thread()
+        self._queue.put(_flush_marker)
+        self._queue.join()
+        
+        
+    def _write_profiles(self):
+        pending_since = None
+        while True:
+            if pending_since is None or self.window is None:
+                timeout = None
+            else:
+                timeout = max(0, pending_since + self.window -
+                                                             time.monotonic())
+            try:
+                profile = self._queue.get(timeout=timeout)
+            except queue.Empty: # The window has passed.
+                self._save()
+                pending_since = None
+                continue
+            try:
+                if profile is _flush_marker:
+                    self._save()
+                    pending_since = None
+                    continue
+                self._add(profile)
+                if pending_since is None:
+                    pending_since = time.monotonic()
+                if self.n_calls is not None and \
+                                              self._n_pending >= self.n_calls:
+                    self._save()
+                    pending_since = None
+            except Exception:
+                traceback.print_exc() # Keep the writer thread alive.
+            finally:
+                self._queue.task_done()
+                
+                
+    def _add(self, profile):
+        if isinstance(profile, sampling.SamplingProfile):
+            self._stacks.update(profile.stacks)
+        elif self._stats is None:
+            self._stats = pstats.Stats(profile)
+        else:
+            self._stats.add(profile)
+        self._n_pending += 1
+        
+        
+    def _save(self):
+        if not self._n_pending:
+            return
+        (stats, stacks) = (self._stats, self._stacks)
+        self._reset()
+        paths = []
+        if stats is not None:
+            paths.append(self.folder / self.make_file_name('profile'))
+            stats.dump_stats(str(paths[-1]))
+        if stacks:
+            paths.append(self.folder / self.make_file_name('collapsed'))
+            with paths[-1].open('w') as output_file:
+                output_file.write(sampling.format_collapsed_stacks(stacks))
+        if lock_instrumentation.is_enabled():
+            paths.append(lock_instrumentation.write_report(self.folder))
+        self.paths.extend(paths)
+        if self.max_files is not None:
+            while len(self.paths) > self.max_files:
+                try:
+                    self.paths.popleft().unlink()
+                except OSError:
+                    pass
+        
+
 def get_profile_handler(profile_handler_string):
     '''Parse `profile_handler_string` into a `ProfileHandler` class.'''
+    if isinstance(profile_handler_string, BaseProfileHandler):
+        return profile_handler_string
     if isinstance(profile_handler_string, pathlib.Path):
         assert profile_handler_string.is_dir()
         return FolderProfileHandler(profile_handler_string)
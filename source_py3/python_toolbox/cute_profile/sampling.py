@@ -0,0 +1,217 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+Defines the `SamplingProfile` class, a low-overhead statistical profiler.
+
+See its documentation for more details.
+'''
+
+import collections
+import sys
+import threading
+import time
+
+
+__all__ = ['SamplingProfile', 'format_collapsed_stacks']
+
+
+_labels = {}
+'''Mapping from code object to its label in collapsed stacks.'''
+
+
+def _get_label(code):
+    try:
+        return _labels[code]
+    except KeyError:
+        label = _labels[code] = '%s (%s:%s)' % (
+            code.co_name, code.co_filename, code.co_firstlineno
+        )
+        return label
+
+
+def format_collapsed_stacks(stacks):
+    '''
+    Format a mapping from stack to number of samples as collapsed stacks.
+
+    Each line has the functions of a stack separated by semicolons,
+    outermost first, then a space and the number of samples. The most common
+    stacks come first.
+    '''
+    sorted_stacks = sorted(stacks.items(), key=lambda item: item[1],
+                           reverse=True)
+    return ''.join('%s %s\n' % (';'.join(stack), n_samples) for
+                   stack, n_samples in sorted_stacks)
+
+
+class _Sampler:
+    '''
+    A daemon thread that samples the stacks of threads being profiled.
+
+    There's one sampler per sampling interval, shared by all the
+    `SamplingProfile`s that use that interval. It sleeps on a condition while
+    no profile is running.
+    '''
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.profiles = {}
+        '''Mapping from running profile to `(thread_id, root_frame)`.'''
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(
+            target=self._run, name='cute_profile sampler (%ss)' % interval,
+            daemon=True
+        )
+        self.thread.start()
+
+
+    def add(self, profile, thread_id, root_frame):
+        with self.condition:
+            self.profiles[profile] = (thread_id, root_frame)
+            self.condition.notify()
+
+
+    def remove(self, profile):
+        with self.condition:
+            del self.profiles[profile]
+
+
+    def _run(self):
+        condition = self.condition
+        profiles = self.profiles
+        while True:
+            with condition:
+                while not profiles:
+                    condition.wait()
+                items = list(profiles.items())
+            # Walking the stacks is done without holding `condition`, so
+            # threads calling `add` or `remove` don't block on it meanwhile.
+            frames = sys._current_frames()
+            stacks = []
+            for profile, (thread_id, root_frame) in items:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    stack = _get_stack(frame, root_frame)
+                    if stack is not None:
+                        stacks.append((profile, stack))
+            del frames, frame, items
+            if stacks:
+                with condition:
+                    for profile, stack in stacks:
+                        # A profile that was removed meanwhile already
+                        # finished, don't touch its results.
+                        if profile in profiles:
+                            profile._add_stack(stack)
+                del stacks
+            time.sleep(self.interval)
+
+
+_sampler_codes = {_Sampler.add.__code__, _Sampler.remove.__code__}
+'''
+Code objects of `_Sampler` methods that `runcall` calls in the profiled thread.
+'''
+
+
+def _get_stack(frame, root_frame):
+    '''
+    Get the stack of labels from `root_frame` (exclusive) to `frame`.
+
+    Returns `None` if `frame` isn't inside `root_frame`, if it's `root_frame`
+    itself, or if the thread is inside `runcall`'s own calls to the sampler.
+    '''
+    labels = []
+    outermost_frame = None
+    while frame is not root_frame:
+        if frame is None: # The thread isn't inside the call.
+            return None
+        labels.append(_get_label(frame.f_code))
+        outermost_frame = frame
+        frame = frame.f_back
+    if outermost_frame is None or \
+                                 outermost_frame.f_code in _sampler_codes:
+        return None
+    labels.reverse()
+    return tuple(labels)
+
+
+_samplers = {}
+'''Mapping from sampling interval to its `_Sampler`.'''
+_samplers_lock = threading.Lock()
+
+
+def _get_sampler(interval):
+    with _samplers_lock:
+        try:
+            return _samplers[interval]
+        except KeyError:
+            sampler = _samplers[interval] = _Sampler(interval)
+            return sampler
+
+
+class SamplingProfile:
+    '''
+    A statistical profile, made by sampling the stack of the profiled thread.
+
+    Use `runcall` to profile a call: While it runs, a background thread
+    looks at the call's stack every `interval` seconds using
+    `sys._current_frames`, and counts how many times each stack was seen.
+    Unlike `cProfile`, the profiled code runs at full speed, so this is
+    cheap enough to use on production traffic.
+
+    The result is in collapsed-stack format, which flame graph tools read:
+    Get it with `get_collapsed_stacks`, or print it with `print_stats`.
+    Calls that take less than `interval` may get no samples at all.
+    '''
+
+    def __init__(self, interval=0.001):
+        if interval <= 0:
+            raise ValueError('`interval` must be positive, got %r.' %
+                             (interval,))
+        self.interval = interval
+        '''The time between samples, in seconds.'''
+
+        self.stacks = collections.Counter()
+        '''
+        Mapping from stack to the number of samples that saw it.
+
+        A stack is a tuple of labels of the functions in it, outermost first.
+        '''
+
+        self.n_samples = 0
+
+        self.duration = 0.0
+        '''The total time that profiled calls took, in seconds.'''
+
+
+    def runcall(self, function, *args, **kwargs):
+        '''Call `function` with the arguments, profiling it, and return.'''
+        sampler = _get_sampler(self.interval)
+        sampler.add(self, threading.get_ident(), sys._getframe())
+        start_time = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.duration += time.perf_counter() - start_time
+            sampler.remove(self)
+
+
+    def _add_stack(self, stack):
+        self.stacks[stack] += 1
+        self.n_samples += 1
+
+
+    def get_collapsed_stacks(self):
+        '''Get the stacks in collapsed-stack format, most common first.'''
+        return format_collapsed_stacks(self.stacks)
+
+
+    def print_stats(self, sort=-1):
+        '''
+        Print the collapsed stacks with a summary line.
+
+        `sort` is accepted for compatibility with `cProfile.Profile` and is
+        ignored; stacks are always sorted by their number of samples.
+        '''
+        print('%s samples every %ss in %.3f seconds' %
+              (self.n_samples, self.interval, self.duration))
+        print(self.get_collapsed_stacks())
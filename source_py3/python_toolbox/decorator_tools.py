@@ -9,14 +9,106 @@ import types
 
 from python_toolbox.third_party import decorator as michele_decorator_module
 
-def decorator(caller, func=None):
+
+_reserved_names = frozenset(('_call_', '_func_'))
+
+_factories = {}
+'''
+Mapping from a signature shape to a factory of decorated functions.
+
+A shape is `(arg_names, varargs_name, kwonly_arg_names, varkw_name)`.
+'''
+
+
+def _get_shape(func):
     '''
-    Create a decorator.
+    Get the signature shape of `func`, or `None` if it can't be made here.
     
-    `decorator(caller)` converts a caller function into a decorator;
-    `decorator(caller, func)` decorates a function using a caller.
+    Defaults aren't part of the shape; they're copied to the decorated
+    function as `__defaults__` and `__kwdefaults__`.
     '''
-    if func is not None: # returns a decorated function
+    if type(func) is not types.FunctionType:
+        return None
+    code = func.__code__
+    n_args = code.co_argcount
+    n_kwonly_args = code.co_kwonlyargcount
+    if getattr(code, 'co_posonlyargcount', 0):
+        return None
+    names = code.co_varnames
+    arg_names = names[:n_args]
+    kwonly_arg_names = names[n_args:n_args + n_kwonly_args]
+    position = n_args + n_kwonly_args
+    if code.co_flags & inspect.CO_VARARGS:
+        varargs_name = names[position]
+        position += 1
+    else:
+        varargs_name = None
+    varkw_name = names[position] if code.co_flags & inspect.CO_VARKEYWORDS \
+                                                                      else None
+    shape = (arg_names, varargs_name, kwonly_arg_names, varkw_name)
+    all_names = arg_names + kwonly_arg_names + (varargs_name, varkw_name)
+    if _reserved_names.intersection(all_names):
+        return None
+    return shape
+
+
+def _get_factory(shape):
+    '''
+    Get a function that makes decorated functions of the given shape.
+    
+    The factory takes `(caller, func)` and returns a function with the same
+    parameters as `func`, that calls `caller(func, ...)` with them. The source
+    of each factory is compiled only once.
+    '''
+    try:
+        return _factories[shape]
+    except KeyError:
+        pass
+    (arg_names, varargs_name, kwonly_arg_names, varkw_name) = shape
+    parameters = list(arg_names)
+    arguments = list(arg_names)
+    if varargs_name:
+        parameters.append('*' + varargs_name)
+        arguments.append('*' + varargs_name)
+    elif kwonly_arg_names:
+        parameters.append('*')
+    parameters.extend(kwonly_arg_names)
+    arguments.extend('%s=%s' % (name, name) for name in kwonly_arg_names)
+    if varkw_name:
+        parameters.append('**' + varkw_name)
+        arguments.append('**' + varkw_name)
+    source = (
+        'def _make_(_call_, _func_):\n'
+        '    def _decorated_(%s):\n'
+        '        return _call_(_func_, %s)\n'
+        '    return _decorated_\n' % (', '.join(parameters),
+                                     ', '.join(arguments))
+    )
+    namespace = {}
+    exec(compile(source, '<decorator_tools>', 'exec'), namespace)
+    factory = _factories[shape] = namespace['_make_']
+    return factory
+
+
+def _rename_code(code, name):
+    '''Get a copy of `code` with the function name `name`.'''
+    if hasattr(code, 'replace'): # Python 3.8 and upwards
+        return code.replace(co_name=name)
+    return types.CodeType(
+        code.co_argcount, code.co_kwonlyargcount, code.co_nlocals,
+        code.co_stacksize, code.co_flags, code.co_code, code.co_consts,
+        code.co_names, code.co_varnames, code.co_filename, name,
+        code.co_firstlineno, code.co_lnotab, code.co_freevars,
+        code.co_cellvars
+    )
+
+
+def _decorate(caller, func):
+    '''Decorate `func` with `caller`, keeping its signature.'''
+    shape = _get_shape(func)
+    if shape is None:
+        # Not a plain Python function, or its parameters clash with the
+        # names we use; `FunctionMaker` handles these as it always did.
         evaldict = func.__globals__.copy()
         evaldict['_call_'] = caller
         evaldict['_func_'] = func
@@ -25,19 +117,54 @@ def decorator(caller, func=None):
             evaldict, undecorated=func)
         result.__wrapped__ = func
         return result
+    result = _get_factory(shape)(caller, func)
+    result.__code__ = _rename_code(result.__code__, func.__name__)
+    result.__defaults__ = func.__defaults__
+    result.__kwdefaults__ = func.__kwdefaults__
+    functools.update_wrapper(result, func)
+    result.undecorated = func
+    try:
+        result.__signature__ = func.__signature__
+    except AttributeError:
+        pass
+    return result
+
+
+def decorator(caller, func=None):
+    '''
+    Create a decorator.
+    
+    `decorator(caller)` converts a caller function into a decorator;
+    `decorator(caller, func)` decorates a function using a caller.
+    
+    The decorated function has the same signature as `func`, (same parameter
+    names, defaults and annotations,) and calls `caller(func, ...)` with its
+    arguments: the positional parameters are passed positionally, with their
+    defaults filled in, and keyword-only parameters are passed as keywords.
+    The decorated function's `__wrapped__` is `func`.
+    
+    The code of decorated functions is compiled once for each signature shape
+    and reused, so decorating is cheap. Functions that can't be handled that
+    way fall back to `decorator.FunctionMaker`, which compiles new code each
+    time.
+    '''
+    if func is not None: # returns a decorated function
+        return _decorate(caller, func)
     else: # returns a decorator
         if isinstance(caller, functools.partial):
             return functools.partial(decorator, caller)
         # otherwise assume caller is a function
-        first = inspect.getargspec(caller)[0][0] # first arg
-        evaldict = caller.__globals__.copy()
-        evaldict['_call_'] = caller
-        evaldict['decorator'] = decorator
-        return michele_decorator_module.FunctionMaker.create(
-            '%s(%s)' % (caller.__name__, first), 
-            'return decorator(_call_, %s)' % first,
-            evaldict, undecorated=caller,
-            doc=caller.__doc__, module=caller.__module__)
+        first = caller.__code__.co_varnames[0] # first arg
+        if first in _reserved_names:
+            first = 'function'
+        result = _get_factory(((first,), None, (), None))(decorator, caller)
+        result.__code__ = _rename_code(result.__code__, caller.__name__)
+        result.__name__ = caller.__name__
+        result.__qualname__ = caller.__qualname__
+        result.__doc__ = caller.__doc__
+        result.__module__ = caller.__module__
+        result.undecorated = caller
+        return result
 
  
 def helpful_decorator_builder(decorator_builder):
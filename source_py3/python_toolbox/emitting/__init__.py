@@ -5,5 +5,7 @@
 An emitter mechanism, a variation on the publisher-subscriber design pattern.
 '''
 
-from .emitter import Emitter
-from .emitter_system import EmitterSystem
\ No newline at end of file
+from .emitter import Emitter, EmitFailure
+from .emitter_system import EmitterSystem
+from .dispatching import (Dispatcher, ThreadPoolDispatcher,
+                          AsyncioDispatcher, DispatchMetrics)
\ No newline at end of file
@@ -0,0 +1,393 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+Defines dispatchers, which decide how an emitter calls a callable output.
+
+By default an emitter calls its callable outputs inline, in the emitting
+thread. Adding a callable output with a dispatcher, e.g.
+`emitter.add_output(function, dispatcher=thread_pool_dispatcher)`, lets the
+dispatcher call it instead, so slow callables don't stall the emitting thread.
+
+See the documentation of the dispatcher classes for more info.
+'''
+
+import asyncio
+import queue as queue_module
+import sys
+import threading
+import time
+import traceback
+
+
+class DispatchMetrics:
+    '''
+    Metrics of a dispatcher: Its queue depth and its handlers' latency.
+
+    The latency of a call is the time from the emit until the callable output
+    returns, so it includes the time that the call waited in the queue.
+    '''
+    def __init__(self):
+        self.queue_depth = 0
+        '''The number of calls that are waiting in the queue right now.'''
+
+        self.max_queue_depth = 0
+        '''The largest queue depth seen.'''
+
+        self.n_calls = 0
+        '''The number of calls that finished, including failed ones.'''
+
+        self.n_failed = 0
+        '''The number of calls that raised an exception.'''
+
+        self.n_dropped = 0
+        '''The number of calls dropped because the queue was full.'''
+
+        self.total_latency = 0.0
+        '''The total latency of all the finished calls, in seconds.'''
+
+        self.max_latency = 0.0
+        '''The largest latency of a finished call, in seconds.'''
+
+
+    @property
+    def mean_latency(self):
+        '''The mean latency of the finished calls, in seconds.'''
+        return self.total_latency / self.n_calls if self.n_calls else 0.0
+
+
+    def _copy(self):
+        dispatch_metrics = DispatchMetrics()
+        dispatch_metrics.__dict__.update(self.__dict__)
+        return dispatch_metrics
+
+
+    def __repr__(self):
+        return ('<%s: queue_depth=%s, max_queue_depth=%s, n_calls=%s, '
+                'n_failed=%s, n_dropped=%s, mean_latency=%.6f, '
+                'max_latency=%.6f>' % (
+                    type(self).__name__, self.queue_depth,
+                    self.max_queue_depth, self.n_calls, self.n_failed,
+                    self.n_dropped, self.mean_latency, self.max_latency
+                ))
+
+
+class DispatchedCallable:
+    '''
+    A callable output that's called through a dispatcher.
+
+    This is what `Emitter.add_output(function, dispatcher=...)` actually adds
+    as an output. Two `DispatchedCallable`s are equal if they have the same
+    function and dispatcher.
+    '''
+    __slots__ = ('function', 'dispatcher')
+
+    def __init__(self, function, dispatcher):
+        self.function = function
+        self.dispatcher = dispatcher
+
+
+    def __call__(self):
+        self.dispatcher.dispatch(self.function)
+
+
+    def __eq__(self, other):
+        return type(other) is DispatchedCallable and \
+               self.function == other.function and \
+               self.dispatcher is other.dispatcher
+
+
+    def __ne__(self, other):
+        return not self == other
+
+
+    def __hash__(self):
+        return hash((self.function, id(self.dispatcher)))
+
+
+    def __repr__(self):
+        return '<%s: %r via %r>' % (type(self).__name__, self.function,
+                                    self.dispatcher)
+
+
+class Dispatcher:
+    '''
+    A dispatcher that calls callable outputs inline, in the emitting thread.
+
+    This is what emitters do anyway; the only reason to use this dispatcher is
+    to collect metrics on the handlers' latency. It's also the base class of
+    the other dispatchers.
+    '''
+    def __init__(self, name=None):
+        self.name = name
+        '''The dispatcher's name.'''
+
+        self._metrics = DispatchMetrics()
+        self._metrics_lock = threading.Lock()
+
+
+    def wrap(self, function):
+        '''Get a callable that calls `function` through this dispatcher.'''
+        return DispatchedCallable(function, self)
+
+
+    def dispatch(self, function):
+        '''Call `function` according to the dispatch policy.'''
+        self._call(function, time.perf_counter())
+
+
+    def _call(self, function, emit_time):
+        '''
+        Call `function` and record the call in the metrics.
+
+        `emit_time` is the `time.perf_counter()` of the emit.
+        '''
+        try:
+            function()
+        except Exception:
+            self._record_call(emit_time, failed=True)
+            raise
+        else:
+            self._record_call(emit_time)
+
+
+    def _record_call(self, emit_time, failed=False):
+        latency = time.perf_counter() - emit_time
+        with self._metrics_lock:
+            metrics = self._metrics
+            metrics.n_calls += 1
+            metrics.n_failed += failed
+            metrics.total_latency += latency
+            if latency > metrics.max_latency:
+                metrics.max_latency = latency
+
+
+    def _change_queue_depth(self, difference):
+        with self._metrics_lock:
+            metrics = self._metrics
+            metrics.queue_depth += difference
+            if metrics.queue_depth > metrics.max_queue_depth:
+                metrics.max_queue_depth = metrics.queue_depth
+
+
+    def get_metrics(self):
+        '''Get a snapshot of this dispatcher's `DispatchMetrics`.'''
+        with self._metrics_lock:
+            return self._metrics._copy()
+
+
+    def reset_metrics(self):
+        '''Reset the metrics, except for the current queue depth.'''
+        with self._metrics_lock:
+            queue_depth = self._metrics.queue_depth
+            self._metrics = DispatchMetrics()
+            self._metrics.queue_depth = self._metrics.max_queue_depth = \
+                                                                   queue_depth
+
+
+    def __repr__(self):
+        return '<%s %sat %s>' % (
+            type(self).__name__,
+            ''.join(("'", self.name, "' ")) if self.name else '',
+            hex(id(self))
+        )
+
+
+def _report_exception(function):
+    '''Default exception handler for dispatchers: Print the traceback.'''
+    sys.stderr.write('Exception in callable output %r:\n' % (function,))
+    traceback.print_exc()
+
+
+class _QueueingDispatcher(Dispatcher):
+    '''
+    Base class for dispatchers that queue the calls to be made elsewhere.
+
+    The queue holds at most `queue_size` calls. When it's full, `overflow`
+    decides what happens when more calls are dispatched: `'block'` makes the
+    emitting thread wait for room in the queue, and `'drop'` drops the call
+    and counts it in the metrics' `n_dropped`.
+
+    Exceptions raised by the callable outputs can't propagate to the emitting
+    thread, so they're passed to `exception_handler`, which gets the function
+    that raised and is called inside the `except` clause. By default the
+    traceback is printed.
+    '''
+    def __init__(self, queue_size=1000, overflow='block',
+                 exception_handler=_report_exception, name=None):
+        if queue_size < 1:
+            raise ValueError('`queue_size` must be at least 1.')
+        if overflow not in ('block', 'drop'):
+            raise ValueError("`overflow` must be either `'block'` or "
+                             "`'drop'`, not %r." % (overflow,))
+        Dispatcher.__init__(self, name=name)
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.exception_handler = exception_handler
+
+
+    def _call_and_handle_exceptions(self, function, emit_time):
+        try:
+            self._call(function, emit_time)
+        except Exception:
+            self.exception_handler(function)
+
+
+class ThreadPoolDispatcher(_QueueingDispatcher):
+    '''
+    A dispatcher that calls callable outputs in a pool of worker threads.
+
+    `n_threads` worker threads take calls from a queue of up to `queue_size`
+    calls. With a single thread, which is the default, the calls are made in
+    the same order they were dispatched. See `_QueueingDispatcher` for the
+    `overflow` and `exception_handler` arguments.
+
+    The worker threads are daemon threads that are started lazily. Call
+    `join` to wait for all the queued calls to finish, and `shutdown` to stop
+    the threads.
+    '''
+    def __init__(self, n_threads=1, queue_size=1000, overflow='block',
+                 exception_handler=_report_exception, name=None):
+        if n_threads < 1:
+            raise ValueError('`n_threads` must be at least 1.')
+        _QueueingDispatcher.__init__(
+            self, queue_size=queue_size, overflow=overflow,
+            exception_handler=exception_handler, name=name
+        )
+        self.n_threads = n_threads
+        self._queue = queue_module.Queue(maxsize=queue_size)
+        self._threads = []
+        self._threads_lock = threading.Lock()
+        self._is_shut_down = False
+
+
+    def _start_threads(self):
+        with self._threads_lock:
+            if self._is_shut_down:
+                raise RuntimeError("Can't dispatch after `shutdown`.")
+            while len(self._threads) < self.n_threads:
+                thread = threading.Thread(
+                    target=self._work,
+                    name='%r worker' % self
+                )
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+
+    def _work(self):
+        queue = self._queue
+        while True:
+            function, emit_time = queue.get()
+            try:
+                if function is None:
+                    return
+                self._change_queue_depth(-1)
+                self._call_and_handle_exceptions(function, emit_time)
+            finally:
+                queue.task_done()
+
+
+    def dispatch(self, function):
+        '''Queue a call to `function`, to be made by a worker thread.'''
+        if len(self._threads) < self.n_threads or self._is_shut_down:
+            self._start_threads()
+        item = (function, time.perf_counter())
+        self._change_queue_depth(1)
+        try:
+            if self.overflow == 'block':
+                self._queue.put(item)
+            else: # self.overflow == 'drop'
+                self._queue.put_nowait(item)
+        except queue_module.Full:
+            self._change_queue_depth(-1)
+            with self._metrics_lock:
+                self._metrics.n_dropped += 1
+
+
+    def join(self):
+        '''Wait until all the queued calls are done.'''
+        self._queue.join()
+
+
+    def shutdown(self, wait=True):
+        '''
+        Stop the worker threads after they make all the queued calls.
+
+        If `wait` is `True`, wait for them to stop.
+        '''
+        with self._threads_lock:
+            self._is_shut_down = True
+            threads = self._threads
+        for _ in threads:
+            self._queue.put((None, None))
+        if wait:
+            for thread in threads:
+                thread.join()
+
+
+class AsyncioDispatcher(_QueueingDispatcher):
+    '''
+    A dispatcher that calls callable outputs in an asyncio event loop.
+
+    The calls are scheduled on `loop` with `call_soon_threadsafe`, so you can
+    emit from any thread, and the callable outputs will be called in the
+    loop's thread. At most `queue_size` calls may be waiting in the loop. See
+    `_QueueingDispatcher` for the `overflow` and `exception_handler`
+    arguments. Note that when emitting from the loop's own thread, waiting
+    would deadlock, so calls are never blocked there, even if `overflow` is
+    `'block'`.
+    '''
+    def __init__(self, loop, queue_size=1000, overflow='block',
+                 exception_handler=_report_exception, name=None):
+        _QueueingDispatcher.__init__(
+            self, queue_size=queue_size, overflow=overflow,
+            exception_handler=exception_handler, name=name
+        )
+        self.loop = loop
+        self._n_pending = 0
+        self._room_condition = threading.Condition(threading.Lock())
+
+
+    def _is_in_loop_thread(self):
+        '''Get whether we're running in `self.loop`'s thread.'''
+        try:
+            get_running_loop = asyncio.get_running_loop
+        except AttributeError: # Python 3.6 only has the private version.
+            return asyncio._get_running_loop() is self.loop
+        try:
+            return get_running_loop() is self.loop
+        except RuntimeError: # No event loop is running in this thread.
+            return False
+
+
+    def _run(self, function, emit_time):
+        with self._room_condition:
+            self._n_pending -= 1
+            self._room_condition.notify()
+        self._change_queue_depth(-1)
+        self._call_and_handle_exceptions(function, emit_time)
+
+
+    def dispatch(self, function):
+        '''Schedule a call to `function` in the event loop.'''
+        emit_time = time.perf_counter()
+        with self._room_condition:
+            if self._n_pending >= self.queue_size:
+                if self.overflow == 'drop':
+                    with self._metrics_lock:
+                        self._metrics.n_dropped += 1
+                    return
+                elif not self._is_in_loop_thread():
+                    while self._n_pending >= self.queue_size:
+                        self._room_condition.wait()
+            self._n_pending += 1
+        self._change_queue_depth(1)
+        try:
+            self.loop.call_soon_threadsafe(self._run, function, emit_time)
+        except BaseException: # e.g. `RuntimeError` if the loop is closed.
+            with self._room_condition:
+                self._n_pending -= 1
+                self._room_condition.notify()
+            self._change_queue_depth(-1)
+            raise
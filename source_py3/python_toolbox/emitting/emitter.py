@@ -7,19 +7,221 @@ Defines the `Emitter` class.
 See its documentation for more info.
 '''
 
-# todo: there should probably be some circularity check. Maybe actually
-# circularity should be permitted?
-
 # todo: make some way to emit from multiple emitters simulataneously, saving
 # redundant calls to shared callable outputs.
 
 import itertools
 import collections
 import functools
+import types
+import weakref
 
 from python_toolbox import cute_iter_tools
 from python_toolbox import misc_tools
 from python_toolbox import address_tools
+from python_toolbox import exceptions
+from python_toolbox import freezing
+
+from .dispatching import DispatchedCallable
+
+
+def _recalculate_total_callable_outputs(emitters):
+    '''
+    Recalculate the total callable outputs caches of a set of emitters.
+    
+    `emitters` must include every emitter whose cache might be stale, along
+    with all of their inputs, recursively. The caches of any other emitters
+    are assumed to be correct.
+    
+    The emitters are split into strongly connected components, (i.e. groups
+    of emitters that are each other's outputs, directly or indirectly,)
+    which are handled in reverse topological order, so every emitter is
+    handled after its outputs. All the emitters in a component have the same
+    total callable outputs. This is Tarjan's algorithm, done without
+    recursion so big emitter graphs won't exceed the recursion limit.
+    '''
+    emitters = set(emitters)
+    index_counter = itertools.count()
+    indices = {}
+    lowlinks = {}
+    stack = []
+    on_stack = set()
+    
+    def visit(emitter):
+        indices[emitter] = lowlinks[emitter] = next(index_counter)
+        stack.append(emitter)
+        on_stack.add(emitter)
+        return (emitter, iter(emitter._get_emitter_outputs()))
+    
+    for root in emitters:
+        if root in indices:
+            continue
+        work = [visit(root)]
+        while work:
+            emitter, outputs = work[-1]
+            for output in outputs:
+                if output not in emitters:
+                    continue
+                if output not in indices:
+                    work.append(visit(output))
+                    break
+                elif output in on_stack:
+                    lowlinks[emitter] = min(lowlinks[emitter], indices[output])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlinks[parent] = min(lowlinks[parent], lowlinks[emitter])
+                if lowlinks[emitter] == indices[emitter]:
+                    component = set()
+                    while True:
+                        member = stack.pop()
+                        on_stack.remove(member)
+                        component.add(member)
+                        if member is emitter:
+                            break
+                    _set_component_total_callable_outputs(component)
+                    
+                    
+def _set_component_total_callable_outputs(component):
+    '''
+    Set the total callable outputs cache for a strongly connected component.
+    
+    The caches of all emitter outputs outside the component must be correct.
+    '''
+    serial_numbers = {}
+    for emitter in component:
+        for output, serial_number in \
+                              emitter._callable_output_serial_numbers.items():
+            _merge_serial_number(serial_numbers, output, serial_number)
+        for output in emitter._outputs:
+            if isinstance(output, Emitter) and output not in component:
+                for callable_output, serial_number in \
+                      output._total_callable_outputs_serial_numbers.items():
+                    _merge_serial_number(serial_numbers, callable_output,
+                                         serial_number)
+    for emitter in component:
+        emitter._set_total_callable_outputs(dict(serial_numbers))
+
+        
+def _merge_serial_number(serial_numbers, callable_output, serial_number):
+    '''Put `serial_number` in `serial_numbers` if it's the smallest one.'''
+    if serial_numbers.get(callable_output, serial_number) >= serial_number:
+        serial_numbers[callable_output] = serial_number
+        
+        
+infinity = float('inf')
+
+_serial_numbers = itertools.count()
+'''Serial numbers given to callable outputs in the order they're added.'''
+
+_dead_weak_callables = []
+'''
+`(emitter_ref, weak_callable)` pairs of weak callable outputs that died.
+
+These are appended to by weakref callbacks, which may run at any time, and
+are pruned from their emitters in a batch by `_prune_dead_weak_callables`.
+'''
+
+
+def _prune_dead_weak_callables():
+    '''
+    Remove dead weak callable outputs from their emitters.
+    
+    The total callable outputs caches of all the affected emitters are
+    recalculated together, once.
+    '''
+    dead_weak_callables = set()
+    affected_emitters = set()
+    while _dead_weak_callables:
+        try:
+            emitter_ref, weak_callable = _dead_weak_callables.pop()
+        except IndexError: # Another thread got it first.
+            break
+        emitter = emitter_ref()
+        if emitter is not None:
+            dead_weak_callables.add(weak_callable)
+            affected_emitters.add(emitter)
+    for emitter in affected_emitters:
+        for output in tuple(emitter._outputs):
+            if output in dead_weak_callables or \
+                                (isinstance(output, DispatchedCallable) and
+                                 output.function in dead_weak_callables):
+                emitter._outputs.remove(output)
+                del emitter._callable_output_serial_numbers[output]
+    if affected_emitters:
+        _recalculate_total_callable_outputs(
+            emitter for emitter in
+            set().union(*(emitter._get_total_inputs() for emitter in
+                          affected_emitters))
+            if not emitter._is_cache_rebuilding_frozen
+        )
+        
+        
+class WeakCallable:
+    '''
+    A callable output that's referenced weakly.
+    
+    This is what `Emitter.add_output(function, weak=True)` actually adds as an
+    output. Calling it calls the function if it's still alive. When the
+    function dies, the `WeakCallable` is removed from the emitter's outputs.
+    (In a batch with any others that died, the next time the emitter system is
+    used.) Bound methods are referenced with `weakref.WeakMethod`, so they
+    stay alive as long as their object does.
+    '''
+    __slots__ = ('_ref', '_hash', '__weakref__')
+    
+    def __init__(self, function, emitter):
+        emitter_ref = weakref.ref(emitter)
+        self_ref = weakref.ref(self)
+        def callback(ref):
+            weak_callable = self_ref()
+            if weak_callable is not None:
+                _dead_weak_callables.append((emitter_ref, weak_callable))
+        if isinstance(function, types.MethodType):
+            self._ref = weakref.WeakMethod(function, callback)
+        else:
+            self._ref = weakref.ref(function, callback)
+        self._hash = hash(self._ref)
+        
+    @property
+    def function(self):
+        '''The function, or `None` if it's dead.'''
+        return self._ref()
+        
+    def __call__(self):
+        function = self._ref()
+        if function is not None:
+            function()
+            
+    def __eq__(self, other):
+        return type(other) is WeakCallable and self._ref == other._ref
+    
+    def __ne__(self, other):
+        return not self == other
+    
+    def __hash__(self):
+        return self._hash
+    
+    def __repr__(self):
+        return '<%s: %r>' % (type(self).__name__, self._ref())
+        
+        
+class EmitFailure(exceptions.CuteException):
+    '''
+    One or more callable outputs raised an exception while emitting.
+    
+    Raised by emitters with `collect_exceptions` turned on. The exceptions are
+    available as the `.exceptions` list, in the order they were raised.
+    '''
+    def __init__(self, exceptions):
+        self.exceptions = exceptions
+        super().__init__(
+            '%s callable output%s raised an exception while emitting: %s' % (
+                len(exceptions), '' if len(exceptions) == 1 else 's',
+                ', '.join(map(repr, exceptions))
+            )
+        )
         
 
 class Emitter:
@@ -47,6 +249,29 @@ class Emitter:
     
     The callables that you register as outputs are functions that need to be
     called when the original event that caused the `emit` action happens.
+    
+    Each emitter caches its total callable outputs. Connecting emitters or
+    callables updates only the caches of the affected emitter and its inputs,
+    recursively. Emitters may be connected in cycles, in which case all the
+    emitters in the cycle have the same total callable outputs.
+    
+    The callable outputs are called in the order in which they were added as
+    outputs. (A callable that's reachable in more than one way is called once,
+    in the place of the earliest connection.) If `collect_exceptions` is on,
+    an exception raised by one callable output doesn't stop the others from
+    being called; instead, all the exceptions are raised together as an
+    `EmitFailure` when the emit is done.
+    
+    To collapse a burst of emits into a single one, emit inside the
+    `coalescing_freezer`, e.g.:
+    
+        with emitter.coalescing_freezer:
+            for item in items:
+                update(item)
+                emitter.emit()
+    
+    The callable outputs will then be called only once, when the outermost
+    `with` block exits, and only if `emit` was called inside it.
     '''
     # todo: Let user put a single input/output
     
@@ -54,7 +279,8 @@ class Emitter:
     _is_atomically_pickleable = False
 
     
-    def __init__(self, inputs=(), outputs=(), name=None):
+    def __init__(self, inputs=(), outputs=(), name=None,
+                 collect_exceptions=False):
         '''
         Construct the emitter.
         
@@ -64,6 +290,10 @@ class Emitter:
         callables.
         
         `name` is a string name for the emitter.
+        
+        If `collect_exceptions` is `True`, exceptions raised by callable
+        outputs will not stop the emit; they will be raised together as an
+        `EmitFailure` after all the callable outputs were called.
         '''
 
         assert cute_iter_tools.is_iterable(inputs) and \
@@ -73,23 +303,36 @@ class Emitter:
         '''The emitter's inputs.'''
         
         self._outputs = set()
-        '''The emitter's inputs.'''
+        '''The emitter's outputs.'''
         
-        for output in outputs:
-            self.add_output(output)
-                        
-        self.__total_callable_outputs_cache = None
+        self._callable_output_serial_numbers = {}
+        '''Mapping from each direct callable output to its serial number.'''
+        
+        self._total_callable_outputs_serial_numbers = {}
+        '''
+        Mapping from each total callable output to its serial number.
+        
+        When a callable is reachable in more than one way, the smallest serial
+        number is used.
+        '''
+        
+        self._total_callable_outputs_cache = ()
         '''
-        A cache of total callable outputs.
+        A cache of total callable outputs, as a tuple in calling order.
         
         This means the callable outputs of this emitter and any output
         emitters.
         '''
         
-        self._recalculate_total_callable_outputs()        
-
-        # We made sure to create the callable outputs cache before we add
-        # inputs, so when we update their cache, it could use ours.
+        self.collect_exceptions = collect_exceptions
+        '''Whether to collect exceptions from callable outputs and go on.'''
+        
+        self._coalesced_emit_pending = False
+        '''Whether `emit` was called while the emitter was coalescing.'''
+        
+        for output in outputs:
+            self.add_output(output)
+                        
         for input in inputs:
             self.add_input(input)
 
@@ -102,89 +345,91 @@ class Emitter:
     
     def get_outputs(self):
         '''Get the emitter's outputs.'''
+        if _dead_weak_callables:
+            _prune_dead_weak_callables()
         return self._outputs
+    
+    _is_cache_rebuilding_frozen = False
+    '''
+    Whether the total callable outputs cache shouldn't be rebuilt right now.
+    
+    This is always `False` for plain emitters.
+    '''
                 
-    def _get_input_layers(self):
+    def _get_total_inputs(self):
         '''
-        Get the emitter's inputs as a list of layers.
-        
-        Every item in the list will be a list of emitters on that layer. For
-        example, the first item will be a list of direct inputs of our emitter.
-        The second item will be a list of *their* inputs. Etc.
+        Get this emitter and all of its inputs, recursively, as a set.
         
-        Every emitter can appear only once in this scheme: It would appear on
-        the closest layer that it's on.
+        These are all the emitters whose total callable outputs may change
+        when this emitter's outputs change.
         '''
-
-        input_layers = [self._inputs]
-        current_layer = self._inputs
-        while current_layer:
-            
-            next_layer = functools.reduce(
-                set.union,
-                (input._inputs for input in current_layer),
-                set()
-            )
-            
-            for ancestor_layer in input_layers:
-                assert isinstance(next_layer, set)
-                next_layer -= ancestor_layer
-
-            input_layers.append(next_layer)
-            
-            current_layer = next_layer        
-
-        
-        # assert sum(len(layer) for layer in input_layers) == \
-        #        len(reduce(set.union, input_layers, set()))
-            
-        return input_layers
+        total_inputs = {self}
+        emitters_to_visit = [self]
+        while emitters_to_visit:
+            for input in emitters_to_visit.pop()._inputs:
+                if input not in total_inputs:
+                    total_inputs.add(input)
+                    emitters_to_visit.append(input)
+        return total_inputs
                 
         
     def _recalculate_total_callable_outputs_recursively(self):
         '''
-        Recalculate `__total_callable_outputs_cache` recursively.
+        Recalculate `_total_callable_outputs_cache` recursively.
         
-        This will to do the recalculation for this emitter and all its inputs.
+        This will to do the recalculation for this emitter and all its inputs,
+        recursively, but for no other emitters. This is needed after
+        callables became unreachable from this emitter.
         '''
+        _recalculate_total_callable_outputs(self._get_total_inputs())
         
-        # todo: I suspect this wouldn't work for the following case. `self` has
-        # inputs `A` and `B`. `A` has input `B`. A callable output `func` was
-        # just removed from `self`, so this function got called. We update the
-        # cache here, then take the first input layer, which is `A` and `B` in
-        # some order. Say `B` is first. Now, we do `recalculate` on `B`, but
-        # `A` still got the cache with `func`, and `B` will take that. I need
-        # to test this.
-        # 
-        # I have an idea how to solve it: In the getter of the cache, check the
-        # cache exists, otherwise rebuild. The reason we didn't do it up to now
-        # was to optimize for speed, but only `emit` needs to be fast and it
-        # doesn't use the getter. We'll clear the caches of all inputs, and
-        # they'll rebuild as they call each other.
-        
-        self._recalculate_total_callable_outputs()
-        input_layers = self._get_input_layers()
-        for input_layer in input_layers:
-            for input in input_layer:
-                input._recalculate_total_callable_outputs()
         
-        
-    def _recalculate_total_callable_outputs(self):
+    def _add_total_callable_outputs_recursively(self, serial_numbers):
         '''
-        Recalculate `__total_callable_outputs_cache` for this emitter.
+        Add callables to `_total_callable_outputs_cache` recursively.
         
-        This will to do the recalculation for this emitter and all its inputs.
+        `serial_numbers` is a mapping from callables to their serial numbers.
+        This is needed after these callables became reachable from this
+        emitter. The callables are added to the cache of this emitter and its
+        inputs, recursively, stopping at inputs that already have them with
+        the same or smaller serial numbers.
         '''
-        children_callable_outputs = functools.reduce(
-            set.union,
-            (emitter.get_total_callable_outputs() for emitter
-             in self._get_emitter_outputs() if emitter is not self),
-            set()
+        emitters_and_new_serial_numbers = collections.deque(
+            ((self, serial_numbers),)
         )
+        while emitters_and_new_serial_numbers:
+            emitter, new_serial_numbers = \
+                                       emitters_and_new_serial_numbers.popleft()
+            old_serial_numbers = emitter._total_callable_outputs_serial_numbers
+            new_serial_numbers = {
+                callable_output: serial_number for
+                callable_output, serial_number in new_serial_numbers.items()
+                if old_serial_numbers.get(callable_output, infinity) >
+                                                                   serial_number
+            }
+            if not new_serial_numbers:
+                continue
+            serial_numbers = dict(old_serial_numbers)
+            serial_numbers.update(new_serial_numbers)
+            emitter._set_total_callable_outputs(serial_numbers)
+            for input in emitter._inputs:
+                emitters_and_new_serial_numbers.append(
+                    (input, new_serial_numbers)
+                )
+                
+                
+    def _set_total_callable_outputs(self, serial_numbers):
+        '''
+        Set the total callable outputs from a mapping to serial numbers.
         
-        self.__total_callable_outputs_cache = \
-            children_callable_outputs.union(self._get_callable_outputs())
+        The cache tuple is sorted by serial number, which is the calling order.
+        '''
+        self._total_callable_outputs_serial_numbers = serial_numbers
+        self._total_callable_outputs_cache = tuple(
+            sorted(serial_numbers, key=serial_numbers.__getitem__)
+        )
 
+        
     def add_input(self, emitter):
         '''
         Add an emitter as an input to this emitter.
@@ -195,7 +440,9 @@ class Emitter:
         assert isinstance(emitter, Emitter)
         self._inputs.add(emitter)
         emitter._outputs.add(self)
-        emitter._recalculate_total_callable_outputs_recursively()
+        emitter._add_total_callable_outputs_recursively(
+            self._total_callable_outputs_serial_numbers
+        )
         
     def remove_input(self, emitter):
         '''Remove an input from this emitter.'''
@@ -204,35 +451,77 @@ class Emitter:
         emitter._outputs.remove(self)
         emitter._recalculate_total_callable_outputs_recursively()
     
-    def add_output(self, thing):
+    def add_output(self, thing, dispatcher=None, weak=False):
         '''
         Add an emitter or a callable as an output to this emitter.
         
         If adding a callable, every time this emitter will emit the callable
-        will be called.
+        will be called. If you specify a `dispatcher`, (see the `dispatching`
+        module,) the dispatcher will be used to call the callable, e.g. in a
+        thread pool or an asyncio event loop. If you specify `weak=True`, the
+        emitter will reference the callable weakly, and will remove it from
+        its outputs when it dies.
         
         If adding an emitter, every time this emitter will emit the output
         emitter will emit as well.
         '''
         assert isinstance(thing, (Emitter, collections.Callable))
+        if _dead_weak_callables:
+            _prune_dead_weak_callables()
+        if isinstance(thing, Emitter):
+            if dispatcher is not None or weak:
+                raise ValueError("Can't use a dispatcher or a weak reference "
+                                 "for an emitter output, only for a callable "
+                                 "output.")
+        else:
+            if weak:
+                thing = WeakCallable(thing, self)
+            if dispatcher is not None:
+                thing = dispatcher.wrap(thing)
         self._outputs.add(thing)
         if isinstance(thing, Emitter):
             thing._inputs.add(self)
-        self._recalculate_total_callable_outputs_recursively()
+            self._add_total_callable_outputs_recursively(
+                thing._total_callable_outputs_serial_numbers
+            )
+        else:
+            if thing not in self._callable_output_serial_numbers:
+                self._callable_output_serial_numbers[thing] = \
+                                                          next(_serial_numbers)
+            self._add_total_callable_outputs_recursively(
+                {thing: self._callable_output_serial_numbers[thing]}
+            )
         
     def remove_output(self, thing):
-        '''Remove an output from this emitter.'''
+        '''
+        Remove an output from this emitter.
+        
+        A callable that was added with a dispatcher or as a weak reference may
+        be removed by passing the callable itself.
+        '''
         assert isinstance(thing, (Emitter, collections.Callable))
+        if _dead_weak_callables:
+            _prune_dead_weak_callables()
+        if thing not in self._outputs and not isinstance(thing, Emitter):
+            for output in self._outputs:
+                function = output
+                while isinstance(function, (DispatchedCallable, WeakCallable)):
+                    function = function.function
+                if function is not None and function == thing:
+                    thing = output
+                    break
         self._outputs.remove(thing)
         if isinstance(thing, Emitter):
             thing._inputs.remove(self)
+        else:
+            del self._callable_output_serial_numbers[thing]
         self._recalculate_total_callable_outputs_recursively()
         
     def disconnect_from_all(self): # todo: use the freeze here
         '''Disconnect the emitter from all its inputs and outputs.'''
-        for input in self._inputs: 
+        for input in tuple(self._inputs): 
             self.remove_input(input)
-        for output in self._outputs:
+        for output in tuple(self._outputs):
             self.remove_output(output)
         
     def _get_callable_outputs(self):
@@ -248,23 +537,101 @@ class Emitter:
         Get the total of callable outputs of this emitter.
         
         This means the direct callable outputs, and the callable outputs of
-        emitter outputs.
+        emitter outputs. They're returned as a tuple, in the order in which
+        they're called.
         '''
-        return self.__total_callable_outputs_cache
+        if _dead_weak_callables:
+            _prune_dead_weak_callables()
+        return self._total_callable_outputs_cache
+    
+    def get_dispatch_metrics(self):
+        '''
+        Get the metrics of the dispatchers used by the total callable outputs.
+        
+        Returns a dict mapping each dispatcher to a snapshot of its
+        `DispatchMetrics`, with the queue depth and the handlers' latency.
+        Callable outputs that were added without a dispatcher aren't measured.
+        '''
+        return {
+            output.dispatcher: output.dispatcher.get_metrics() for output in
+            self._total_callable_outputs_cache
+            if isinstance(output, DispatchedCallable)
+        }
+    
+    coalescing_freezer = freezing.FreezerProperty()
+    '''
+    Freezer for collapsing many emits into one.
+    
+    While this freezer is frozen, `emit` doesn't call the callable outputs.
+    When the outermost `with` block exits, the emitter emits once if `emit`
+    was called inside it.
+    '''
+    
+    _is_coalescing = False
+    
+    @coalescing_freezer.on_freeze
+    def _start_coalescing(self):
+        self._is_coalescing = True
+        
+    @coalescing_freezer.on_thaw
+    def _stop_coalescing(self):
+        self._is_coalescing = False
+        if self._coalesced_emit_pending:
+            self._coalesced_emit_pending = False
+            self.emit()
     
     def emit(self):
         '''
         Call all of the (direct or indirect) callable outputs of this emitter.
         
         This is the most important method of the emitter. When you `emit`, all
-        the callable outputs get called in succession.
+        the callable outputs get called in succession, in the order in which
+        they were added.
         '''
         # Note that this function gets called many times, so it should be
         # optimized for speed.
-        for callable_output in self.__total_callable_outputs_cache:
+        if _dead_weak_callables:
+            _prune_dead_weak_callables()
+        if self._is_coalescing:
+            self._coalesced_emit_pending = True
+            return
+        if self.collect_exceptions:
+            return self._emit_collecting_exceptions()
+        for callable_output in self._total_callable_outputs_cache:
             # We are using the cache directly instead of calling the getter,
             # for speed.
             callable_output()
+            
+    def _emit_collecting_exceptions(self):
+        '''
+        Call all the callable outputs, even if some of them raise exceptions.
+        
+        The exceptions are raised together as an `EmitFailure` at the end.
+        '''
+        collected_exceptions = []
+        for callable_output in self._total_callable_outputs_cache:
+            try:
+                callable_output()
+            except Exception as exception:
+                collected_exceptions.append(exception)
+        if collected_exceptions:
+            raise EmitFailure(collected_exceptions)
+            
+    def emit_many(self, n):
+        '''
+        Emit `n` times.
+        
+        If the emitter is coalescing, (see `coalescing_freezer`,) this counts
+        as a single emit, like calling `emit` any number of times would.
+        '''
+        if n < 0:
+            raise ValueError('`n` must be non-negative.')
+        if self._is_coalescing:
+            if n:
+                self._coalesced_emit_pending = True
+            return
+        for _ in range(n):
+            self.emit()
     
     def __repr__(self):
         '''
@@ -279,17 +646,3 @@ class Emitter:
             ''.join(("'", self.name, "' ")) if self.name else '',
             hex(id(self))
         )
-    """
-    Unused:
-    
-    def _get_total_inputs(self):
-        
-        total_inputs_of_inputs = reduce(
-            set.union,
-            (emitter._get_total_inputs() for emitter
-             in self._inputs if emitter is not self),
-            set()
-        )
-        
-        return total_inputs_of_inputs.union(self._inputs)
-    """
\ No newline at end of file
@@ -22,7 +22,8 @@ class Emitter(OriginalEmitter):
     See documentation of `EmitterSystem` for more info.
     '''
 
-    def __init__(self, emitter_system, inputs=(), outputs=(), name=None):
+    def __init__(self, emitter_system, inputs=(), outputs=(), name=None,
+                 collect_exceptions=False):
         '''
         Construct the emitter.
         
@@ -34,25 +35,47 @@ class Emitter(OriginalEmitter):
         callables.
         
         `name` is a string name for the emitter.
+        
+        If `collect_exceptions` is `True`, exceptions raised by callable
+        outputs will not stop the emit; they will be raised together as an
+        `EmitFailure` after all the callable outputs were called.
         '''
         
         self.emitter_system = emitter_system
         '''The emitter system to which this emitter belongs.'''
-        OriginalEmitter.__init__(self, inputs=inputs,
-                                 outputs=outputs, name=name)
+        OriginalEmitter.__init__(self, inputs=inputs, outputs=outputs,
+                                 name=name,
+                                 collect_exceptions=collect_exceptions)
                         
+    @property
+    def _is_cache_rebuilding_frozen(self):
+        '''Whether the emitter system's cache rebuilding is frozen.'''
+        return bool(self.emitter_system.cache_rebuilding_freezer.frozen)
+            
     def _recalculate_total_callable_outputs_recursively(self):
         '''
-        Recalculate `__total_callable_outputs_cache` recursively.
+        Recalculate `_total_callable_outputs_cache` recursively.
         
         This will to do the recalculation for this emitter and all its inputs.
         
         Will not do anything if `_cache_rebuilding_frozen` is positive.
         '''
-        if not self.emitter_system.cache_rebuilding_freezer.frozen:
+        if not self._is_cache_rebuilding_frozen:
             OriginalEmitter._recalculate_total_callable_outputs_recursively(
                 self
             )
+            
+    def _add_total_callable_outputs_recursively(self, serial_numbers):
+        '''
+        Add callables to `_total_callable_outputs_cache` recursively.
+        
+        Will not do anything if `_cache_rebuilding_frozen` is positive.
+        '''
+        if not self._is_cache_rebuilding_frozen:
+            OriginalEmitter._add_total_callable_outputs_recursively(
+                self,
+                serial_numbers
+            )
         
     def add_input(self, emitter): # todo: ability to add plural in same method
         '''
@@ -66,12 +89,15 @@ class Emitter(OriginalEmitter):
         assert emitter in self.emitter_system.emitters
         OriginalEmitter.add_input(self, emitter)
     
-    def add_output(self, thing): # todo: ability to add plural in same method
+    # todo: ability to add plural in same method
+    def add_output(self, thing, dispatcher=None, weak=False):
         '''
         Add an emitter or a callable as an output to this emitter.
         
         If adding a callable, every time this emitter will emit the callable
-        will be called.
+        will be called. If you specify a `dispatcher`, (see the `dispatching`
+        module,) the dispatcher will be used to call the callable. If you
+        specify `weak=True`, the callable will be referenced weakly.
         
         If adding an emitter, every time this emitter will emit the output
         emitter will emit as well. Note that the output emitter must be a
@@ -79,4 +105,5 @@ class Emitter(OriginalEmitter):
         '''
         if isinstance(thing, Emitter):
             assert thing in self.emitter_system.emitters
-        OriginalEmitter.add_output(self, thing)
+        OriginalEmitter.add_output(self, thing, dispatcher=dispatcher,
+                                   weak=weak)
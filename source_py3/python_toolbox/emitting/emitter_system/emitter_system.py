@@ -14,6 +14,7 @@ from python_toolbox import freezing
 from python_toolbox import cute_iter_tools
 from python_toolbox.context_management import ReentrantContextManager
 
+from .. import emitter as emitter_module
 from .emitter import Emitter
 
 
@@ -65,7 +66,7 @@ class EmitterSystem:
     @cache_rebuilding_freezer.on_thaw
     def _recalculate_all_cache(self):
         '''Recalculate the cache for all the emitters.'''
-        self.bottom_emitter._recalculate_total_callable_outputs_recursively()
+        emitter_module._recalculate_total_callable_outputs(self.emitters)
         
         
             
@@ -84,6 +85,17 @@ class EmitterSystem:
         return emitter
 
     
+    def get_dispatch_metrics(self):
+        '''
+        Get the metrics of all the dispatchers used in this emitter system.
+        
+        Returns a dict mapping each dispatcher to a snapshot of its
+        `DispatchMetrics`, with the queue depth and the handlers' latency. See
+        the `dispatching` module for more info.
+        '''
+        return self.top_emitter.get_dispatch_metrics()
+        
+        
     def remove_emitter(self, emitter):
         '''
         Remove an emitter from this system, disconnecting it from everything.
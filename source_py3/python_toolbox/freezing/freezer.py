@@ -7,16 +7,10 @@ This module defines the `Freezer` class.
 See its documentation for more information.
 '''
 
-import abc
-
 from python_toolbox import context_management
-from python_toolbox import misc_tools
-from python_toolbox import caching
-
-from .delegatee_context_manager import DelegateeContextManager
 
 
-class Freezer(context_management.DelegatingContextManager):
+class Freezer(context_management.ContextManager):
     '''
     A freezer is used as a context manager to "freeze" and "thaw" an object.
     
@@ -35,13 +29,13 @@ class Freezer(context_management.DelegatingContextManager):
     you can override either of these methods to be a no-op, sometimes even both
     methods, and still have a useful freezer by checking the property `.frozen`
     in the logic of the parent object.
-    '''
-    
-    delegatee_context_manager = caching.CachedProperty(DelegateeContextManager)
-    '''The context manager which implements our `__enter__` and `__exit__`.'''
     
+    Freezers are often entered in inner loops, so the reentrancy is
+    implemented right here with a plain integer, instead of by delegating to a
+    `ReentrantContextManager`.
+    '''
     
-    frozen = misc_tools.ProxyProperty('.delegatee_context_manager.depth')
+    frozen = 0
     '''
     An integer specifying the freezer's level of frozenness.
     
@@ -53,9 +47,34 @@ class Freezer(context_management.DelegatingContextManager):
     This can be conveniently used as a boolean, i.e. `if my_freezer.frozen:`.
     '''
     
+    _freeze_handler_return_value = None
+    '''What `freeze_handler` returned, to be returned by every `__enter__`.'''
+    
+    
+    def __enter__(self):
+        '''Freeze, calling `freeze_handler` if this is the outermost suite.'''
+        if not self.frozen:
+            self._freeze_handler_return_value = self.freeze_handler()
+        self.frozen += 1
+        return self._freeze_handler_return_value
+    
+    
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        '''Thaw, calling `thaw_handler` if this is the outermost suite.'''
+        assert self.frozen >= 1
+        if self.frozen == 1:
+            try:
+                # Returning `thaw_handler`'s return value, since it might be
+                # signalling an exception swallowing:
+                return self.thaw_handler()
+            finally:
+                self.frozen = 0
+        else:
+            self.frozen -= 1
+    
+    
     def freeze_handler(self):
         '''Do something when the object gets frozen.'''
     
     def thaw_handler(self):
         '''Do something when the object gets thawed.'''
-        
\ No newline at end of file
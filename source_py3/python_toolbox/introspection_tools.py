@@ -19,21 +19,10 @@ def get_default_args_dict(function):
         OrderedDict([('c', 1), ('d', 'meow')])
         
     '''
-    arg_spec = cute_inspect.getargspec(function)
-    (s_args, s_star_args, s_star_kwargs, s_defaults) = arg_spec
-        
-    # `getargspec` has a weird policy, when inspecting a function with no
-    # defaults, to give a `defaults` of `None` instead of the more consistent
-    # `()`. We fix that here:
-    if s_defaults is None:
-        s_defaults = ()
-    
-    # The number of args which have default values:
-    n_defaultful_args = len(s_defaults)
-    
-    defaultful_args = s_args[-n_defaultful_args:] if n_defaultful_args \
-                       else []
-    
-    return OrderedDict(zip(defaultful_args, s_defaults))
+    binder = cute_inspect.get_binder(function)
+    return OrderedDict(
+        (arg_name, default) for arg_name, default in
+        zip(binder.arg_names, binder.defaults) if default is not binder.missing
+    )
     
     
\ No newline at end of file
@@ -2,9 +2,14 @@
 # This program is distributed under the MIT license.
 
 '''
-This package defines a class `ReadWriteLock` in the module `read_write_lock`.
+This package defines read-write locks.
 
-See that class's documentation for more details.
+`ReadWriteLock` is for threads, `AsyncReadWriteLock` is for asyncio tasks and
+`ProcessReadWriteLock` is for processes. See their documentation for more
+details. See the `instrumentation` module for finding contended locks.
 '''
 
 from .read_write_lock import ReadWriteLock
+from .async_read_write_lock import AsyncReadWriteLock
+from .process_read_write_lock import ProcessReadWriteLock
+from . import instrumentation
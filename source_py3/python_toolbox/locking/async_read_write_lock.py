@@ -0,0 +1,128 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+See documentation of class `AsyncReadWriteLock` defined in this module.
+'''
+
+import asyncio
+
+from .read_write_lock import BaseReadWriteLock
+
+
+__all__ = ['AsyncReadWriteLock']
+
+
+try:
+    _current_task = asyncio.current_task
+except AttributeError: # Python 3.6
+    _current_task = asyncio.Task.current_task
+
+
+class _AsyncContextManager:
+    '''An async context manager that acquires a lock and then releases it.'''
+
+    def __init__(self, lock, acquire_func):
+        self.lock = lock
+        self.acquire_func = acquire_func
+
+    async def __aenter__(self):
+        await self.acquire_func()
+        return self.lock
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback):
+        self.lock.release()
+
+
+class _AsyncWaiter:
+    '''A task waiting for an `AsyncReadWriteLock`, on its own future.'''
+    __slots__ = ('owner', 'future', 'granted', 'read_count')
+
+    def __init__(self, owner, read_count=0):
+        self.owner = owner
+        self.future = asyncio.get_event_loop().create_future()
+        self.granted = False
+        self.read_count = read_count
+
+    def wake(self):
+        self.granted = True
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class AsyncReadWriteLock(BaseReadWriteLock):
+    '''
+    A reentrant lock between asyncio tasks, for many readers or one writer.
+
+    Usage:
+
+        read_write_lock = AsyncReadWriteLock()
+        async with read_write_lock.read:
+            pass # perform read operations here
+        async with read_write_lock.write:
+            pass # perform write operations here
+
+    This has the same semantics as `ReadWriteLock`, including upgrades,
+    timeouts and policies, except the owners of the lock are tasks instead
+    of threads, and `acquire_read` and `acquire_write` are coroutines. (The
+    `release` method is a plain method.) The lock must be used by tasks of a
+    single event loop, and it isn't thread-safe.
+
+    If a task is cancelled while waiting for the lock, it stops waiting
+    without holding the lock.
+    '''
+
+    _waiter_type = _AsyncWaiter
+
+    def __init__(self, policy='fair', name=None):
+        BaseReadWriteLock.__init__(self, policy=policy, name=name)
+        self.read = _AsyncContextManager(self, self.acquire_read)
+        self.write = _AsyncContextManager(self, self.acquire_write)
+
+
+    async def acquire_read(self, timeout=None):
+        '''
+        Acquire a read lock, waiting up to `timeout` seconds for it.
+
+        If `timeout` is `None`, wait as long as it takes.
+        '''
+        waiter = self._request_read(_current_task(), timeout)
+        if waiter is not None:
+            await self._wait(waiter, timeout, 'read')
+
+
+    async def acquire_write(self, timeout=None):
+        '''
+        Acquire the write lock, waiting up to `timeout` seconds for it.
+
+        If `timeout` is `None`, wait as long as it takes. If this task holds
+        read locks, it's upgraded to a writer once all other readers leave.
+        '''
+        waiter = self._request_write(_current_task(), timeout)
+        if waiter is not None:
+            await self._wait(waiter, timeout, 'write')
+
+
+    def release(self):
+        '''Release the last lock, read or write, that this task acquired.'''
+        self._release(_current_task())
+
+
+    async def _wait(self, waiter, timeout, kind):
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+        except asyncio.TimeoutError:
+            if not waiter.granted:
+                self._abandon(waiter)
+                raise RuntimeError('Timed out acquiring %s lock.' % kind) \
+                                                                     from None
+        except asyncio.CancelledError:
+            if waiter.granted: # Granted right as we were cancelled.
+                self._revoke(waiter)
+            else:
+                self._abandon(waiter)
+            raise
+
+
+    def __repr__(self):
+        return self._describe()
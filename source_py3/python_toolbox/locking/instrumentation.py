@@ -0,0 +1,335 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+Opt-in instrumentation for finding contended `ReadWriteLock`s.
+
+Call `enable()` early, before the locks you're interested in are made. From
+then on, `ReadWriteLock()` makes an `InstrumentedReadWriteLock`, which records
+how long threads wait for it and hold it, how many upgrades and timeouts it
+had, and the call sites that waited for it the most. Then call `get_report()`
+to get a report on all the instrumented locks, or `write_report(folder)` to
+save it to a file. `cute_profile`'s profile handlers add the report to their
+output while instrumentation is enabled.
+
+Locks made while instrumentation is disabled are plain `ReadWriteLock`s, so
+instrumentation costs nothing unless it's enabled. Give your locks names,
+e.g. `ReadWriteLock(name='index')`, so you can tell them apart in reports.
+'''
+
+import collections
+import datetime as datetime_module
+import sys
+import threading
+import time
+import weakref
+try:
+    import pathlib
+except:
+    from python_toolbox.third_party import pathlib
+
+from .read_write_lock import ReadWriteLock
+
+
+__all__ = ['enable', 'disable', 'is_enabled', 'get_instrumented_locks',
+           'get_report', 'write_report', 'reset', 'InstrumentedReadWriteLock',
+           'LockStatistics', 'Histogram']
+
+
+_get_ident = threading.get_ident
+_perf_counter = time.perf_counter
+
+
+class Histogram:
+    '''
+    Histogram of durations, in buckets whose sizes are powers of 2.
+
+    Bucket number `i` counts the durations of less than `2 ** i`
+    microseconds, (and at least `2 ** (i - 1)` microseconds.)
+    '''
+    def __init__(self):
+        self.counts = collections.Counter()
+        '''Mapping from bucket number to the number of durations in it.'''
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+    def add(self, duration):
+        '''Add a duration, in seconds.'''
+        self.counts[int(duration * 1000000).bit_length()] += 1
+        self.n += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+
+    @property
+    def mean(self):
+        '''The mean duration, in seconds.'''
+        return self.total / self.n if self.n else 0.0
+
+
+    def format(self, indent='    '):
+        '''Get the histogram as lines of text, one line per bucket.'''
+        if not self.n:
+            return '%s(none)' % indent
+        lines = ['%smean %s, max %s, total %s' % (
+            indent, _format_duration(self.mean),
+            _format_duration(self.max), _format_duration(self.total)
+        )]
+        biggest_count = max(self.counts.values())
+        for bucket_number in sorted(self.counts):
+            count = self.counts[bucket_number]
+            lines.append('%s  < %9s: %8s %s' % (
+                indent, _format_duration(2 ** bucket_number / 1000000),
+                count, '#' * max(1, 40 * count // biggest_count)
+            ))
+        return '\n'.join(lines)
+
+
+def _format_duration(duration):
+    if duration < 0.001:
+        return '%.0fus' % (duration * 1000000)
+    elif duration < 1:
+        return '%.1fms' % (duration * 1000)
+    else:
+        return '%.2fs' % duration
+
+
+class LockStatistics:
+    '''The statistics that an `InstrumentedReadWriteLock` collects.'''
+    def __init__(self):
+        self.wait_times = Histogram()
+        '''How long acquiring took, including uncontended acquisitions.'''
+
+        self.hold_times = Histogram()
+        '''How long threads held the lock, from first acquire to last release.'''
+
+        self.n_contended = 0
+        '''The number of acquisitions that had to wait.'''
+
+        self.n_upgrades = 0
+        '''The number of attempts to upgrade a read lock to a write lock.'''
+
+        self.n_dead_locks = 0
+        '''The number of upgrades that were denied to prevent a dead lock.'''
+
+        self.n_timeouts = 0
+        '''The number of acquisitions that timed out.'''
+
+        self.waiting_call_sites = collections.Counter()
+        '''
+        Mapping from call site to the number of times it waited for the lock.
+
+        A call site is a tuple `(file_name, line_number, function_name)`.
+        '''
+
+        self.call_site_wait_times = collections.Counter()
+        '''Mapping from call site to the total time it waited, in seconds.'''
+
+
+    def get_top_waiting_call_sites(self, n=10):
+        '''
+        Get the `n` call sites that waited for the lock the longest.
+
+        Returns a list of tuples `(call_site, n_waits, total_wait_time)`.
+        '''
+        return [
+            (call_site, self.waiting_call_sites[call_site], wait_time)
+            for call_site, wait_time in
+            self.call_site_wait_times.most_common(n)
+        ]
+
+
+    def format(self, n_call_sites=10):
+        '''Get the statistics as text.'''
+        lines = [
+            '  acquisitions: %s, contended: %s, upgrades: %s, dead locks '
+            'prevented: %s, timeouts: %s' % (
+                self.wait_times.n, self.n_contended, self.n_upgrades,
+                self.n_dead_locks, self.n_timeouts
+            ),
+            '  wait times:', self.wait_times.format(),
+            '  hold times:', self.hold_times.format(),
+            '  top waiting call sites:',
+        ]
+        top_call_sites = self.get_top_waiting_call_sites(n_call_sites)
+        if not top_call_sites:
+            lines.append('    (none)')
+        for (file_name, line_number, function_name), n_waits, wait_time in \
+                                                                top_call_sites:
+            lines.append('    %s:%s in %s: %s waits, %s total' % (
+                file_name, line_number, function_name, n_waits,
+                _format_duration(wait_time)
+            ))
+        return '\n'.join(lines)
+
+
+def _get_call_site():
+    '''Get the call site of the code outside `locking` that's running now.'''
+    frame = sys._getframe(2)
+    while frame.f_back is not None and frame.f_globals.get(
+                           '__name__', '').startswith('python_toolbox.locking'):
+        frame = frame.f_back
+    return (frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name)
+
+
+class InstrumentedReadWriteLock(ReadWriteLock):
+    '''
+    A `ReadWriteLock` that collects `LockStatistics` in `.statistics`.
+
+    While instrumentation is enabled, `ReadWriteLock()` makes one of these.
+    You may also make one directly.
+    '''
+
+    def __init__(self, policy='fair', name=None):
+        ReadWriteLock.__init__(self, policy=policy, name=name)
+        self.statistics = LockStatistics()
+        self._statistics_lock = threading.Lock()
+        self._hold_starts = {}
+        with _instrumented_locks_lock:
+            _instrumented_locks.add(self)
+
+
+    def _holds(self, thread_id):
+        return self._writer == thread_id or thread_id in self._readers
+
+
+    def _instrumented_acquire(self, acquire, timeout):
+        thread_id = _get_ident()
+        was_holding = self._holds(thread_id)
+        start_time = _perf_counter()
+        try:
+            acquire(self, timeout)
+        except RuntimeError:
+            with self._statistics_lock:
+                self.statistics.n_timeouts += 1
+            raise
+        except ValueError:
+            with self._statistics_lock:
+                self.statistics.n_dead_locks += 1
+            raise
+        end_time = _perf_counter()
+        with self._statistics_lock:
+            self.statistics.wait_times.add(end_time - start_time)
+            if not was_holding:
+                self._hold_starts[thread_id] = end_time
+
+
+    def acquire_read(self, timeout=None):
+        self._instrumented_acquire(ReadWriteLock.acquire_read, timeout)
+
+
+    def acquire_write(self, timeout=None):
+        if _get_ident() in self._readers:
+            with self._statistics_lock:
+                self.statistics.n_upgrades += 1
+        self._instrumented_acquire(ReadWriteLock.acquire_write, timeout)
+
+
+    acquire_read.__doc__ = ReadWriteLock.acquire_read.__doc__
+    acquire_write.__doc__ = ReadWriteLock.acquire_write.__doc__
+    acquireRead = acquire_read
+    acquireWrite = acquire_write
+
+
+    def release(self):
+        '''Release the last lock, read or write, that this thread acquired.'''
+        thread_id = _get_ident()
+        ReadWriteLock.release(self)
+        if not self._holds(thread_id):
+            end_time = _perf_counter()
+            with self._statistics_lock:
+                start_time = self._hold_starts.pop(thread_id, None)
+                if start_time is not None:
+                    self.statistics.hold_times.add(end_time - start_time)
+
+
+    def _wait(self, waiter, timeout, kind):
+        call_site = _get_call_site()
+        start_time = _perf_counter()
+        try:
+            ReadWriteLock._wait(self, waiter, timeout, kind)
+        finally:
+            wait_time = _perf_counter() - start_time
+            with self._statistics_lock:
+                statistics = self.statistics
+                statistics.n_contended += 1
+                statistics.waiting_call_sites[call_site] += 1
+                statistics.call_site_wait_times[call_site] += wait_time
+
+
+    def reset_statistics(self):
+        '''Reset the statistics collected so far.'''
+        with self._statistics_lock:
+            self.statistics = LockStatistics()
+
+
+_instrumented_locks = weakref.WeakSet()
+_instrumented_locks_lock = threading.Lock()
+
+
+def enable():
+    '''Make `ReadWriteLock()` make instrumented locks from now on.'''
+    ReadWriteLock._instrumented_type = InstrumentedReadWriteLock
+
+
+def disable():
+    '''
+    Make `ReadWriteLock()` make plain locks from now on.
+
+    Locks that were made while instrumentation was enabled stay instrumented.
+    '''
+    ReadWriteLock._instrumented_type = None
+
+
+def is_enabled():
+    '''Get whether instrumentation is enabled.'''
+    return ReadWriteLock._instrumented_type is not None
+
+
+def get_instrumented_locks():
+    '''Get a list of the instrumented locks that are alive.'''
+    with _instrumented_locks_lock:
+        return list(_instrumented_locks)
+
+
+def reset():
+    '''Reset the statistics of all the instrumented locks.'''
+    for lock in get_instrumented_locks():
+        lock.reset_statistics()
+
+
+def get_report(n_call_sites=10):
+    '''
+    Get a report on all the instrumented locks, as text.
+
+    The locks that threads waited for the longest come first. For each lock,
+    up to `n_call_sites` of the call sites that waited for it are listed.
+    '''
+    locks = sorted(get_instrumented_locks(),
+                   key=lambda lock: lock.statistics.wait_times.total,
+                   reverse=True)
+    sections = ['Lock instrumentation report, %s instrumented locks.' %
+                len(locks)]
+    for lock in locks:
+        with lock._statistics_lock:
+            sections.append('%r:\n%s' %
+                            (lock, lock.statistics.format(n_call_sites)))
+    return '\n\n'.join(sections) + '\n'
+
+
+def write_report(folder, n_call_sites=10):
+    '''
+    Write the report from `get_report` to a new file in `folder`.
+
+    The file is named like the profiles that `cute_profile` saves, with a
+    `.locks.txt` suffix. Returns the path of the file.
+    '''
+    path = pathlib.Path(folder) / (
+        '%s.locks.txt' % datetime_module.datetime.now()
+    ).replace(':', '.')
+    with path.open('w') as output_file:
+        output_file.write(get_report(n_call_sites))
+    return path
@@ -0,0 +1,190 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+See documentation of class `ProcessReadWriteLock` defined in this module.
+'''
+
+import multiprocessing
+import os
+import threading
+
+from .read_write_lock import ContextManager
+
+
+__all__ = ['ProcessReadWriteLock']
+
+
+# Indices into the shared state array:
+_N_READERS = 0
+'''The number of threads, in all processes, that hold read locks.'''
+_HAS_WRITER = 1
+'''Whether a thread holds the write lock.'''
+_N_WAITING_WRITERS = 2
+'''The number of threads waiting for the write lock, not counting upgraders.'''
+_HAS_UPGRADER = 3
+'''Whether a reader is waiting to upgrade to the write lock.'''
+
+
+class ProcessReadWriteLock:
+    '''
+    A reentrant read-write lock that's shared between processes.
+
+    Usage:
+
+        read_write_lock = ProcessReadWriteLock()
+        # Give `read_write_lock` to child processes, e.g. as an argument of
+        # `multiprocessing.Process`, and then in any of the processes:
+        with read_write_lock.read:
+            pass # perform read operations here
+        with read_write_lock.write:
+            pass # perform write operations here
+
+    This is useful for guarding data that processes share, like a
+    memory-mapped file. The lock's state lives in shared memory, guarded by a
+    `multiprocessing.Condition`, so like other `multiprocessing` primitives
+    it must be passed to the child processes when they're created.
+
+    The owners of the lock are threads, in any of the processes. It has the
+    same upgrade rules and timeouts as `ReadWriteLock`, but only the
+    `'writers'` and `'readers'` policies. (`'writers'` is the default.)
+    Waiting threads are woken up together, so under heavy contention this
+    lock is slower than `ReadWriteLock`; use it only between processes.
+
+    `context` is the `multiprocessing` context to make the primitives with;
+    by default it's the default context.
+    '''
+
+    policies = ('writers', 'readers')
+
+    def __init__(self, policy='writers', context=None):
+        if policy not in self.policies:
+            raise ValueError('`policy` must be one of %s, not %r.' %
+                             (', '.join(map(repr, self.policies)), policy))
+        self.policy = policy
+        context = context or multiprocessing.get_context()
+        self._condition = context.Condition(context.Lock())
+        self._state = context.Array('l', 4, lock=False)
+        self._owners = {}
+        '''
+        Mapping from `(pid, thread_id)` to `[is_writer, count]`.
+
+        This is local to each process; only the threads that hold the lock in
+        this process are here. The process ID is in the key so a process
+        that's forked while holding the lock won't think it holds it too.
+        '''
+        self.read = ContextManager(self, self.acquire_read)
+        self.write = ContextManager(self, self.acquire_write)
+
+
+    def acquire_read(self, timeout=None):
+        '''
+        Acquire a read lock, waiting up to `timeout` seconds for it.
+
+        If `timeout` is `None`, wait as long as it takes.
+        '''
+        owner = (os.getpid(), threading.get_ident())
+        try:
+            self._owners[owner][1] += 1
+            return
+        except KeyError:
+            pass
+        state = self._state
+        if self.policy == 'writers':
+            can_read = lambda: not (state[_HAS_WRITER] or
+                                    state[_HAS_UPGRADER] or
+                                    state[_N_WAITING_WRITERS])
+        else:
+            can_read = lambda: not (state[_HAS_WRITER] or state[_HAS_UPGRADER])
+        with self._condition:
+            if not self._condition.wait_for(can_read, timeout):
+                raise RuntimeError('Timed out acquiring read lock.')
+            state[_N_READERS] += 1
+        self._owners[owner] = [False, 1]
+
+
+    def acquire_write(self, timeout=None):
+        '''
+        Acquire the write lock, waiting up to `timeout` seconds for it.
+
+        If `timeout` is `None`, wait as long as it takes. If this thread holds
+        read locks, it's upgraded to a writer once all other readers leave.
+        '''
+        owner = (os.getpid(), threading.get_ident())
+        state = self._state
+        ownership = self._owners.get(owner)
+        if ownership is not None and ownership[0]:
+            ownership[1] += 1
+            return
+        with self._condition:
+            if ownership is not None: # Upgrading
+                if state[_HAS_UPGRADER]:
+                    raise ValueError('Inevitable dead lock, denying write '
+                                     'lock.')
+                state[_HAS_UPGRADER] = 1
+                try:
+                    upgraded = self._condition.wait_for(
+                        lambda: state[_N_READERS] == 1, timeout
+                    )
+                finally:
+                    state[_HAS_UPGRADER] = 0
+                if not upgraded:
+                    self._condition.notify_all()
+                    raise RuntimeError('Timed out acquiring write lock.')
+                state[_N_READERS] = 0
+            else:
+                state[_N_WAITING_WRITERS] += 1
+                try:
+                    acquired = self._condition.wait_for(
+                        lambda: not (state[_HAS_WRITER] or state[_N_READERS] or
+                                     state[_HAS_UPGRADER]),
+                        timeout
+                    )
+                finally:
+                    state[_N_WAITING_WRITERS] -= 1
+                if not acquired:
+                    self._condition.notify_all()
+                    raise RuntimeError('Timed out acquiring write lock.')
+            state[_HAS_WRITER] = 1
+        if ownership is not None:
+            ownership[0] = True
+            ownership[1] += 1
+        else:
+            self._owners[owner] = [True, 1]
+
+
+    def release(self):
+        '''Release the last lock, read or write, that this thread acquired.'''
+        owner = (os.getpid(), threading.get_ident())
+        try:
+            ownership = self._owners[owner]
+        except KeyError:
+            raise ValueError('Trying to release unheld lock.')
+        ownership[1] -= 1
+        if ownership[1]:
+            return
+        del self._owners[owner]
+        with self._condition:
+            if ownership[0]:
+                self._state[_HAS_WRITER] = 0
+            else:
+                self._state[_N_READERS] -= 1
+            self._condition.notify_all()
+
+
+    def __getstate__(self):
+        return (self.policy, self._condition, self._state)
+
+
+    def __setstate__(self, state):
+        self.policy, self._condition, self._state = state
+        self._owners = {}
+        self.read = ContextManager(self, self.acquire_read)
+        self.write = ContextManager(self, self.acquire_write)
+
+
+    def __repr__(self):
+        return '<%s readers=%s, writer=%s, policy=%r>' % (
+            type(self).__name__, self._state[_N_READERS],
+            bool(self._state[_HAS_WRITER]), self.policy
+        )
@@ -4,16 +4,19 @@
 '''
 See documentation of class `ReadWriteLock` defined in this module.
 '''
-# todo: organize.
 
-from python_toolbox import context_management
+import collections
+import threading
 
-from . import original_read_write_lock
+from python_toolbox import context_management
 
 
 __all__ = ['ReadWriteLock']
 
 
+_get_ident = threading.get_ident
+
+
 class ContextManager(context_management.ContextManager):
 
     def __init__(self, lock, acquire_func):
@@ -27,27 +30,314 @@ class ContextManager(context_management.ContextManager):
     def __exit__(self, exc_type, exc_value, exc_traceback):
         self.lock.release()
 
+
+class _Waiter:
+    '''
+    A thread waiting for a `ReadWriteLock`.
+
+    The waiting thread blocks on its own `lock`, which is released only when
+    the thread is granted what it asked for, so a release wakes up just the
+    threads that can actually proceed.
+    '''
+    __slots__ = ('owner', 'lock', 'granted', 'read_count')
+
+    def __init__(self, owner, read_count=0):
+        self.owner = owner
+        self.lock = threading.Lock()
+        self.lock.acquire()
+        self.granted = False
+        self.read_count = read_count
+
+    def wake(self):
+        self.granted = True
+        self.lock.release()
+
+
+class BaseReadWriteLock:
+    '''
+    The state machine shared by `ReadWriteLock` and `AsyncReadWriteLock`.
+
+    This keeps track of who holds the lock and who waits for it. The owners
+    are thread IDs for `ReadWriteLock` and tasks for `AsyncReadWriteLock`.
+    Subclasses call the `_request_*` methods, which either acquire the lock
+    and return `None`, or queue a waiter, (made by `_waiter_type`,) and
+    return it for the subclass to wait on. See the documentation of
+    `ReadWriteLock` for the semantics.
+    '''
+
+    policies = ('fair', 'writers', 'readers')
+
+    _waiter_type = _Waiter
+
+    def __init__(self, policy='fair', name=None):
+        if policy not in self.policies:
+            raise ValueError('`policy` must be one of %s, not %r.' %
+                             (', '.join(map(repr, self.policies)), policy))
+        self.policy = policy
+        self.name = name
+        '''The lock's name, for its `repr` and for instrumentation reports.'''
+        self._readers = {}
+        '''Mapping from owner to the number of read locks it holds.'''
+        self._writer = None
+        '''The owner of the write lock, or `None`.'''
+        self._writer_count = 0
+        '''The number of locks the writer holds, including read locks.'''
+        self._upgrader = None
+        '''The waiter of a reader waiting to become a writer, or `None`.'''
+        self._waiting_writers = collections.deque()
+        self._waiting_readers = []
+
+
+    def _request_read(self, owner, timeout):
+        if self._writer == owner:
+            self._writer_count += 1
+            return
+        readers = self._readers
+        if owner in readers:
+            readers[owner] += 1
+            return
+        if self._writer is None and self._upgrader is None and \
+                      (self.policy == 'readers' or not self._waiting_writers):
+            readers[owner] = 1
+            return
+        if timeout is not None and timeout <= 0:
+            raise RuntimeError('Timed out acquiring read lock.')
+        waiter = self._waiter_type(owner)
+        self._waiting_readers.append(waiter)
+        return waiter
+
+
+    def _request_write(self, owner, timeout):
+        if self._writer == owner:
+            self._writer_count += 1
+            return
+        readers = self._readers
+        if owner in readers:
+            if self._upgrader is not None:
+                raise ValueError('Inevitable dead lock, denying write lock.')
+            read_count = readers.pop(owner)
+            if not readers and self._writer is None:
+                self._writer = owner
+                self._writer_count = read_count + 1
+                return
+            if timeout is not None and timeout <= 0:
+                readers[owner] = read_count
+                raise RuntimeError('Timed out acquiring write lock.')
+            waiter = self._upgrader = self._waiter_type(owner, read_count)
+            return waiter
+        if self._writer is None and not readers and \
+                self._upgrader is None and not self._waiting_writers and \
+                not self._waiting_readers:
+            self._writer = owner
+            self._writer_count = 1
+            return
+        if timeout is not None and timeout <= 0:
+            raise RuntimeError('Timed out acquiring write lock.')
+        waiter = self._waiter_type(owner)
+        self._waiting_writers.append(waiter)
+        return waiter
+
+
+    def _release(self, owner):
+        if self._writer == owner:
+            self._writer_count -= 1
+            if not self._writer_count:
+                self._writer = None
+                self._grant(after_writer=True)
+            return
+        readers = self._readers
+        try:
+            read_count = readers[owner]
+        except KeyError:
+            raise ValueError('Trying to release unheld lock.')
+        if read_count == 1:
+            del readers[owner]
+            if not readers:
+                self._grant()
+        else:
+            readers[owner] = read_count - 1
+
+
+    def _abandon(self, waiter):
+        '''Stop waiting with `waiter`, which wasn't granted the lock.'''
+        if waiter is self._upgrader:
+            self._upgrader = None
+            self._readers[waiter.owner] = waiter.read_count
+        elif waiter in self._waiting_writers:
+            self._waiting_writers.remove(waiter)
+        else:
+            self._waiting_readers.remove(waiter)
+        self._grant()
+
+
+    def _revoke(self, waiter):
+        '''
+        Undo the request of `waiter`, which was granted the lock.
         
-class ReadWriteLock(original_read_write_lock.ReadWriteLock):
-    '''
-    A ReadWriteLock subclassed from a different ReadWriteLock class defined
-    in the module original_read_write_lock.py, (See the documentation of the
-    original class for more details.)
-    
-    This subclass adds two context managers, one for reading and one for
-    writing.
-    
+        A reader that was upgraded goes back to holding its read locks.
+        '''
+        if waiter.read_count and self._writer == waiter.owner:
+            self._writer = None
+            self._writer_count = 0
+            self._readers[waiter.owner] = waiter.read_count
+            self._grant(after_writer=True)
+        else:
+            self._release(waiter.owner)
+
+
+    def _grant(self, after_writer=False):
+        '''Hand the lock to the waiters that should get it now.'''
+        if self._writer is not None:
+            return
+        if self._upgrader is not None:
+            if not self._readers:
+                waiter = self._upgrader
+                self._upgrader = None
+                self._writer = waiter.owner
+                self._writer_count = waiter.read_count + 1
+                waiter.wake()
+            return
+        waiting_readers = self._waiting_readers
+        if waiting_readers and (self.policy == 'readers' or
+                                not self._waiting_writers or
+                                (self.policy == 'fair' and after_writer)):
+            self._waiting_readers = []
+            readers = self._readers
+            for waiter in waiting_readers:
+                readers[waiter.owner] = 1
+                waiter.wake()
+        elif self._waiting_writers and not self._readers:
+            waiter = self._waiting_writers.popleft()
+            self._writer = waiter.owner
+            self._writer_count = 1
+            waiter.wake()
+
+
+    def _describe(self):
+        if self._writer is not None:
+            state = 'write-locked'
+        elif self._readers:
+            state = 'read-locked by %s owners' % len(self._readers)
+        else:
+            state = 'unlocked'
+        n_waiting = len(self._waiting_writers) + \
+                    len(self._waiting_readers) + (self._upgrader is not None)
+        return '<%s %s%s, %s waiting, policy=%r>' % (
+            type(self).__name__,
+            ''.join(("'", self.name, "' ")) if self.name else '',
+            state, n_waiting, self.policy
+        )
+
+
+class ReadWriteLock(BaseReadWriteLock):
+    '''
+    A reentrant lock that can be held by many readers or by a single writer.
+
     Usage:
-    
+
         read_write_lock = ReadWriteLock()
         with read_write_lock.read:
             pass # perform read operations here
         with read_write_lock.write:
             pass # perform write operations here
-            
+
+    You can also call `acquire_read`, `acquire_write` and `release` directly.
+    (The old names `acquireRead` and `acquireWrite` work too.) Both acquire
+    methods take an optional `timeout` in seconds, and raise `RuntimeError`
+    if the lock couldn't be acquired in time.
+
+    A thread that holds the write lock may acquire read locks and more write
+    locks. A thread that holds read locks may acquire the write lock, which
+    upgrades it to a writer once all the other readers leave. If two reading
+    threads try to upgrade at the same time they'd deadlock, so the second
+    one gets a `ValueError`.
+
+    `policy` decides who goes first when both readers and writers are waiting:
+
+     - `'fair'`, the default: New readers wait behind waiting writers, but
+       when a writer releases the lock, all the readers that are waiting at
+       that moment go in before the next writer. Neither side starves.
+
+     - `'writers'`: New readers wait while any writer waits. Readers may
+       starve while writers keep coming.
+
+     - `'readers'`: Readers go in whenever no writer holds the lock. Writers
+       may starve while readers keep coming.
+
+    Writers always get the lock in the order they asked for it. Acquiring a
+    read lock while no writer holds or waits for the lock takes only a short
+    critical section, without waiting on any condition.
+
+    See `AsyncReadWriteLock` for a lock between asyncio tasks, and
+    `ProcessReadWriteLock` for a lock between processes. To find out which
+    locks are contended, see `python_toolbox.locking.instrumentation`.
+    '''
+
+    _instrumented_type = None
+    '''
+    The type to make instead of `ReadWriteLock`, if instrumentation is on.
+
+    This is set by `locking.instrumentation.enable`.
     '''
-    # todo: rename from acquireRead style to acquire_read style
-    def __init__(self, *args, **kwargs):
-        original_read_write_lock.ReadWriteLock.__init__(self, *args, **kwargs)
-        self.read = ContextManager(self, self.acquireRead)
-        self.write = ContextManager(self, self.acquireWrite)
\ No newline at end of file
+
+    def __new__(cls, *args, **kwargs):
+        if cls is ReadWriteLock and cls._instrumented_type is not None:
+            cls = cls._instrumented_type
+        return object.__new__(cls)
+
+
+    def __init__(self, policy='fair', name=None):
+        BaseReadWriteLock.__init__(self, policy=policy, name=name)
+        self._lock = threading.Lock()
+        self.read = ContextManager(self, self.acquire_read)
+        self.write = ContextManager(self, self.acquire_write)
+
+
+    def acquire_read(self, timeout=None):
+        '''
+        Acquire a read lock, waiting up to `timeout` seconds for it.
+
+        If `timeout` is `None`, wait as long as it takes.
+        '''
+        with self._lock:
+            waiter = self._request_read(_get_ident(), timeout)
+        if waiter is not None:
+            self._wait(waiter, timeout, 'read')
+
+
+    def acquire_write(self, timeout=None):
+        '''
+        Acquire the write lock, waiting up to `timeout` seconds for it.
+
+        If `timeout` is `None`, wait as long as it takes. If this thread holds
+        read locks, it's upgraded to a writer once all other readers leave.
+        '''
+        with self._lock:
+            waiter = self._request_write(_get_ident(), timeout)
+        if waiter is not None:
+            self._wait(waiter, timeout, 'write')
+
+
+    acquireRead = acquire_read
+    acquireWrite = acquire_write
+
+
+    def release(self):
+        '''Release the last lock, read or write, that this thread acquired.'''
+        with self._lock:
+            self._release(_get_ident())
+
+
+    def _wait(self, waiter, timeout, kind):
+        if waiter.lock.acquire(timeout=-1 if timeout is None else timeout):
+            return
+        with self._lock:
+            if waiter.granted: # Granted right as we timed out.
+                return
+            self._abandon(waiter)
+        raise RuntimeError('Timed out acquiring %s lock.' % kind)
+
+
+    def __repr__(self):
+        with self._lock:
+            return self._describe()
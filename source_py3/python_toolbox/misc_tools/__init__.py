@@ -5,4 +5,4 @@
 
 from .misc_tools import *
 from . import name_mangling
-from .proxy_property import ProxyProperty
\ No newline at end of file
+from .proxy_property import ProxyProperty, proxy_attributes
\ No newline at end of file
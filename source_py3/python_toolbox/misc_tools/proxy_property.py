@@ -7,9 +7,13 @@ This module defines the `ProxyProperty` class.
 See its documentation for more information.
 '''
 
+import operator
 import re
 
 
+_dotted_path_pattern = re.compile(r'^(?:\.[A-Za-z_][A-Za-z0-9_]*)+$')
+
+
 class ProxyProperty:
     '''
     Property that serves as a proxy to an attribute of the parent object.
@@ -38,9 +42,20 @@ class ProxyProperty:
     You may also refer to a nested attribute of the object rather than a direct
     one; for example, you can do `ProxyProperty('.whatever.x.height')` and it
     will access the `.height` attribute of the `.x` attribute of `.whatever`.
+    
+    The path is parsed once, when the `ProxyProperty` is created, into an
+    `operator.attrgetter`, so accessing the property is fast.
+    
+    For a nested attribute, you may pass `cache_intermediate=True` to have the
+    intermediate object, (`.whatever.x` in the example above,) cached in the
+    parent object's `__dict__` on first access. This saves resolving the path
+    every time, but it's only correct if the intermediate object is never
+    replaced, or if you call `.invalidate_cache(thing)` after replacing it.
+    Setting the property invalidates the cache as well. All the
+    `ProxyProperty`s with the same intermediate path share its cache.
     '''
 
-    def __init__(self, attribute_name, doc=None):
+    def __init__(self, attribute_name, doc=None, cache_intermediate=False):
         '''
         Construct the `ProxyProperty`.
         
@@ -53,19 +68,71 @@ class ProxyProperty:
         attribute of the `.x` attribute of `.whatever`.
         
         You may specify a docstring as `doc`.
+        
+        If `cache_intermediate` is `True`, the intermediate object of a nested
+        attribute will be cached; see the class documentation for details.
         '''
         if not attribute_name.startswith('.'):
             raise Exception("The `attribute_name` must start with a dot to "
                             "make it clear it's an attribute. %s does not "
                             "start with a dot." % repr(attribute_name))
-        self.getter = self.setter = None
-        exec('def getter(thing): return thing%s' % attribute_name)
-        exec('def setter(thing, value): thing%s = value' % attribute_name)
-        exec('self.getter, self.setter = getter, setter')
         self.attribute_name = attribute_name[1:]
         self.__doc__ = doc
+        self._cache_key = None
+        if _dotted_path_pattern.match(attribute_name):
+            parent_path, _, last_name = self.attribute_name.rpartition('.')
+            self.getter = operator.attrgetter(self.attribute_name)
+            if not parent_path:
+                self.setter = \
+                           lambda thing, value: setattr(thing, last_name, value)
+            else:
+                parent_getter = operator.attrgetter(parent_path)
+                if cache_intermediate:
+                    self._cache_key = \
+                               '_ProxyProperty__intermediate_%s' % parent_path
+                    self._make_caching_accessors(parent_getter, last_name)
+                else:
+                    self.setter = lambda thing, value: \
+                                 setattr(parent_getter(thing), last_name, value)
+        else:
+            # It's not a plain dotted path, (maybe it has subscripts,) so we
+            # compile it with `exec`.
+            namespace = {}
+            exec('def getter(thing): return thing%s' % attribute_name,
+                 namespace)
+            exec('def setter(thing, value): thing%s = value' % attribute_name,
+                 namespace)
+            self.getter, self.setter = namespace['getter'], namespace['setter']
+            
+            
+    def _make_caching_accessors(self, parent_getter, last_name):
+        '''Make a getter and setter that cache the intermediate object.'''
+        cache_key = self._cache_key
+        
+        def get_intermediate(thing):
+            thing_dict = thing.__dict__
+            try:
+                return thing_dict[cache_key]
+            except KeyError:
+                intermediate = thing_dict[cache_key] = parent_getter(thing)
+                return intermediate
+            
+        def getter(thing):
+            return getattr(get_intermediate(thing), last_name)
+        
+        def setter(thing, value):
+            thing.__dict__.pop(cache_key, None)
+            setattr(parent_getter(thing), last_name, value)
+            
+        self.getter, self.setter = getter, setter
         
         
+    def invalidate_cache(self, thing):
+        '''Forget the cached intermediate object of `thing`, if any.'''
+        if self._cache_key is not None:
+            thing.__dict__.pop(self._cache_key, None)
+            
+        
     def __get__(self, thing, our_type=None):
         if thing is None:
             # We're being accessed from the class itself, not from an object
@@ -85,4 +152,40 @@ class ProxyProperty:
             repr('.%s' % self.attribute_name),
             ', doc=%s' % repr(self.__doc__) if self.__doc__ else ''
         )
-        
\ No newline at end of file
+    
+    
+def proxy_attributes(target_name, attribute_names, cache_intermediate=False):
+    '''
+    Class decorator that proxies many attributes to the same target.
+    
+    For each name in `attribute_names`, a `ProxyProperty` for the attribute
+    with the same name on `target_name` is added to the class, unless the
+    class already defines that name itself. Example:
+    
+        @proxy_attributes('._inner', ('height', 'width', 'resize'))
+        class Wrapper:
+            def __init__(self, inner):
+                self._inner = inner
+                
+    Now `Wrapper(inner).height` is `inner.height`, etc. `target_name` must be
+    prefixed with a dot, like in `ProxyProperty`. If `cache_intermediate` is
+    `True`, the target object will be cached; see `ProxyProperty`.
+    '''
+    if not target_name.startswith('.'):
+        raise Exception("The `target_name` must start with a dot to make it "
+                        "clear it's an attribute. %s does not start with a "
+                        "dot." % repr(target_name))
+    if isinstance(attribute_names, str):
+        attribute_names = attribute_names.replace(',', ' ').split()
+        
+    def decorator(cls):
+        for attribute_name in attribute_names:
+            if attribute_name not in vars(cls):
+                setattr(
+                    cls, attribute_name,
+                    ProxyProperty('%s.%s' % (target_name, attribute_name),
+                                  cache_intermediate=cache_intermediate)
+                )
+        return cls
+    
+    return decorator
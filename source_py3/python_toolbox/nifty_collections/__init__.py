@@ -8,11 +8,15 @@ from .ordered_set import OrderedSet
 from .weak_key_default_dict import WeakKeyDefaultDict
 from .weak_key_identity_dict import WeakKeyIdentityDict
 from .lazy_tuple import LazyTuple
+from .spilling_lazy_tuple import SpillingLazyTuple, ForgottenItemError
 from .frozen_dict_and_frozen_ordered_dict import FrozenDict, FrozenOrderedDict
 from .bagging import Bag, OrderedBag, FrozenBag, FrozenOrderedBag
 from .frozen_bag_bag import FrozenBagBag
 from .cute_enum import CuteEnum
+from .segment_set import SegmentSet
+from .timestamped_dict import TimestampedDict
 
+from .emitting_collection import ChangeSet
 from .emitting_ordered_set import EmittingOrderedSet
 from .emitting_weak_key_default_dict import EmittingWeakKeyDefaultDict
 
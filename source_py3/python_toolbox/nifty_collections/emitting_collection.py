@@ -0,0 +1,121 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+Defines the `ChangeSet` class and a mixin for emitting collections.
+
+See their documentation for more details.
+'''
+
+import collections
+
+from python_toolbox import freezing
+
+
+class ChangeSet(collections.namedtuple('ChangeSet',
+                                       ('added', 'removed', 'changed'))):
+    '''
+    The keys that were added to, removed from or changed in a collection.
+
+    Each of `added`, `removed` and `changed` is a `frozenset` of keys.
+    `changed` is for keys that stayed in a mapping but got a new value, or
+    that stayed in an ordered set but were moved.
+    '''
+    __slots__ = ()
+
+
+class EmittingCollectionMixin:
+    '''
+    Mixin for collections that emit to `.emitter` when they're modified.
+
+    When a change is made, `.last_change` is set to a `ChangeSet` describing
+    it while the emitter emits, so callable outputs can update incrementally
+    instead of rescanning the collection. After the emit, `.last_change` is
+    `None` again, so the collection doesn't keep references to removed keys.
+
+    Changes made while `.batch_freezer` is frozen are collected, and when it
+    thaws, the emitter emits once with a `ChangeSet` of the net changes. Bulk
+    operations like `update` and `clear` use it, and you can use it too:
+
+        with collection.batch():
+            for key in keys:
+                collection.add(key)
+
+    '''
+
+    last_change = None
+    '''The `ChangeSet` of the change being emitted, or `None`.'''
+
+    _pending_change = None
+    '''The `(added, removed, changed)` sets collected while batching.'''
+
+    _readding_is_change = False
+    '''Whether a key that's removed and added again counts as changed.'''
+
+
+    batch_freezer = freezing.FreezerProperty()
+    '''
+    Freezer for batching changes into a single emit.
+
+    See the class documentation for more details.
+    '''
+
+
+    def batch(self):
+        '''Get a context manager for batching changes into a single emit.'''
+        return self.batch_freezer
+
+
+    @batch_freezer.on_freeze
+    def _start_batch(self):
+        self._pending_change = (set(), set(), set())
+
+
+    @batch_freezer.on_thaw
+    def _end_batch(self):
+        added, removed, changed = self._pending_change
+        self._pending_change = None
+        if added or removed or changed:
+            self._emit(ChangeSet(frozenset(added), frozenset(removed),
+                                 frozenset(changed)))
+
+
+    def _note_change(self, added=(), removed=(), changed=()):
+        '''
+        Emit for a change, or add it to the pending change if batching.
+
+        A key that's removed after being added in the same batch, (or vice
+        versa,) cancels out. A mapping key that's removed and then added again
+        counts as changed.
+        '''
+        if self._pending_change is None:
+            self._emit(ChangeSet(frozenset(added), frozenset(removed),
+                                 frozenset(changed)))
+            return
+        pending_added, pending_removed, pending_changed = self._pending_change
+        for key in removed:
+            if key in pending_added:
+                pending_added.remove(key)
+            else:
+                pending_changed.discard(key)
+                pending_removed.add(key)
+        for key in added:
+            if key in pending_removed:
+                pending_removed.remove(key)
+                if self._readding_is_change:
+                    pending_changed.add(key)
+            else:
+                pending_added.add(key)
+        for key in changed:
+            if key not in pending_added:
+                pending_changed.add(key)
+
+
+    def _emit(self, change_set):
+        if self.emitter:
+            previous_change = self.last_change
+            self.last_change = change_set
+            try:
+                self.emitter.emit()
+            finally:
+                self.last_change = previous_change
@@ -10,43 +10,121 @@ See its documentation for more details.
 from .ordered_set import (
     OrderedSet, KEY, PREV, NEXT
 )
+from .emitting_collection import EmittingCollectionMixin
 
 
-class EmittingOrderedSet(OrderedSet):
-    '''An ordered set that emits to `.emitter` every time it's modified.'''
-    
+class EmittingOrderedSet(EmittingCollectionMixin, OrderedSet):
+    '''
+    An ordered set that emits to `.emitter` every time it's modified.
+
+    Bulk operations, like `update`, `|=`, `-=` and `clear`, emit only once.
+    While emitting, `.last_change` is a `ChangeSet` of the keys that were
+    added and removed, and of the keys that were moved, as `changed`. See
+    `EmittingCollectionMixin` for more details, including how to batch changes
+    using `with emitting_ordered_set.batch():`.
+    '''
+
+    _readding_is_change = True
+
     def __init__(self, emitter, items=()):
         if emitter:
             from python_toolbox.emitting import Emitter
             assert isinstance(emitter, Emitter)
         self.emitter = emitter
-        OrderedSet.__init__(self, items)
+        with self.batch_freezer:
+            OrderedSet.__init__(self, items)
+
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        '''Make a plain `OrderedSet`, for the results of set operations.'''
+        return OrderedSet(iterable)
+
 
-        
     def add(self, key):
         """ Add an element to a set.
-    
+
         This has no effect if the element is already present. """
         if key not in self._map:
             end = self._end
             curr = end[PREV]
             curr[NEXT] = end[PREV] = self._map[key] = [key, curr, end]
-            if self.emitter:
-                self.emitter.emit()
+            self._note_change(added=(key,))
+
 
-                
     def discard(self, key):
         """ Remove an element from a set if it is a member.
-        
+
         If the element is not a member, do nothing. """
-        if key in self._map:        
+        if key in self._map:
             key, prev, next = self._map.pop(key)
             prev[NEXT] = next
             next[PREV] = prev
-            if self.emitter:
-                self.emitter.emit()
+            self._note_change(removed=(key,))
+
+
+    def update(self, *iterables):
+        '''Add all the items in the given iterables, emitting once.'''
+        with self.batch_freezer:
+            for iterable in iterables:
+                for key in iterable:
+                    self.add(key)
+
+
+    def clear(self):
+        '''Remove all the items, emitting once.'''
+        removed_keys = tuple(getattr(self, '_map', ()))
+        OrderedSet.clear(self)
+        if removed_keys:
+            self._note_change(removed=removed_keys)
+
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+
+    def __iand__(self, other):
+        with self.batch_freezer:
+            return OrderedSet.__iand__(self, other)
+
+
+    def __ixor__(self, other):
+        with self.batch_freezer:
+            return OrderedSet.__ixor__(self, other)
+
+
+    def __isub__(self, other):
+        with self.batch_freezer:
+            return OrderedSet.__isub__(self, other)
+
+
+    def __del__(self):
+        OrderedSet.clear(self) # Not emitting when being garbage-collected.
+
+
+    def move_to_end(self, key):
+        '''
+        Move an existing element to the end.
+
+        The moved element will be in the `changed` part of the `ChangeSet`.
+        '''
+        with self.batch_freezer:
+            OrderedSet.move_to_end(self, key)
+
+
+    def sort(self, key=None, reverse=False):
+        '''
+        Sort the items according to their keys, changing the order in-place.
+
+        The optional `key` argument will be passed to the `sorted` function as
+        a key function. All the elements will be in the `changed` part of the
+        `ChangeSet`.
+        '''
+        with self.batch_freezer:
+            OrderedSet.sort(self, key=key, reverse=reverse)
+
 
-                
     def set_emitter(self, emitter):
         '''Set `emitter` to be emitted with on every modification.'''
-        self.emitter = emitter
\ No newline at end of file
+        self.emitter = emitter
@@ -7,10 +7,13 @@ Defines the `EmittingWeakKeyDefaultDict` class.
 See its documentation for more details.
 '''
 
+import collections
+
 from .weak_key_default_dict import WeakKeyDefaultDict
+from .emitting_collection import EmittingCollectionMixin
 
 
-class EmittingWeakKeyDefaultDict(WeakKeyDefaultDict):
+class EmittingWeakKeyDefaultDict(EmittingCollectionMixin, WeakKeyDefaultDict):
     '''
     A key that references keys weakly, has a default factory, and emits.
     
@@ -24,10 +27,18 @@ class EmittingWeakKeyDefaultDict(WeakKeyDefaultDict):
     exist the default factory will be called to create its new value.
     
     Every time that a change is made, like a key is added or removed or gets
-    its value changed, we do `.emitter.emit()`.
+    its value changed, we do `.emitter.emit()`. Bulk operations, like `update`
+    and `clear`, emit only once. While emitting, `.last_change` is a
+    `ChangeSet` of the keys that were added, removed and changed. See
+    `EmittingCollectionMixin` for more details, including how to batch changes
+    using `with emitting_weak_key_default_dict.batch():`. (Note that while
+    batching, the keys in the pending change are referenced strongly.)
     '''
     
+    _readding_is_change = True
+    
     def __init__(self, emitter, *args, **kwargs):
+        self.emitter = None # Not emitting for the initial items.
         super().__init__(*args, **kwargs)
         self.emitter = emitter
 
@@ -38,16 +49,18 @@ class EmittingWeakKeyDefaultDict(WeakKeyDefaultDict):
 
         
     def __setitem__(self, key, value):
+        is_new_key = key not in self
         result = super().__setitem__(key, value)
-        if self.emitter:
-            self.emitter.emit()
+        if is_new_key:
+            self._note_change(added=(key,))
+        else:
+            self._note_change(changed=(key,))
         return result
 
     
     def __delitem__(self, key):
         result = super().__delitem__(key)
-        if self.emitter:
-            self.emitter.emit()
+        self._note_change(removed=(key,))
         return result
 
     
@@ -55,9 +68,10 @@ class EmittingWeakKeyDefaultDict(WeakKeyDefaultDict):
         """ D.pop(k[,d]) -> v, remove specified key and return the 
         corresponding value. If key is not found, d is returned if given,
         otherwise KeyError is raised """
+        is_existing_key = key in self
         result = super().pop(key, *args)
-        if self.emitter:
-            self.emitter.emit()
+        if is_existing_key:
+            self._note_change(removed=(key,))
         return result
 
     
@@ -65,19 +79,31 @@ class EmittingWeakKeyDefaultDict(WeakKeyDefaultDict):
         """ D.popitem() -> (k, v), remove and return some (key, value) 
         pair as a 2-tuple; but raise KeyError if D is empty """
         result = super().popitem()
-        if self.emitter:
-            self.emitter.emit()
+        self._note_change(removed=(result[0],))
         return result
 
     
-    def clear(self):
-        """ D.clear() -> None.  Remove all items from D. """
-        result = super().clear()
-        if self.emitter:
-            self.emitter.emit()
+    def setdefault(self, key, default=None):
+        """D.setdefault(k[,d]) -> D.get(k,d), also set D[k]=d if k not in D"""
+        is_new_key = key not in self
+        result = super().setdefault(key, default)
+        if is_new_key:
+            self._note_change(added=(key,))
         return result
 
     
+    def update(self, *args, **kwargs):
+        """ D.update(E, **F) -> None. Update D from E and F, emitting once. """
+        with self.batch_freezer:
+            collections.MutableMapping.update(self, *args, **kwargs)
+
+    
+    def clear(self):
+        """ D.clear() -> None.  Remove all items from D, emitting once. """
+        with self.batch_freezer:
+            super().clear()
+
+    
     def __repr__(self):
         return '%s(%s, %s, %s)' % (
             type(self).__name__,
@@ -102,6 +128,6 @@ class EmittingWeakKeyDefaultDict(WeakKeyDefaultDict):
         if self.default_factory:
             parameters = (self.emitter, self.default_factory)
         else: # not self.default_factory
-            parameters = (self.emitter)
+            parameters = (self.emitter,)
             
         return (type(self), parameters, None, None, iter(self.items()))
\ No newline at end of file
@@ -77,12 +77,38 @@ class LazyTuple(collections.Sequence):
     
     If you're passing in an iterator you definitely know to be infinite,
     specify `definitely_infinite=True`.
+    
+    `LazyTuple` is thread-safe. Items that were already collected are read
+    without taking the lock. If many threads read from the same `LazyTuple`
+    over a slow iterator, you may specify `chunk_size` to have it collect
+    items in chunks of that size, each under a single lock acquisition, and
+    `prefetch` to have a background thread collect that many items ahead of
+    the furthest index that was requested.
+    
+    If the iterator is slow to produce items, for example because it does
+    heavy parsing, you may specify `producer='thread'` or
+    `producer='process'` to have it run continuously in a producer thread or
+    process, which puts items in a queue bounded to `producer_queue_size`.
+    Exceptions raised by the iterator are re-raised when reaching them, and
+    the producer is stopped when the `LazyTuple` is garbage-collected. See
+    `queue_tools.PrefetchingIterator` for more details.
     '''
     
-    def __init__(self, iterable, definitely_infinite=False):
+    def __init__(self, iterable, definitely_infinite=False, chunk_size=1,
+                 prefetch=0, producer=None, producer_queue_size=100):
         was_given_a_sequence = isinstance(iterable, collections.Sequence) and \
                                not isinstance(iterable, LazyTuple)
         
+        if producer not in (None, 'thread', 'process'):
+            raise ValueError("`producer` must be either `'thread'` or "
+                             "`'process'`, not %r." % (producer,))
+        if producer is not None and not was_given_a_sequence:
+            from python_toolbox import queue_tools
+            iterable = queue_tools.PrefetchingIterator(
+                iterable, queue_size=producer_queue_size,
+                use_process=(producer == 'process')
+            )
+        
         self.is_exhausted = True if was_given_a_sequence else False
         '''Flag saying whether the internal iterator is tobag exhausted.'''
         
@@ -100,13 +126,41 @@ class LazyTuple(collections.Sequence):
         `True` then it's definitely infinite.
         '''
         
+        if chunk_size < 1:
+            raise ValueError('`chunk_size` must be at least 1.')
+        self.chunk_size = chunk_size
+        '''
+        The number of items to collect, at least, on each lock acquisition.
+        
+        When an index is requested, the internal iterator is exhausted until
+        the end of the chunk that contains that index.
+        '''
+        
+        self.prefetch = prefetch
+        '''
+        The number of items that a background thread should collect ahead.
+        
+        If this is `0`, no background thread is used.
+        '''
+        
         self.lock = threading.Lock()
         '''Lock used while exhausting to make `LazyTuple` thread-safe.'''
         
+        self._prefetch_thread = None
+        '''The background thread that's currently prefetching, if any.'''
+        
+        self._prefetch_exception = None
+        '''
+        Exception raised by the iterator in the prefetching thread, if any.
+        
+        It'll be re-raised in the thread that next tries to exhaust.
+        '''
+        
         
     @classmethod
     @decorator_tools.helpful_decorator_builder
-    def factory(cls, definitely_infinite=False):
+    def factory(cls, definitely_infinite=False, chunk_size=1, prefetch=0,
+                producer=None, producer_queue_size=100):
         '''
         Decorator to make generators return a `LazyTuple`.
                 
@@ -118,11 +172,18 @@ class LazyTuple(collections.Sequence):
         
         This works on any function that returns an iterator. todo: Make it work
         on iterator classes.
+        
+        The arguments are passed to the `LazyTuple` constructor; for example,
+        use `@LazyTuple.factory(producer='thread')` to have the generator run
+        ahead in a producer thread.
         '''
         
         def inner(function, *args, **kwargs):
             return cls(function(*args, **kwargs),
-                       definitely_infinite=definitely_infinite)
+                       definitely_infinite=definitely_infinite,
+                       chunk_size=chunk_size, prefetch=prefetch,
+                       producer=producer,
+                       producer_queue_size=producer_queue_size)
         return decorator_tools.decorator(inner)
         
     
@@ -165,17 +226,76 @@ class LazyTuple(collections.Sequence):
             if canonical_slice.step > 0: # Compensating for excluded last item:
                 exhaustion_point -= 1
             
-        while len(self.collected_data) <= exhaustion_point:
+        if len(self.collected_data) > exhaustion_point:
+            return # Already collected, no need to take the lock.
+        
+        with self.lock:
+            self._exhaust_to(exhaustion_point)
+            if self.prefetch:
+                self._start_prefetching()
+            
+            
+    def _exhaust_to(self, exhaustion_point):
+        '''
+        Collect items until index `exhaustion_point` is collected.
+        
+        The number of items collected is rounded up to a whole chunk. Must be
+        called while holding `self.lock`.
+        '''
+        if self._prefetch_exception is not None:
+            exception, self._prefetch_exception = \
+                                                self._prefetch_exception, None
+            raise exception
+        if exhaustion_point != infinity and self.chunk_size > 1:
+            exhaustion_point = ((exhaustion_point // self.chunk_size) + 1) * \
+                                                            self.chunk_size - 1
+        collected_data = self.collected_data
+        iterator = self._iterator
+        # We check `is_exhausted` again, because another thread may have
+        # exhausted the iterator while we were waiting for the lock:
+        while not self.is_exhausted and \
+                                      len(collected_data) <= exhaustion_point:
             try:
-                with self.lock:
-                    self.collected_data.append(next(self._iterator))
+                collected_data.append(next(iterator))
             except StopIteration:
                 self.is_exhausted = True
-                break
+                
+                
+    def _start_prefetching(self):
+        '''
+        Start a background thread that collects `self.prefetch` items ahead.
+        
+        Does nothing if such a thread is already running. Must be called while
+        holding `self.lock`, so two threads can't both start one.
+        '''
+        if self.is_exhausted or (self._prefetch_thread is not None and
+                                 self._prefetch_thread.is_alive()):
+            return
+        exhaustion_point = len(self.collected_data) + self.prefetch - 1
+        
+        def prefetch():
+            with self.lock:
+                if self._prefetch_exception is not None:
+                    return
+                try:
+                    self._exhaust_to(exhaustion_point)
+                except Exception as exception:
+                    self._prefetch_exception = exception
+                    
+        self._prefetch_thread = threading.Thread(
+            target=prefetch,
+            name='Prefetching thread for %s' % self.__class__.__name__,
+            daemon=True
+        )
+        self._prefetch_thread.start()
            
             
     def __getitem__(self, i):
         '''Get item by index, either an integer index or a slice.'''
+        collected_data = self.collected_data
+        # Fast path for items that were already collected, no lock needed:
+        if type(i) is int and 0 <= i < len(collected_data):
+            return collected_data[i]
         self.exhaust(i)
         result = self.collected_data[i]
         if isinstance(i, slice):
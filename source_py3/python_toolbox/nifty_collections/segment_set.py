@@ -0,0 +1,132 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+Defines the `SegmentSet` class.
+
+See its documentation for more details.
+'''
+
+import collections
+
+from python_toolbox.third_party.sortedcontainers import SortedDict
+
+
+class SegmentSet(collections.Set):
+    '''
+    A set of disjoint segments, merged as they're added.
+
+    A segment is a 2-tuple of numbers `(start, end)`. When a segment is added,
+    it's merged with any segments it overlaps or touches, so the
+    `SegmentSet` always holds the minimal number of disjoint segments
+    covering everything that was added.
+
+    Example:
+
+        >>> segment_set = SegmentSet([(0, 10), (4, 16)])
+        >>> segment_set.add((16, 17))
+        >>> segment_set.add((30, 40))
+        >>> tuple(segment_set)
+        ((0, 17), (30, 40))
+        >>> segment_set.remove_segment((5, 7))
+        >>> tuple(segment_set)
+        ((0, 5), (7, 17), (30, 40))
+
+    The segments are kept in a `SortedDict` from start to end, so adding and
+    removing segments costs `O(log n)` plus the number of segments affected,
+    instead of re-sorting all the segments.
+    '''
+
+    def __init__(self, segments=()):
+        self._segments = SortedDict()
+        '''Mapping from the start of each segment to its end.'''
+        for segment in segments:
+            self.add(segment)
+
+
+    def add(self, segment):
+        '''Add a segment, merging it with segments it overlaps or touches.'''
+        start, end = segment
+        if start > end:
+            raise ValueError('%s has its start after its end.' % (segment,))
+        segments = self._segments
+        keys = segments.iloc
+        index = segments.bisect_right(start) - 1
+        if index >= 0 and segments[keys[index]] >= start:
+            start = keys[index]
+        else:
+            index += 1
+        while index < len(segments) and keys[index] <= end:
+            existing_start = keys[index]
+            end = max(end, segments.pop(existing_start))
+        segments[start] = end
+
+
+    def remove_segment(self, segment):
+        '''
+        Remove the area covered by `segment`.
+
+        Segments that partially overlap `segment` are cropped, and segments
+        that contain it are split in two.
+        '''
+        start, end = segment
+        segments = self._segments
+        for existing_start, existing_end in self.overlapping(segment):
+            if existing_end <= start or end <= existing_start:
+                continue # Only touching, there's nothing to remove.
+            del segments[existing_start]
+            if existing_start < start:
+                segments[existing_start] = start
+            if end < existing_end:
+                segments[end] = existing_end
+
+
+    def overlapping(self, segment):
+        '''
+        Get the segments that overlap or touch `segment`, in order.
+
+        This takes `O(log n)` plus the number of segments returned.
+        '''
+        start, end = segment
+        segments = self._segments
+        keys = segments.iloc
+        index = segments.bisect_right(start) - 1
+        if index < 0 or segments[keys[index]] < start:
+            index += 1
+        result = []
+        while index < len(segments) and keys[index] <= end:
+            result.append((keys[index], segments[keys[index]]))
+            index += 1
+        return tuple(result)
+
+
+    def covers(self, point):
+        '''Return whether `point` is inside one of the segments.'''
+        segments = self._segments
+        index = segments.bisect_right(point) - 1
+        return index >= 0 and segments[segments.iloc[index]] >= point
+
+
+    def clear(self):
+        '''Remove all the segments.'''
+        self._segments.clear()
+
+
+    def __contains__(self, segment):
+        try:
+            start, end = segment
+        except (TypeError, ValueError):
+            return False
+        return self._segments.get(start, None) == end
+
+
+    def __iter__(self):
+        return iter(self._segments.items())
+
+
+    def __len__(self):
+        return len(self._segments)
+
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, list(self))
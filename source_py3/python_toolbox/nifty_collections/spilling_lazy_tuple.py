@@ -0,0 +1,249 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+This module defines the `SpillingLazyTuple` class.
+
+See its documentation for more information.
+'''
+
+import bisect
+import pickle
+import struct
+import tempfile
+import threading
+
+from .lazy_tuple import LazyTuple
+
+
+class ForgottenItemError(LookupError):
+    '''An item was requested from a `SpillingLazyTuple` after being forgotten.'''
+
+
+class _SpillingList(object):
+    '''
+    Append-only list that keeps only its most recent items in memory.
+
+    Older items are spilled to a temporary file in chunks, and an index of the
+    chunks' offsets is kept so arbitrary items can still be read back. If
+    `spill` is `False`, older items are forgotten instead of spilled.
+
+    Used as the `collected_data` of `SpillingLazyTuple`.
+    '''
+    def __init__(self, memory_window, spill_chunk_size, spill=True,
+                 struct_format=None):
+        self.memory_window = memory_window
+        self.spill_chunk_size = spill_chunk_size
+        self.spill = spill
+
+        self._struct = None if struct_format is None else \
+                                                  struct.Struct(struct_format)
+        self._is_single_field = (self._struct is not None) and \
+                   len(self._struct.unpack(bytes(self._struct.size))) == 1
+
+        self._memory = []
+        '''The items that are kept in memory, i.e. the most recent ones.'''
+
+        self._memory_start = 0
+        '''The index of the first item that's kept in memory.'''
+
+        self._forgotten_before = 0
+        '''All items before this index were forgotten.'''
+
+        self._file = None
+        self._chunk_starts = []
+        '''The index of the first item of each chunk in the file.'''
+        self._chunk_offsets = []
+        '''The `(offset, length)` of each chunk in the file.'''
+
+        self._cached_chunk_number = None
+        self._cached_chunk = None
+
+        self.lock = threading.RLock()
+
+
+    def __len__(self):
+        return self._memory_start + len(self._memory)
+
+
+    def append(self, item):
+        '''Append an item, spilling or forgetting old items if needed.'''
+        with self.lock:
+            memory = self._memory
+            memory.append(item)
+            if len(memory) >= self.memory_window + self.spill_chunk_size:
+                chunk = memory[:self.spill_chunk_size]
+                del memory[:self.spill_chunk_size]
+                if self.spill:
+                    self._write_chunk(self._memory_start, chunk)
+                self._memory_start += len(chunk)
+                if not self.spill:
+                    self._forgotten_before = self._memory_start
+
+
+    def forget_before(self, i):
+        '''
+        Forget all the items before index `i`.
+
+        Items that were forgotten can't be accessed anymore. Disk space is
+        reclaimed once all the spilled items are forgotten.
+        '''
+        with self.lock:
+            i = min(i, len(self))
+            if i <= self._forgotten_before:
+                return
+            self._forgotten_before = i
+            if i >= self._memory_start:
+                del self._memory[:i - self._memory_start]
+                self._memory_start = i
+                self._clear_file()
+
+
+    def _encode(self, items):
+        if self._struct is None:
+            return pickle.dumps(items, protocol=pickle.HIGHEST_PROTOCOL)
+        elif self._is_single_field:
+            return b''.join(map(self._struct.pack, items))
+        else:
+            return b''.join(self._struct.pack(*item) for item in items)
+
+
+    def _decode(self, data):
+        if self._struct is None:
+            return pickle.loads(data)
+        elif self._is_single_field:
+            return [fields[0] for fields in self._struct.iter_unpack(data)]
+        else:
+            return list(self._struct.iter_unpack(data))
+
+
+    def _write_chunk(self, start, items):
+        if self._file is None:
+            self._file = tempfile.TemporaryFile()
+        data = self._encode(items)
+        self._file.seek(0, 2)
+        self._chunk_starts.append(start)
+        self._chunk_offsets.append((self._file.tell(), len(data)))
+        self._file.write(data)
+
+
+    def _read_chunk(self, chunk_number):
+        if chunk_number != self._cached_chunk_number:
+            offset, length = self._chunk_offsets[chunk_number]
+            self._file.seek(offset)
+            self._cached_chunk = self._decode(self._file.read(length))
+            self._cached_chunk_number = chunk_number
+        return self._cached_chunk
+
+
+    def _clear_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._chunk_starts = []
+        self._chunk_offsets = []
+        self._cached_chunk_number = self._cached_chunk = None
+
+
+    def _get_item(self, i):
+        if i >= self._memory_start:
+            return self._memory[i - self._memory_start]
+        elif i < self._forgotten_before:
+            raise ForgottenItemError(
+                'Item number %s was forgotten; only items from number %s on '
+                'are available.' % (i, self._forgotten_before)
+            )
+        else:
+            chunk_number = bisect.bisect_right(self._chunk_starts, i) - 1
+            chunk = self._read_chunk(chunk_number)
+            return chunk[i - self._chunk_starts[chunk_number]]
+
+
+    def __getitem__(self, i):
+        with self.lock:
+            length = len(self)
+            if isinstance(i, slice):
+                return [self._get_item(j) for j in range(*i.indices(length))]
+            if i < 0:
+                i += length
+            if not 0 <= i < length:
+                raise IndexError('Index out of range.')
+            return self._get_item(i)
+
+
+    def __repr__(self):
+        with self.lock:
+            return '[%s%s]' % ('..., ' if self._memory_start else '',
+                               ', '.join(map(repr, self._memory)))
+
+
+class SpillingLazyTuple(LazyTuple):
+    '''
+    A `LazyTuple` that keeps only a window of its items in memory.
+
+    This is useful for wrapping very long iterators, like a stream of log
+    records, when you only need to look back a short way.
+
+    The `memory_window` most recent items are kept in memory. Older items are
+    spilled to a temporary file in chunks of `spill_chunk_size` items, so
+    indexed access to them still works, albeit slower. By default they're
+    pickled; if you specify a `struct_format`, they're packed as fixed-width
+    records using the `struct` module instead, which is faster and more
+    compact. (Items should be tuples if the format has more than one field.)
+
+    If you're streaming and never need to look back further than the memory
+    window, specify `spill=False` and older items will be forgotten instead of
+    spilled. You may also call `forget_before(i)` to forget all items before
+    index `i` explicitly. Accessing a forgotten item raises
+    `ForgottenItemError`.
+    '''
+
+    def __init__(self, iterable, definitely_infinite=False,
+                 memory_window=10000, spill=True, spill_chunk_size=None,
+                 struct_format=None, chunk_size=1, prefetch=0,
+                 producer=None, producer_queue_size=100):
+        LazyTuple.__init__(self, iterable,
+                           definitely_infinite=definitely_infinite,
+                           chunk_size=chunk_size, prefetch=prefetch,
+                           producer=producer,
+                           producer_queue_size=producer_queue_size)
+        if memory_window < 1:
+            raise ValueError('`memory_window` must be at least 1.')
+        if spill_chunk_size is None:
+            spill_chunk_size = max(memory_window // 4, 1)
+        if not self.is_exhausted:
+            self.collected_data = _SpillingList(
+                memory_window=memory_window,
+                spill_chunk_size=spill_chunk_size,
+                spill=spill,
+                struct_format=struct_format
+            )
+
+
+    def forget_before(self, i):
+        '''
+        Forget all the items before index `i`.
+
+        Items that were forgotten can't be accessed anymore, and trying to do
+        so raises `ForgottenItemError`.
+        '''
+        if isinstance(self.collected_data, _SpillingList):
+            self.collected_data.forget_before(i)
+
+
+    def __repr__(self):
+        '''
+        Return a human-readeable representation of the `SpillingLazyTuple`.
+
+        Example:
+
+            <SpillingLazyTuple: [..., 7, 8, 9]...>
+
+        Only the items in memory are shown; the '...' at the start denotes
+        items that were spilled or forgotten.
+        '''
+        if isinstance(self.collected_data, _SpillingList) and \
+                        not self.is_exhausted and not len(self.collected_data):
+            return '<%s: (...)>' % self.__class__.__name__
+        else:
+            return LazyTuple.__repr__(self)
@@ -0,0 +1,139 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+Defines the `TimestampedDict` class.
+
+See its documentation for more details.
+'''
+
+import collections
+import itertools
+
+from python_toolbox.third_party.sortedcontainers import SortedList
+
+infinity = float('inf')
+
+
+class TimestampedDict(collections.MutableMapping):
+    '''
+    A dict that keeps its items ordered by a timestamp given to each item.
+
+    Iterating on a `TimestampedDict` gives its keys ordered by timestamp. Use
+    `.set(key, value, timestamp)` to set an item with an explicit timestamp.
+    When doing `timestamped_dict[key] = value`, the timestamp is obtained by
+    calling `timestamp_function`, which must be given on construction.
+
+    The timestamps may be anything orderable, like numbers or `datetime`
+    objects; the keys only need to be hashable. The timestamps are kept in a
+    `SortedList`, so setting and deleting items costs `O(log n)`, and
+    `pop_until` costs `O(log n)` plus the number of items popped. This makes
+    `TimestampedDict` suitable for expiring cache entries.
+
+    Example:
+
+        >>> timestamped_dict = TimestampedDict()
+        >>> timestamped_dict.set('meow', 1, timestamp=30)
+        >>> timestamped_dict.set('woof', 2, timestamp=10)
+        >>> list(timestamped_dict)
+        ['woof', 'meow']
+        >>> timestamped_dict.pop_until(20)
+        [('woof', 2)]
+
+    '''
+
+    def __init__(self, timestamp_function=None):
+        self.timestamp_function = timestamp_function
+        self._data = {}
+        '''Mapping from key to `(value, timestamp, serial_number)`.'''
+        self._order = SortedList()
+        '''Sorted list of `(timestamp, serial_number, key)`.'''
+        self._serial_numbers = itertools.count()
+        '''Serial numbers that break ties so keys are never compared.'''
+
+
+    def set(self, key, value, timestamp):
+        '''Set `key` to `value`, with the given `timestamp`.'''
+        if key in self._data:
+            del self[key]
+        serial_number = next(self._serial_numbers)
+        self._data[key] = (value, timestamp, serial_number)
+        self._order.add((timestamp, serial_number, key))
+
+
+    def __setitem__(self, key, value):
+        if self.timestamp_function is None:
+            raise TypeError(
+                "This `%s` wasn't given a `timestamp_function`, so you must "
+                "use `.set(key, value, timestamp)` to set items." %
+                type(self).__name__
+            )
+        self.set(key, value, self.timestamp_function())
+
+
+    def __getitem__(self, key):
+        return self._data[key][0]
+
+
+    def get_timestamp(self, key):
+        '''Get the timestamp of `key`.'''
+        return self._data[key][1]
+
+
+    def __delitem__(self, key):
+        value, timestamp, serial_number = self._data.pop(key)
+        self._order.remove((timestamp, serial_number, key))
+
+
+    def pop_until(self, timestamp):
+        '''
+        Remove all items with timestamps up to and including `timestamp`.
+
+        Returns a list of the removed `(key, value)` pairs, oldest first.
+        '''
+        order = self._order
+        data = self._data
+        cutting_point = order.bisect_right((timestamp, infinity))
+        popped_entries = order[:cutting_point]
+        del order[:cutting_point]
+        return [(key, data.pop(key)[0]) for _, _, key in popped_entries]
+
+
+    def items_in_range(self, start, end):
+        '''
+        Get the `(key, value)` pairs with timestamps between `start` and `end`.
+
+        Both ends are inclusive. The items are ordered by timestamp.
+        '''
+        order = self._order
+        data = self._data
+        start_index = order.bisect_left((start, -infinity))
+        end_index = order.bisect_right((end, infinity))
+        return [(key, data[key][0]) for _, _, key in
+                order[start_index:end_index]]
+
+
+    def __iter__(self):
+        return (key for _, _, key in self._order)
+
+
+    def __len__(self):
+        return len(self._data)
+
+
+    def __contains__(self, key):
+        return key in self._data
+
+
+    def clear(self):
+        self._data.clear()
+        self._order.clear()
+
+
+    def __repr__(self):
+        data = self._data
+        return '%s({%s})' % (
+            type(self).__name__,
+            ', '.join('%r: %r' % (key, data[key][0]) for _, _, key in
+                      self._order)
+        )
@@ -6,14 +6,11 @@ Defines the `WeakKeyDefaultDict` class.
 
 See its documentation for more details.
 '''
-# todo: revamp
 
-import collections
-from weakref import ref
+import weakref
 
 
-#todo: needs testing
-class WeakKeyDefaultDict(collections.MutableMapping):
+class WeakKeyDefaultDict(weakref.WeakKeyDictionary):
     '''
     A weak key dictionary which can use a default factory.
     
@@ -25,6 +22,9 @@ class WeakKeyDefaultDict(collections.MutableMapping):
     
     If a "default factory" is supplied, when a key is attempted that doesn't
     exist the default factory will be called to create its new value.
+    
+    This is built on `weakref.WeakKeyDictionary`, so keys that die while the
+    dict is being iterated on are removed in a batch after the iteration ends.
     '''
     
     def __init__(self, *args, **kwargs):
@@ -40,16 +40,9 @@ class WeakKeyDefaultDict(collections.MutableMapping):
             self.default_factory = args[0]
             args = args[1:]
         
-        self.data = {}
-        def remove(k, selfref=ref(self)):
-            self = selfref()
-            if self is not None:
-                del self.data[k]
-        self._remove = remove
-        if args:
-            self.update(args[0])
-
-            
+        weakref.WeakKeyDictionary.__init__(self, args[0] if args else None)
+
+    
     def __missing__(self, key):
         '''Get a value for a key which isn't currently registered.'''
         if self.default_factory is not None:
@@ -58,7 +51,14 @@ class WeakKeyDefaultDict(collections.MutableMapping):
         else: # self.default_factory is None
             raise KeyError(key)
 
-        
+    
+    def __getitem__(self, key):
+        try:
+            return self.data[weakref.ref(key)]
+        except KeyError:
+            return self.__missing__(key)
+
+    
     def __repr__(self, recurse=set()):
         type_name = type(self).__name__
         if id(self) in recurse:
@@ -73,13 +73,23 @@ class WeakKeyDefaultDict(collections.MutableMapping):
         finally:
             recurse.remove(id(self))
 
-            
+    
     def copy(self): # todo: needs testing
         return type(self)(self, default_factory=self.default_factory)
     
     __copy__ = copy
 
     
+    def __deepcopy__(self, memo):
+        from copy import deepcopy
+        factory, arguments = self.__reduce__()[:2]
+        new = factory(*arguments)
+        memo[id(self)] = new
+        for key, value in self.items():
+            new[deepcopy(key, memo)] = deepcopy(value, memo)
+        return new
+
+    
     def __reduce__(self):
         """
         __reduce__ must return a 5-tuple as follows:
@@ -96,58 +106,14 @@ class WeakKeyDefaultDict(collections.MutableMapping):
                 iter(self.items()))
 
     
-    def __delitem__(self, key):
-        del self.data[ref(key)]
-
-        
-    def __getitem__(self, key):
-        try:
-            return self.data[ref(key)]
-        except KeyError:
-            missing_method = getattr(type(self), '__missing__', None)
-            if missing_method:
-                return missing_method(self, key)
-            else:
-                raise
-
-            
-    def __setitem__(self, key, value):
-        self.data[ref(key, self._remove)] = value
-
-        
-    def get(self, key, default=None):
-        return self.data.get(ref(key),default)
-
-    
-    def __contains__(self, key):
-        try:
-            wr = ref(key)
-        except TypeError:
-            return 0
-        return wr in self.data
-
-
-    has_key = __contains__
-
-    
-    def items(self):
-        """ D.items() -> list of D's (key, value) pairs, as 2-tuples """
-        L = []
-        for key, value in list(self.data.items()):
-            o = key()
-            if o is not None:
-                L.append((o, value))
-        return L
+    has_key = weakref.WeakKeyDictionary.__contains__
 
     
     def iteritems(self):
         """ D.iteritems() -> an iterator over the (key, value) items of D """
-        for wr, value in self.data.items():
-            key = wr()
-            if key is not None:
-                yield key, value
+        return self.items()
 
-                
+    
     def iterkeyrefs(self):
         """Return an iterator that yields the weak references to the keys.
 
@@ -158,86 +124,14 @@ class WeakKeyDefaultDict(collections.MutableMapping):
         keep the keys around longer than needed.
 
         """
-        return iter(self.data.keys())
+        return iter(self.keyrefs())
 
     
     def iterkeys(self):
         """ D.iterkeys() -> an iterator over the keys of D """
-        for wr in self.data.keys():
-            obj = wr()
-            if obj is not None:
-                yield obj
-
-                
-    def __iter__(self):
-        return iter(self.keys())
+        return self.keys()
 
     
     def itervalues(self):
         """ D.itervalues() -> an iterator over the values of D """
-        return iter(self.data.values())
-
-    
-    def keyrefs(self):
-        """Return a list of weak references to the keys.
-
-        The references are not guaranteed to be 'live' at the time
-        they are used, so the result of calling the references needs
-        to be checked before being used.  This can be used to avoid
-        creating references that will cause the garbage collector to
-        keep the keys around longer than needed.
-
-        """
-        return list(self.data.keys())
-
-    
-    def keys(self):
-        """ D.keys() -> list of D's keys """
-        L = []
-        for wr in list(self.data.keys()):
-            o = wr()
-            if o is not None:
-                L.append(o)
-        return L
-
-    
-    def popitem(self):
-        """ D.popitem() -> (k, v), remove and return some (key, value) pair 
-        as a 2-tuple; but raise KeyError if D is empty """
-        while 1:
-            key, value = self.data.popitem()
-            o = key()
-            if o is not None:
-                return o, value
-
-            
-    def pop(self, key, *args):
-        """ D.pop(k[,d]) -> v, remove specified key and return the 
-        corresponding value. If key is not found, d is returned if given,
-        otherwise KeyError is raised """
-        return self.data.pop(ref(key), *args)
-
-    
-    def setdefault(self, key, default=None):
-        """D.setdefault(k[,d]) -> D.get(k,d), also set D[k]=d if k not in D"""
-        return self.data.setdefault(ref(key, self._remove),default)
-
-    
-    def update(self, dict=None, **kwargs):
-        """D.update(E, **F) -> None. Update D from E and F: for k in E: D[k] =
-        E[k] (if E has keys else: for (k, v) in E: D[k] = v) then: for k in F:
-        D[k] = F[k] """
-        
-        d = self.data
-        if dict is not None:
-            if not hasattr(dict, "items"):
-                dict = type({})(dict)
-            for key, value in dict.items():
-                d[ref(key, self._remove)] = value
-        if len(kwargs):
-            self.update(kwargs)
-            
-            
-    def __len__(self):
-        return len(self.data)
-              
\ No newline at end of file
+        return self.values()
@@ -6,7 +6,6 @@ Defines the `WeakKeyIdentityDict` class.
 
 See its documentation for more details.
 '''
-# todo: revamp
 
 import weakref
 import collections
@@ -18,45 +17,135 @@ __all__ = ['WeakKeyIdentityDict']
 class IdentityRef(weakref.ref):
     '''A weak reference to an object, hashed by identity and not contents.'''
     
+    __slots__ = ('_hash',)
+    
     def __init__(self, thing, callback=None):
         weakref.ref.__init__(self, thing, callback)
         self._hash = id(thing)
-        
-        
+
+    
     def __hash__(self):
         return self._hash
 
 
+class _IterationGuard:
+    '''
+    Context manager marking that a `WeakKeyIdentityDict` is being iterated on.
+    
+    Keys that die while an iteration is in progress are removed when the last
+    iteration ends, so the dict doesn't change size while it's iterated on.
+    '''
+    
+    __slots__ = ('dict_ref',)
+    
+    def __init__(self, wki_dict):
+        self.dict_ref = weakref.ref(wki_dict)
+
+    
+    def __enter__(self):
+        wki_dict = self.dict_ref()
+        if wki_dict is not None:
+            wki_dict._iterating.add(self)
+        return self
+
+    
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        wki_dict = self.dict_ref()
+        if wki_dict is not None:
+            wki_dict._iterating.remove(self)
+            if not wki_dict._iterating:
+                wki_dict._commit_removals()
+
+
 class WeakKeyIdentityDict(collections.MutableMapping):
     """
     A weak key dictionary which cares about the keys' identities.
     
-    This is a fork of `weakref.WeakKeyDictionary`. Like in the original
+    This is modeled on `weakref.WeakKeyDictionary`. Like in the original
     `WeakKeyDictionary`, the keys are referenced weakly, so if there are no
-    more references to the key, it gets removed from this dict.
+    more references to the key, it gets removed from this dict. Keys that die
+    while the dict is being iterated on are removed in a batch after the
+    iteration ends. Iterating goes over the keys that were in the dict when
+    it started, skipping the ones that were removed since, so the dict may be
+    changed while it's iterated on.
     
     The difference is that `WeakKeyIdentityDict` cares about the keys'
     identities and not their contents, so even unhashable objects like lists
     can be used as keys. The value will be tied to the object's identity and
     not its contents.
+    
+    Internally, both the values and the weak references to the keys are
+    stored by the keys' ids, so looking up a key doesn't require creating a
+    weak reference to it.
     """
-
+    
     def __init__(self, dict_=None):
         self.data = {}
-        def remove(k, selfref=weakref.ref(self)):
+        '''Mapping from the ids of the keys to their values.'''
+        
+        self._refs = {}
+        '''Mapping from the ids of the keys to `IdentityRef`s to them.'''
+        
+        self._pending_removals = []
+        '''Refs to keys that died while iterating, to be removed later.'''
+        
+        self._iterating = set()
+        '''The `_IterationGuard`s of iterations currently in progress.'''
+        
+        def remove(ref, selfref=weakref.ref(self)):
             self = selfref()
             if self is not None:
-                del self.data[k]
+                if self._iterating:
+                    self._pending_removals.append(ref)
+                else:
+                    self._remove_ref(ref)
         self._remove = remove
         if dict_ is not None: self.update(dict_)
 
+    
+    def _remove_ref(self, ref):
+        '''Remove the entry of a dead key, unless its id was reused since.'''
+        key_id = ref._hash
+        if self._refs.get(key_id) is ref:
+            del self._refs[key_id]
+            del self.data[key_id]
+
+    
+    def _commit_removals(self):
+        pending_removals = self._pending_removals
+        while pending_removals:
+            self._remove_ref(pending_removals.pop())
+
+    
+    def _find(self, key):
+        '''
+        Get the id of `key` if it's in the dict, otherwise `None`.
         
+        If `key` isn't in the dict and isn't weakreffable, raises `TypeError`.
+        '''
+        key_id = id(key)
+        ref = self._refs.get(key_id)
+        if ref is not None and ref() is key:
+            return key_id
+        weakref.ref(key) # Raising `TypeError` for non-weakreffable keys.
+        return None
+
+    
     def __delitem__(self, key):
-        del self.data[IdentityRef(key)]
+        key_id = self._find(key)
+        if key_id is None:
+            raise KeyError(key)
+        del self._refs[key_id]
+        del self.data[key_id]
 
-        
+    
     def __getitem__(self, key):
-        return self.data[IdentityRef(key)]
+        key_id = id(key)
+        ref = self._refs.get(key_id)
+        if ref is not None and ref() is key:
+            return self.data[key_id]
+        weakref.ref(key) # Raising `TypeError` for non-weakreffable keys.
+        raise KeyError(key)
 
     
     def __repr__(self):
@@ -64,53 +153,56 @@ class WeakKeyIdentityDict(collections.MutableMapping):
 
     
     def __setitem__(self, key, value):
-        self.data[IdentityRef(key, self._remove)] = value
+        if self._pending_removals and not self._iterating:
+            self._commit_removals()
+        key_id = id(key)
+        ref = self._refs.get(key_id)
+        if ref is None or ref() is not key:
+            self._refs[key_id] = IdentityRef(key, self._remove)
+        self.data[key_id] = value
 
-        
+    
     def copy(self):
         """ D.copy() -> a shallow copy of D """
         new = WeakKeyIdentityDict()
-        for key, value in self.data.items():
-            o = key()
-            if o is not None:
-                new[o] = value
+        for key, value in self.iteritems():
+            new[key] = value
         return new
 
     
     def get(self, key, default=None):
         """ D.get(k[,d]) -> D[k] if k in D, else d.  d defaults to None. """
-        return self.data.get(IdentityRef(key),default)
+        key_id = id(key)
+        ref = self._refs.get(key_id)
+        if ref is not None and ref() is key:
+            return self.data[key_id]
+        return default
 
     
     def __contains__(self, key):
-        try:
-            wr = IdentityRef(key)
-        except TypeError:
-            return 0
-        return wr in self.data
-
+        ref = self._refs.get(id(key))
+        return ref is not None and ref() is key
 
-    has_key = __contains__
     
+    has_key = __contains__
+
     
     def items(self):
         """ D.items() -> list of D's (key, value) pairs, as 2-tuples """
-        L = []
-        for key, value in list(self.data.items()):
-            o = key()
-            if o is not None:
-                L.append((o, value))
-        return L
+        return list(self.iteritems())
 
     
     def iteritems(self):
         """ D.iteritems() -> an iterator over the (key, value) items of D """
-        for wr, value in self.data.items():
-            key = wr()
-            if key is not None:
-                yield key, value
+        data = self.data
+        refs = self._refs
+        with _IterationGuard(self):
+            for key_id, ref in list(refs.items()):
+                key = ref()
+                if key is not None and refs.get(key_id) is ref:
+                    yield key, data[key_id]
 
-                
+    
     def iterkeyrefs(self):
         """Return an iterator that yields the weak references to the keys.
 
@@ -121,23 +213,32 @@ class WeakKeyIdentityDict(collections.MutableMapping):
         keep the keys around longer than needed.
 
         """
-        return iter(self.data.keys())
+        with _IterationGuard(self):
+            yield from list(self._refs.values())
 
     
     def iterkeys(self):
         """ D.iterkeys() -> an iterator over the keys of D """
-        for wr in self.data.keys():
-            obj = wr()
-            if obj is not None:
-                yield obj
+        refs = self._refs
+        with _IterationGuard(self):
+            for key_id, ref in list(refs.items()):
+                key = ref()
+                if key is not None and refs.get(key_id) is ref:
+                    yield key
 
+    
     def __iter__(self):
         return iter(self.keys())
 
     
     def itervalues(self):
         """ D.itervalues() -> an iterator over the values of D """
-        return iter(self.data.values())
+        data = self.data
+        refs = self._refs
+        with _IterationGuard(self):
+            for key_id, ref in list(refs.items()):
+                if ref() is not None and refs.get(key_id) is ref:
+                    yield data[key_id]
 
     
     def keyrefs(self):
@@ -150,39 +251,45 @@ class WeakKeyIdentityDict(collections.MutableMapping):
         keep the keys around longer than needed.
 
         """
-        return list(self.data.keys())
+        return list(self._refs.values())
 
     
     def keys(self):
         """ D.keys() -> list of D's keys """
-        L = []
-        for wr in list(self.data.keys()):
-            o = wr()
-            if o is not None:
-                L.append(o)
-        return L
+        return list(self.iterkeys())
 
     
     def popitem(self):
-        """ D.popitem() -> (k, v), remove and return some (key, value) pair 
+        """ D.popitem() -> (k, v), remove and return some (key, value) pair
         as a 2-tuple; but raise KeyError if D is empty """
         while True:
-            key, value = self.data.popitem()
-            o = key()
-            if o is not None:
-                return o, value
+            key_id, ref = self._refs.popitem()
+            value = self.data.pop(key_id)
+            key = ref()
+            if key is not None:
+                return key, value
 
-            
+    
     def pop(self, key, *args):
         """ D.pop(k[,d]) -> v, remove specified key and return the
         corresponding value. If key is not found, d is returned if given,
         otherwise KeyError is raised """
-        return self.data.pop(IdentityRef(key), *args)
+        key_id = self._find(key)
+        if key_id is None:
+            if args:
+                return args[0]
+            raise KeyError(key)
+        del self._refs[key_id]
+        return self.data.pop(key_id)
 
     
     def setdefault(self, key, default=None):
         """D.setdefault(k[,d]) -> D.get(k,d), also set D[k]=d if k not in D"""
-        return self.data.setdefault(IdentityRef(key, self._remove),default)
+        key_id = self._find(key)
+        if key_id is None:
+            self[key] = default
+            return default
+        return self.data[key_id]
 
     
     def update(self, dict=None, **kwargs):
@@ -190,16 +297,27 @@ class WeakKeyIdentityDict(collections.MutableMapping):
         E[k] (if E has keys else: for (k, v) in E: D[k] = v) then: for k in F:
         D[k] = F[k] """
         
-        d = self.data
         if dict is not None:
             if not hasattr(dict, "items"):
                 dict = type({})(dict)
             for key, value in dict.items():
-                d[IdentityRef(key, self._remove)] = value
+                self[key] = value
         if len(kwargs):
             self.update(kwargs)
 
+    
+    def clear(self):
+        """ D.clear() -> None.  Remove all items from D. """
+        self._refs.clear()
+        self.data.clear()
+        del self._pending_removals[:]
 
+    
     def __len__(self):
+        if self._pending_removals:
+            refs = self._refs
+            return len(self.data) - sum(
+                1 for ref in self._pending_removals
+                if refs.get(ref._hash) is ref
+            )
         return len(self.data)
-    
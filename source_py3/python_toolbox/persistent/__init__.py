@@ -9,5 +9,6 @@ See documentation of `Persistent` and `CrossProcessPersistent` for more info.
 
 from .persistent import Persistent
 from .cross_process_persistent import CrossProcessPersistent
-from .personality import Personality
-from .copy_modes import DontCopyPersistent
\ No newline at end of file
+from .personality import Personality, personality_for, personalities_for
+from .copy_modes import DontCopyPersistent
+from .persistent_library import Library, LibraryStatistics
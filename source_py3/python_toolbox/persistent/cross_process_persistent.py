@@ -9,22 +9,26 @@ See its documentation for more information.
 
 
 Note: This module is still experimental.
-
-todo: need to lock library to avoid thread trouble?
 '''
 
 import uuid
-import weakref
 
 from python_toolbox import caching
 from python_toolbox import copy_tools
 
 from .copy_modes import DontCopyPersistent
 from .persistent import Persistent
-from .personality import Personality
+from .personality import personality_for
+from .persistent_library import Library
+from . import shared_memory_transfer
+
 
+library = Library()
+'''
+The `Library` of the `CrossProcessPersistent` objects alive in this process.
 
-library = weakref.WeakValueDictionary()
+Set `library.recent_size` to keep recently-received objects alive.
+'''
 
 
 class UuidToken:
@@ -57,11 +61,22 @@ class CrossProcessPersistent(Persistent):
     `CrossProcessPersistent` is passed around between processes in queues, each
     process retains only one copy of it.
     
+    If the object's state is big, (e.g. a lookup table or a model,) and it's
+    sent to other processes repeatedly, set `shares_memory = True` in your
+    subclass. Then the first time the object is pickled, its state is placed
+    in shared memory, and later it's only the UUID and the name of the shared
+    memory block that are sent. See `shared_memory_transfer` for more
+    details. This needs Python 3.8 or upwards; on older versions the state is
+    pickled normally.
+    
     Note: This class is still experimental.
     '''
     
     _is_atomically_pickleable = True
     
+    shares_memory = False
+    '''Whether to transfer the state through shared memory.'''
+    
     
     def __new__(cls, *args, **kwargs):
         
@@ -78,14 +93,14 @@ class CrossProcessPersistent(Persistent):
             received_uuid = None
             
         if received_uuid: # The object is being unpickled
-            thing = library.get(received_uuid, None)
-            if thing:
+            thing = library.get_received(received_uuid)
+            if thing is not None:
                 thing._CrossProcessPersistent__skip_setstate = True
                 return thing
             else: # This object does not exist in our library yet; let's add it
                 thing = super().__new__(cls)
                 thing._CrossProcessPersistent__uuid = received_uuid
-                library[received_uuid] = thing
+                library.add_received(received_uuid, thing)
                 return thing
                 
         else: # The object is being created
@@ -127,6 +142,8 @@ class CrossProcessPersistent(Persistent):
                 "using protocol %s. You must use protocol 2 or "
                 "upwards." % protocol
             )
+        elif self.shares_memory and shared_memory_transfer.is_available:
+            return shared_memory_transfer.reduce(self)
         else:
             return object.__reduce_ex__(self, protocol)
             
@@ -153,9 +170,9 @@ class CrossProcessPersistent(Persistent):
 
         
     personality = caching.CachedProperty(
-        Personality,
+        personality_for,
         doc='''Personality containing a human name and two colors.'''
     )
 
 
-
+copy_tools.register_passthrough(CrossProcessPersistent, DontCopyPersistent)
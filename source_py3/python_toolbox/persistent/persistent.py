@@ -63,4 +63,6 @@ class Persistent:
         
     def __copy__(self):
         return self
-    
\ No newline at end of file
+
+
+copy_tools.register_passthrough(Persistent, DontCopyPersistent)
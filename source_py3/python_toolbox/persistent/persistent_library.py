@@ -0,0 +1,157 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+Defines the `Library` class.
+
+See its documentation for more information.
+'''
+
+import collections
+import threading
+import weakref
+
+
+class LibraryStatistics(collections.namedtuple(
+    'LibraryStatistics',
+    ('n_objects', 'n_recent', 'n_hits', 'n_misses', 'n_evictions'))):
+    '''
+    Statistics of a `Library`.
+
+    `n_objects` is the number of live objects in the library, and `n_recent`
+    is how many of them are kept alive by the recently-received tier.
+    `n_hits` and `n_misses` count how many received objects were or weren't
+    in the library already, and `n_evictions` counts the objects that were
+    pushed out of the recently-received tier.
+    '''
+    __slots__ = ()
+
+
+class Library(collections.MutableMapping):
+    '''
+    Mapping from UUID to `CrossProcessPersistent`, keeping it alive weakly.
+
+    Every `CrossProcessPersistent` that's created or received in a process is
+    in the library, so receiving the same object again gives back the same
+    object, for as long as it's alive.
+
+    When an object dies, it's removed from the library, and if it's received
+    again, it's loaded again as a new object. To avoid this for objects that
+    are sent to a process repeatedly but not kept alive there between sends,
+    the library keeps strong references to up to `recent_size` recently
+    received objects, dropping the least-recently received first. By default
+    `recent_size` is 0, so nothing is kept alive by the library.
+    '''
+
+    def __init__(self, recent_size=0):
+        self._objects = weakref.WeakValueDictionary()
+        self._recent = collections.OrderedDict()
+        '''Strong references to recently received objects, oldest first.'''
+        self._lock = threading.RLock()
+        self._n_hits = self._n_misses = self._n_evictions = 0
+        self.recent_size = recent_size
+
+
+    @property
+    def recent_size(self):
+        '''The maximal number of recently-received objects to keep alive.'''
+        return self._recent_size
+
+
+    @recent_size.setter
+    def recent_size(self, recent_size):
+        if recent_size < 0:
+            raise ValueError('`recent_size` must be at least 0.')
+        with self._lock:
+            self._recent_size = recent_size
+            self._trim_recent()
+
+
+    def _trim_recent(self):
+        while len(self._recent) > self._recent_size:
+            self._recent.popitem(last=False)
+            self._n_evictions += 1
+
+
+    def get_received(self, uuid):
+        '''
+        Get the object with `uuid` that was just received, or `None`.
+
+        This counts a hit or a miss, and on a hit, marks the object as
+        recently received.
+        '''
+        with self._lock:
+            thing = self._objects.get(uuid)
+            if thing is None:
+                self._n_misses += 1
+            else:
+                self._n_hits += 1
+                if uuid in self._recent:
+                    self._recent.move_to_end(uuid)
+                elif self._recent_size:
+                    self._recent[uuid] = thing
+                    self._trim_recent()
+            return thing
+
+
+    def add_received(self, uuid, thing):
+        '''Add an object that was received, marking it as recently received.'''
+        with self._lock:
+            self._objects[uuid] = thing
+            if self._recent_size:
+                self._recent[uuid] = thing
+                self._recent.move_to_end(uuid)
+                self._trim_recent()
+
+
+    def __getitem__(self, uuid):
+        return self._objects[uuid]
+
+
+    def __setitem__(self, uuid, thing):
+        with self._lock:
+            self._objects[uuid] = thing
+
+
+    def __delitem__(self, uuid):
+        with self._lock:
+            del self._objects[uuid]
+            self._recent.pop(uuid, None)
+
+
+    def __iter__(self):
+        return iter(list(self._objects.keys()))
+
+
+    def __len__(self):
+        return len(self._objects)
+
+
+    def __contains__(self, uuid):
+        return uuid in self._objects
+
+
+    def clear_recent(self):
+        '''Drop the strong references to the recently received objects.'''
+        with self._lock:
+            self._recent.clear()
+
+
+    def get_statistics(self):
+        '''Get the `LibraryStatistics` of this library.'''
+        with self._lock:
+            return LibraryStatistics(len(self._objects), len(self._recent),
+                                     self._n_hits, self._n_misses,
+                                     self._n_evictions)
+
+
+    def reset_statistics(self):
+        '''Reset the hit, miss and eviction counts.'''
+        with self._lock:
+            self._n_hits = self._n_misses = self._n_evictions = 0
+
+
+    def __repr__(self):
+        return '<%s: %s objects, %s recent>' % (
+            type(self).__name__, len(self._objects), len(self._recent)
+        )
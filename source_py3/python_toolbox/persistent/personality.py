@@ -7,11 +7,83 @@ Defines the `Personality` class.
 See its documentation for more information.
 '''
 
+import collections
 import colorsys
+import threading
 
 from .persistent import Persistent
 
 
+_color_resolution = 100
+
+_personalities = collections.OrderedDict()
+'''Mapping from UUID to its personality, for the most recent UUIDs.'''
+
+_personalities_lock = threading.Lock()
+
+max_cached_personalities = 10000
+'''The number of UUIDs whose personalities are kept after they were made.'''
+
+_name_list = None
+'''The names from `human_names`, once they're needed.'''
+
+_light_colors = {}
+'''Mapping from a light color seed to its light color.'''
+
+_dark_colors = {}
+'''Mapping from a dark color seed to its dark color.'''
+
+
+def _get_color(colors, color_seed, lightness):
+    '''
+    Get the color for `color_seed`, calculating it if it's not in `colors`.
+    
+    The low base-100 digit of the seed is the hue and the high one is the
+    saturation.
+    '''
+    try:
+        return colors[color_seed]
+    except KeyError:
+        (saturation_seed, hue_seed) = divmod(color_seed, _color_resolution)
+        color = colors[color_seed] = colorsys.hls_to_rgb(
+            hue_seed * (1.0/_color_resolution),
+            lightness,
+            saturation_seed * (1.0/_color_resolution)
+        )
+        return color
+
+
+def _get_name_list():
+    global _name_list
+    if _name_list is None:
+        from python_toolbox import human_names
+        # (Importing inside function to avoid importing this heavy module on
+        # general import time.)
+        _name_list = human_names.name_list
+    return _name_list
+
+
+def _get_seeds(uuid_ints):
+    '''
+    Get `(human_name_seed, light_color_seed, dark_color_seed)` for each UUID.
+    
+    The human name seed is the UUID modulo the number of names, and the color
+    seeds are made of the next four base-100 digits. Only those digits of the
+    quotient are needed, so after one division by the number of names, the
+    rest is small-integer arithmetic.
+    '''
+    n_names = len(_get_name_list())
+    color_seed_modulo = _color_resolution ** 2
+    color_modulo = color_seed_modulo ** 2
+    seeds = []
+    for uuid_int in uuid_ints:
+        (quotient, human_name_seed) = divmod(uuid_int, n_names)
+        (dark_color_seed, light_color_seed) = divmod(quotient % color_modulo,
+                                                     color_seed_modulo)
+        seeds.append((human_name_seed, light_color_seed, dark_color_seed))
+    return seeds
+
+
 class Personality:
     '''
     A bunch of easy-to-remember attributes associated with a persistent object.
@@ -26,47 +98,88 @@ class Personality:
     identify the persistent object.
     
     Colors are specified in RGB.
+    
+    Use `personality_for` or `personalities_for` to get the personality of an
+    object; they give the same `Personality` to objects with the same UUID.
     '''
     
     def __init__(self, persistent):
-        
-        from python_toolbox import human_names
-        # (Importing inside function to avoid importing this heavy module on
-        # general import time.)
-        
         assert isinstance(persistent, Persistent)
-        
-        color_resolution = 100
-        
-        u = int(persistent._CrossProcessPersistent__uuid)
-        
-        (u, human_name_seed) = divmod(
-            u,
-            len(human_names.name_list)
+        self._set_seeds(
+            *_get_seeds((int(persistent._CrossProcessPersistent__uuid),))[0]
         )
-        self.human_name = human_names.name_list[human_name_seed]
-        '''A human name. (e.g. "Jeffrey".)'''
-        
-        color_seeds = []
-        for i in range(4):
-            (u, new_color_seed) = divmod(u, color_resolution)
-            color_seeds.append(new_color_seed)
         
-
-        normalized_color_seeds = \
-            [color_seed * (1.0/color_resolution) for color_seed in color_seeds]
         
-        light_color_hls = \
-            (normalized_color_seeds[0], 0.9, normalized_color_seeds[1])
-        dark_color_hls = \
-            (normalized_color_seeds[2], 0.3, normalized_color_seeds[3])
+    def _set_seeds(self, human_name_seed, light_color_seed, dark_color_seed):
+        self.human_name = _get_name_list()[human_name_seed]
+        '''A human name. (e.g. "Jeffrey".)'''
         
-        self.light_color = colorsys.hls_to_rgb(*light_color_hls)
+        self.light_color = _get_color(_light_colors, light_color_seed, 0.9)
         '''A light color in RGB. (e.g. `(0.98, 0.86, 0.81)`.)'''
         
-        self.dark_color = colorsys.hls_to_rgb(*dark_color_hls)
+        self.dark_color = _get_color(_dark_colors, dark_color_seed, 0.3)
         '''A dark color in RGB. (e.g. `(0.58, 0.01, 0.35)`.)'''
         
-                          
-                        
-                          
+        
+def _add_personality(uuid_int, personality):
+    '''Cache `personality` for `uuid_int`, unless it already has one.'''
+    with _personalities_lock:
+        personality = _personalities.setdefault(uuid_int, personality)
+        if len(_personalities) > max_cached_personalities:
+            _personalities.popitem(last=False)
+    return personality
+    
+
+def personality_for(persistent):
+    '''
+    Get the `Personality` of a `CrossProcessPersistent`.
+    
+    Objects with the same UUID get the same `Personality` object, as long as
+    it's one of the last `max_cached_personalities` that were made. This is
+    what the `.personality` attribute of `CrossProcessPersistent` uses.
+    '''
+    assert isinstance(persistent, Persistent)
+    uuid_int = int(persistent._CrossProcessPersistent__uuid)
+    personality = _personalities.get(uuid_int)
+    if personality is None:
+        personality = Personality.__new__(Personality)
+        personality._set_seeds(*_get_seeds((uuid_int,))[0])
+        personality = _add_personality(uuid_int, personality)
+    return personality
+
+
+def personalities_for(persistents):
+    '''
+    Get the `Personality` of each of the `CrossProcessPersistent`s given.
+    
+    Returns a list. This is faster than getting `.personality` of each object
+    one by one, because the seeds of the new personalities are derived in one
+    batch. The personalities are cached on the objects, so their
+    `.personality` attribute returns the same ones.
+    '''
+    persistents = list(persistents)
+    personalities = [persistent.__dict__.get('personality') for persistent in
+                     persistents]
+    missing = {}
+    '''Mapping from UUID to the indices of the objects that need it.'''
+    for i, (persistent, personality) in enumerate(zip(persistents,
+                                                      personalities)):
+        if personality is None:
+            assert isinstance(persistent, Persistent)
+            uuid_int = int(persistent._CrossProcessPersistent__uuid)
+            personality = _personalities.get(uuid_int)
+            if personality is None:
+                missing.setdefault(uuid_int, []).append(i)
+            else:
+                personalities[i] = persistent.personality = personality
+                
+    if missing:
+        uuid_ints = list(missing)
+        for uuid_int, seeds in zip(uuid_ints, _get_seeds(uuid_ints)):
+            personality = Personality.__new__(Personality)
+            personality._set_seeds(*seeds)
+            personality = _add_personality(uuid_int, personality)
+            for i in missing[uuid_int]:
+                personalities[i] = persistents[i].personality = personality
+                
+    return personalities
@@ -0,0 +1,182 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+Transfers the state of `CrossProcessPersistent`s through shared memory.
+
+This is used by `CrossProcessPersistent` subclasses that set
+`shares_memory = True`. The first time such an object is pickled, its state
+is pickled with protocol 5 into a block of shared memory, with its large
+buffers (e.g. NumPy arrays) out-of-band, so they're placed in the block as
+they are. From then on, pickling the object sends only its UUID and the
+block's name. A process that unpickles it maps the block, and the large
+buffers are used in place, without copying.
+
+The block starts with a reference count of the processes that have it
+mapped. When the object dies in a process, the count is decremented, and the
+process that brings it to zero unlinks the block. This means that an object
+must be kept alive in the sending process until it's been received.
+
+This requires `multiprocessing.shared_memory` and pickle protocol 5, which
+are available on Python 3.8 and upwards. Check `is_available`; when it's
+`False`, `CrossProcessPersistent` pickles the state normally.
+'''
+
+import contextlib
+import pickle
+import struct
+import threading
+import weakref
+
+try:
+    from multiprocessing import shared_memory
+    from multiprocessing import resource_tracker
+except ImportError:
+    shared_memory = None
+
+is_available = (shared_memory is not None) and \
+                                           (pickle.HIGHEST_PROTOCOL >= 5)
+'''Whether shared-memory transfer works on this Python.'''
+
+try:
+    import fcntl
+except ImportError: # Windows, where the block is freed with its last handle.
+    fcntl = None
+
+
+_header_struct = struct.Struct('qqq')
+'''Reference count, length of the pickle and number of buffers.'''
+_buffer_struct = struct.Struct('qq')
+'''Offset and length of an out-of-band buffer.'''
+_alignment = 64
+
+_shared_memories = {}
+'''Mapping from UUID to the `SharedMemory` this process has for it.'''
+_lock = threading.Lock()
+
+
+def _align(offset):
+    return -(-offset // _alignment) * _alignment
+
+
+@contextlib.contextmanager
+def _locked(shared_memory_):
+    '''Lock the reference count of `shared_memory_` against other processes.'''
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(shared_memory_._fd, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(shared_memory_._fd, fcntl.LOCK_UN)
+
+
+def _change_reference_count(shared_memory_, difference):
+    '''Change the reference count and return the new one.'''
+    with _locked(shared_memory_):
+        reference_count, = struct.unpack_from('q', shared_memory_.buf, 0)
+        reference_count += difference
+        struct.pack_into('q', shared_memory_.buf, 0, reference_count)
+    return reference_count
+
+
+def _untrack(shared_memory_):
+    # The resource tracker would unlink the block when this process exits,
+    # even if other processes still use it; we count references instead.
+    resource_tracker.unregister(shared_memory_._name, 'shared_memory')
+
+
+def _export(state):
+    '''Pickle `state` into a new `SharedMemory` block and return it.'''
+    buffers = []
+    data = pickle.dumps(state, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [buffer.raw() for buffer in buffers]
+    header_size = _header_struct.size + _buffer_struct.size * len(buffers)
+    offset = _align(header_size + len(data))
+    buffer_positions = []
+    for raw_buffer in raw_buffers:
+        buffer_positions.append((offset, raw_buffer.nbytes))
+        offset = _align(offset + raw_buffer.nbytes)
+
+    shared_memory_ = shared_memory.SharedMemory(create=True,
+                                                size=max(offset, 1))
+    _untrack(shared_memory_)
+    memory = shared_memory_.buf
+    _header_struct.pack_into(memory, 0, 1, len(data), len(buffers))
+    position = _header_struct.size
+    for buffer_position in buffer_positions:
+        _buffer_struct.pack_into(memory, position, *buffer_position)
+        position += _buffer_struct.size
+    memory[position:position + len(data)] = data
+    for (buffer_offset, length), raw_buffer in zip(buffer_positions,
+                                                   raw_buffers):
+        memory[buffer_offset:buffer_offset + length] = raw_buffer
+    del memory
+    return shared_memory_
+
+
+def _import(shared_memory_):
+    '''Unpickle the state from a `SharedMemory` block, mapping its buffers.'''
+    memory = shared_memory_.buf
+    _, data_length, n_buffers = _header_struct.unpack_from(memory, 0)
+    position = _header_struct.size
+    buffers = []
+    for _ in range(n_buffers):
+        buffer_offset, length = _buffer_struct.unpack_from(memory, position)
+        buffers.append(memory[buffer_offset:buffer_offset + length])
+        position += _buffer_struct.size
+    return pickle.loads(memory[position:position + data_length],
+                        buffers=buffers)
+
+
+def _release(uuid, shared_memory_):
+    '''Drop this process's reference to a block, unlinking it if it's last.'''
+    with _lock:
+        if _shared_memories.get(uuid) is shared_memory_:
+            del _shared_memories[uuid]
+    if _change_reference_count(shared_memory_, -1) == 0 and fcntl is not None:
+        # `unlink` unregisters the block from the resource tracker, so
+        # register it back first:
+        resource_tracker.register(shared_memory_._name, 'shared_memory')
+        shared_memory_.unlink()
+    try:
+        shared_memory_.close()
+    except BufferError: # Something from the state still uses the memory.
+        pass
+
+
+def reduce(thing):
+    '''
+    Get the `__reduce__` value of a `CrossProcessPersistent`.
+
+    The object's state is exported to shared memory if it wasn't already.
+    '''
+    uuid = thing._CrossProcessPersistent__uuid
+    with _lock:
+        shared_memory_ = _shared_memories.get(uuid)
+        if shared_memory_ is None:
+            shared_memory_ = _shared_memories[uuid] = \
+                                                 _export(thing.__getstate__())
+            weakref.finalize(thing, _release, uuid, shared_memory_)
+    return (_reconstruct, (type(thing), uuid, shared_memory_.name))
+
+
+def _reconstruct(cls, uuid, name):
+    '''Get the object with `uuid`, loading it from the block `name` if new.'''
+    from .cross_process_persistent import UuidToken
+    thing = cls.__new__(cls, UuidToken(uuid))
+    if thing.__dict__.pop('_CrossProcessPersistent__skip_setstate', None):
+        return thing # We already have it.
+    shared_memory_ = shared_memory.SharedMemory(name=name)
+    _untrack(shared_memory_)
+    _change_reference_count(shared_memory_, 1)
+    try:
+        thing.__setstate__(_import(shared_memory_))
+    except BaseException:
+        _release(uuid, shared_memory_)
+        raise
+    with _lock:
+        _shared_memories[uuid] = shared_memory_
+    weakref.finalize(thing, _release, uuid, shared_memory_)
+    return thing
@@ -6,6 +6,9 @@
 
 import queue as queue_module
 import sys
+import threading
+import pickle
+import weakref
 
 from python_toolbox import caching
 from python_toolbox import import_tools
@@ -100,4 +103,157 @@ def _platform_supports_multiprocessing_qsize():
     except NotImplementedError:
         return False
     else:
-        return True
\ No newline at end of file
+        return True
+
+
+# Kinds of messages that a `PrefetchingIterator` producer sends:
+_ITEM, _EXCEPTION, _END = range(3)
+
+_PRODUCER_POLL_INTERVAL = 0.1
+
+
+def _put_unless_stopped(queue, message, stop_event):
+    '''
+    Put `message` in the bounded `queue`, giving up if `stop_event` is set.
+    
+    Returns whether the message was put.
+    '''
+    while not stop_event.is_set():
+        try:
+            queue.put(message, timeout=_PRODUCER_POLL_INTERVAL)
+        except queue_module.Full:
+            continue
+        else:
+            return True
+    return False
+
+
+def _produce(iterable, queue, stop_event, in_process=False):
+    '''Iterate over `iterable`, putting its items in `queue`.'''
+    iterator = None
+    try:
+        iterator = iter(iterable)
+        for item in iterator:
+            if not _put_unless_stopped(queue, (_ITEM, item), stop_event):
+                return
+    except BaseException as exception:
+        if in_process:
+            try:
+                pickle.dumps(exception)
+            except Exception:
+                exception = Exception(repr(exception))
+        _put_unless_stopped(queue, (_EXCEPTION, exception), stop_event)
+    else:
+        _put_unless_stopped(queue, (_END, None), stop_event)
+    finally:
+        if stop_event.is_set():
+            if hasattr(iterator, 'close'):
+                iterator.close()
+            if in_process:
+                # Nobody will read what's left in the queue, so don't let the
+                # queue's feeder thread keep the process alive flushing it:
+                queue.cancel_join_thread()
+
+
+_PROCESS_STOP_TIMEOUT = 1
+
+
+def _stop_producer(stop_event, producer):
+    '''
+    Stop a `PrefetchingIterator` producer.
+    
+    A producer process is given `_PROCESS_STOP_TIMEOUT` seconds to exit, and
+    is then terminated.
+    '''
+    stop_event.set()
+    if not isinstance(producer, threading.Thread):
+        producer.join(_PROCESS_STOP_TIMEOUT)
+        if producer.is_alive():
+            producer.terminate()
+            producer.join()
+
+
+class PrefetchingIterator:
+    '''
+    Iterator that prefetches items from `iterable` in a producer thread.
+    
+    The producer puts the items in a queue bounded to `queue_size` items, so
+    it stops to wait whenever the consumer falls behind. Exceptions raised by
+    the iterable are re-raised by `next` in the consumer, after all the items
+    before them were consumed.
+    
+    Specify `use_process=True` to run the producer in a process instead of a
+    thread. Items and exceptions are then pickled over a `multiprocessing`
+    queue. Unless the platform uses the "fork" start method, `iterable` must
+    be picklable too, which excludes generators.
+    
+    The producer is stopped when `close` is called or when the
+    `PrefetchingIterator` is garbage-collected.
+    '''
+    def __init__(self, iterable, queue_size=100, use_process=False):
+        if use_process:
+            import multiprocessing
+            self._queue = multiprocessing.Queue(queue_size)
+            self._stop_event = multiprocessing.Event()
+            self._producer = multiprocessing.Process(
+                target=_produce,
+                args=(iterable, self._queue, self._stop_event, True),
+                daemon=True
+            )
+        else:
+            self._queue = queue_module.Queue(queue_size)
+            self._stop_event = threading.Event()
+            self._producer = threading.Thread(
+                target=_produce,
+                args=(iterable, self._queue, self._stop_event),
+                name='Producer thread for %s' % type(self).__name__,
+                daemon=True
+            )
+        self.is_finished = False
+        '''Flag saying whether the producer finished or was stopped.'''
+        
+        self._producer.start()
+        self._finalizer = weakref.finalize(self, _stop_producer,
+                                           self._stop_event, self._producer)
+        
+        
+    def __iter__(self):
+        return self
+    
+        
+    def __next__(self):
+        if self.is_finished:
+            raise StopIteration
+        while True:
+            try:
+                kind, value = self._queue.get(
+                    timeout=_PRODUCER_POLL_INTERVAL
+                )
+            except queue_module.Empty:
+                if not self._producer.is_alive() and \
+                                       not self._stop_event.is_set():
+                    try: # It might have put a message just before dying.
+                        kind, value = self._queue.get(
+                            timeout=_PRODUCER_POLL_INTERVAL
+                        )
+                    except queue_module.Empty:
+                        self.close()
+                        raise RuntimeError('The producer died unexpectedly.')
+                    else:
+                        break
+            else:
+                break
+        if kind == _ITEM:
+            return value
+        self.close()
+        if kind == _EXCEPTION:
+            raise value
+        else:
+            assert kind == _END
+            raise StopIteration
+        
+        
+    def close(self):
+        '''Stop the producer. No more items will be returned.'''
+        self.is_finished = True
+        self._finalizer()
@@ -3,8 +3,6 @@
 
 '''Module for tools to deal with segments, i.e. 2-tuples of numbers.'''
 
-from python_toolbox import cute_iter_tools
-
 
 def crop_segment(segment, base_segment):
     '''
@@ -46,28 +44,11 @@ def merge_segments(segments):
         >>> merge_segments((0, 10), (4, 16), (16, 17), (30, 40))
         ((0, 17), (30, 40))
 
+    If you need to add segments one by one and keep them merged, use
+    `nifty_collections.SegmentSet` instead of calling this function again and
+    again.
     '''
-    sorted_segments = sorted(segments)
-    assert all(len(segment) == 2 for segment in sorted_segments)
-    
-    fixed_segments = []
-    pushback_iterator = cute_iter_tools.PushbackIterator(sorted_segments)
-    
-    for first_segment_in_run in pushback_iterator: # (Sharing iterator with
-                                                   #  other for loop.)
-        current_maximum = first_segment_in_run[1]
-        
-        for segment in pushback_iterator: # (Sharing iterator with other for
-                                          #  loop.)
-            if segment[0] > current_maximum:
-                pushback_iterator.push_back()
-                break
-            elif segment[1] > current_maximum:
-                current_maximum = segment[1]
-            
-        fixed_segments.append((first_segment_in_run[0], current_maximum))
-        
-        
-    return tuple(fixed_segments)
-
-
+    from python_toolbox.nifty_collections import SegmentSet
+    segments = tuple(segments)
+    assert all(len(segment) == 2 for segment in segments)
+    return tuple(SegmentSet(segments))
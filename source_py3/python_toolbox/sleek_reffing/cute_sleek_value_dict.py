@@ -247,11 +247,7 @@ class CuteSleekValueDict(collections.UserDict):
 
 class KeyedSleekRef(SleekRef):
     """Sleekref whose weakref (if one exists) holds reference to a key."""
-
-    def __new__(cls, thing, callback, key):
-        self = SleekRef.__new__(cls)
-        return self
-
+    __slots__ = ()
     
     def __init__(self, thing, callback, key):
         super().__init__(thing, callback)
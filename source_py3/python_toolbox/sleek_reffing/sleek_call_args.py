@@ -7,15 +7,21 @@ Defines the `SleekCallArgs` class.
 See its documentation for more details.
 '''
 
+import weakref
+
 from python_toolbox import cute_inspect
 from python_toolbox import cheat_hashing
 
-from .sleek_ref import SleekRef
-from .cute_sleek_value_dict import CuteSleekValueDict
+from .exceptions import SleekRefDied
 
 
 __all__ = ['SleekCallArgs']
 
+
+class _ArgRef(weakref.ref):
+    '''A weakref to an argument value of a `SleekCallArgs`.'''
+    __slots__ = ()
+
     
 class SleekCallArgs:
     '''
@@ -28,6 +34,7 @@ class SleekCallArgs:
             pass
             
     The calls `f(1)`, `f(1, 2)` and `f(b=2, a=1)` all share the same call args.
+    Keyword-only arguments are supported too.
     
     All the argument values are sleekreffed to avoid memory leaks. (See
     documentation of `python_toolbox.sleek_reffing.SleekRef` for more details.)
@@ -36,6 +43,16 @@ class SleekCallArgs:
     # dictionary? It will render this SCA invalid, but we'll still be in the
     # dict. So make note to user: Always keep reference to args and kwargs
     # until the SCA gets added to the dict.
+    
+    # The values are kept in a flat tuple: First the named arguments in the
+    # order of the function's signature, then the star-args, then the
+    # star-kwargs sorted by name. `_layout` says which is which, so comparing
+    # two `SleekCallArgs` doesn't need to build any dicts. Like in `SleekRef`,
+    # weakreffable values are weakreffed, (with an `_ArgRef`,) and other
+    # values are kept as they are.
+    __slots__ = ('containing_dict', '_layout', '_refs', '_hash',
+                 '__weakref__')
+    
     def __init__(self, containing_dict, function, *args, **kwargs):
         '''
         Construct the `SleekCallArgs`.
@@ -50,56 +67,69 @@ class SleekCallArgs:
         `dict` we'll try to remove ourselves from when 1 of our sleekrefs dies.
         '''
         
-        args_spec = cute_inspect.getargspec(function)
-        star_args_name, star_kwargs_name = \
-                      args_spec.varargs, args_spec.keywords
-        
-        call_args = cute_inspect.getcallargs(function, *args, **kwargs)
+        binder = cute_inspect.get_binder(function)
+        (values, star_args, star_kwargs) = binder.bind(*args, **kwargs)
         del args, kwargs
         
-        self.star_args_refs = []
-        '''Sleekrefs to star-args.'''
-        
-        if star_args_name:
-            star_args = call_args.pop(star_args_name, None)
-            if star_args:
-                self.star_args_refs = [SleekRef(star_arg, self.destroy) for
-                                       star_arg in star_args]
+        values.extend(star_args)
+        if star_kwargs:
+            star_kwargs_names = tuple(sorted(star_kwargs))
+            values.extend(star_kwargs[name] for name in star_kwargs_names)
+        else:
+            star_kwargs_names = ()
         
-        self.star_kwargs_refs = {}
-        '''Sleerefs to star-kwargs.'''
-        if star_kwargs_name:            
-            star_kwargs = call_args.pop(star_kwargs_name, {})
-            if star_kwargs:
-                self.star_kwargs_refs = CuteSleekValueDict(self.destroy,
-                                                           star_kwargs)
+        self._layout = (binder.arg_names, len(star_args), star_kwargs_names)
         
-        self.args_refs = CuteSleekValueDict(self.destroy, call_args)
-        '''Mapping from argument name to value, sleek-style.'''
+        destroy = self.destroy
+        refs = []
+        for value in values:
+            try:
+                refs.append(_ArgRef(value, destroy))
+            except TypeError:
+                refs.append(value)
+        self._refs = tuple(refs)
         
-        # In the future the `.args`, `.star_args` and `.star_kwargs` attributes
-        # may change, so we must record the hash now:
-        self._hash = cheat_hashing.cheat_hash(
-            (
-                self.args,
-                self.star_args,
-                self.star_kwargs
-            )
-        )
+        # The sleekreffed values may change in the future, so we must record
+        # the hash now:
+        self._hash = cheat_hashing.cheat_hash(tuple(values))
         
         
+    def _get_values(self):
+        values = []
+        for ref in self._refs:
+            if type(ref) is _ArgRef:
+                value = ref()
+                if value is None:
+                    raise SleekRefDied
+                values.append(value)
+            else:
+                values.append(ref)
+        return tuple(values)
+    
+    
+    @property
+    def args(self):
+        '''The arguments.'''
+        arg_names = self._layout[0]
+        return dict(zip(arg_names, self._get_values()[:len(arg_names)]))
     
-    args = property(lambda self: dict(self.args_refs))
-    '''The arguments.'''
     
-    star_args = property(
-        lambda self:
-            tuple((star_arg_ref() for star_arg_ref in self.star_args_refs))
-    )
-    '''Extraneous arguments. (i.e. `*args`.)'''
+    @property
+    def star_args(self):
+        '''Extraneous arguments. (i.e. `*args`.)'''
+        arg_names, n_star_args, _ = self._layout
+        return self._get_values()[len(arg_names):
+                                  len(arg_names) + n_star_args]
     
-    star_kwargs = property(lambda self: dict(self.star_kwargs_refs))
-    '''Extraneous keyword arguments. (i.e. `*kwargs`.)'''
+    
+    @property
+    def star_kwargs(self):
+        '''Extraneous keyword arguments. (i.e. `*kwargs`.)'''
+        arg_names, n_star_args, star_kwargs_names = self._layout
+        return dict(zip(
+            star_kwargs_names,
+            self._get_values()[len(arg_names) + n_star_args:]
+        ))
     
         
     def destroy(self, _=None):
@@ -118,13 +148,23 @@ class SleekCallArgs:
     def __eq__(self, other):
         if not isinstance(other, SleekCallArgs):
             return NotImplemented
-        return self.args == other.args and \
-               self.star_args == other.star_args and \
-               self.star_kwargs == other.star_kwargs
+        if self is other:
+            return True
+        if self._hash != other._hash or self._layout != other._layout:
+            return False
+        for value, other_value in zip(self._refs, other._refs):
+            if type(value) is _ArgRef:
+                value = value()
+                if value is None:
+                    return False
+            if type(other_value) is _ArgRef:
+                other_value = other_value()
+                if other_value is None:
+                    return False
+            if value is not other_value and not value == other_value:
+                return False
+        return True
 
     
     def __ne__(self, other):
         return not self == other
-    
-    
-    
\ No newline at end of file
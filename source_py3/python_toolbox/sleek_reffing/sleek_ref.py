@@ -21,8 +21,10 @@ class Ref(weakref.ref):
     '''
     A weakref.
     
-    What this adds over `weakref.ref` is the ability to add custom attributes.
+    What this adds over `weakref.ref` is a `key` attribute, used by
+    `KeyedSleekRef`.
     '''
+    __slots__ = ('key',)
 
 
 class SleekRef:
@@ -43,6 +45,8 @@ class SleekRef:
     raises `SleekRefDied`. Therefore, unlike weakref, you can store `None` in a
     sleekref.
     '''
+    __slots__ = ('callback', 'is_none', 'ref', 'thing')
+    
     def __init__(self, thing, callback=None):
         '''
         Construct the sleekref.
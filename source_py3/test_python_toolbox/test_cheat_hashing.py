@@ -1,10 +1,13 @@
 # Copyright 2009-2015 Ram Rachum.
 # This program is distributed under the MIT license.
 
-'''Testing module for `python_toolbox.abc_tools.AbstractStaticMethod`.'''
+'''Testing module for `python_toolbox.cheat_hashing`.'''
 
+import array
 import copy
+import sys
 
+from python_toolbox import cheat_hashing
 from python_toolbox.cheat_hashing import cheat_hash
 
 
@@ -31,4 +34,57 @@ def test_cheat_hash():
     for thing, thing_copy in zip(things, things_copy):
         assert cheat_hash(thing) == cheat_hash(thing) == \
                cheat_hash(thing_copy) == cheat_hash(thing_copy)
-        
\ No newline at end of file
+        
+
+def test_equal_containers():
+    '''Test that equal containers get equal cheat-hashes.'''
+    pairs = [
+        ({1: [2], 'a': {3}}, {'a': {3}, 1: [2]}),
+        ([{1: [2, [3]]}, {4}], [{1: [2, [3]]}, {4}]),
+        ((1, [2]), (1, [2])),
+        ({1, 2}, frozenset((1, 2))),
+        (bytearray(b'meow'), bytearray(b'meow')),
+        (array.array('i', [1, 2]), array.array('i', [1, 2])),
+    ]
+    for thing, other_thing in pairs:
+        assert thing == other_thing
+        assert cheat_hash(thing) == cheat_hash(other_thing)
+    assert cheat_hash(bytearray(b'meow')) != cheat_hash(bytearray(b'woof'))
+    assert cheat_hash(array.array('i', [1, 2])) != \
+                                            cheat_hash(array.array('i', [1, 3]))
+
+
+def test_deep():
+    '''Test cheat-hashing containers nested deeper than the recursion limit.'''
+    def make_deep_list():
+        deep_list = []
+        for _ in range(sys.getrecursionlimit() * 2):
+            deep_list = [deep_list, {}]
+        return deep_list
+    assert cheat_hash(make_deep_list()) == cheat_hash(make_deep_list())
+    
+    recursive_list = [1, []]
+    recursive_list[1].append(recursive_list)
+    assert isinstance(cheat_hash(recursive_list), int)
+
+
+def test_register():
+    '''Test registering cheat-hash functions for types.'''
+    class Point:
+        def __init__(self, x, y):
+            self.x, self.y = x, y
+    class SubPoint(Point):
+        pass
+    @cheat_hashing.register(Point)
+    def cheat_hash_point(point):
+        return hash((point.x, point.y))
+    assert cheat_hash(Point(1, 2)) == cheat_hash(Point(1, 2))
+    assert cheat_hash(SubPoint(1, 2)) == cheat_hash(Point(1, 2))
+    assert cheat_hash([Point(1, 2), []]) == cheat_hash([Point(1, 2), []])
+    
+    # Registering by name, without importing:
+    cheat_hashing.register('%s.%s' % (SubPoint.__module__,
+                                      SubPoint.__qualname__),
+                           lambda point: 7)
+    assert cheat_hash(SubPoint(1, 2)) == 7
+
@@ -0,0 +1,185 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''Testing module for `python_toolbox.copy_tools.deepcopy`.'''
+
+import collections
+import copy
+import datetime
+
+from python_toolbox import copy_tools
+from python_toolbox.persistent import (Persistent, CrossProcessPersistent,
+                                       DontCopyPersistent)
+
+
+class Node:
+    def __init__(self, value, parent=None):
+        self.value = value
+        self.parent = parent
+        self.children = []
+        self.meta = (value, 'meta', [value])
+        
+        
+class Slotted:
+    __slots__ = ('a', 'b', '__weakref__')
+    
+    
+class HashedByKey:
+    def __init__(self, key):
+        self.key = key
+    def __hash__(self):
+        return hash(self.key)
+    def __eq__(self, other):
+        return type(other) is HashedByKey and other.key == self.key
+    
+    
+def test_objects():
+    '''Test copying a tree of plain objects with back-references.'''
+    root = Node(0)
+    child = Node(1, root)
+    root.children.append(child)
+    new_root = copy_tools.deepcopy(root)
+    assert new_root is not root
+    new_child, = new_root.children
+    assert new_child is not child
+    assert new_child.parent is new_root
+    assert new_child.value == 1
+    assert new_child.meta == (1, 'meta', [1])
+    assert new_child.meta[2] is not child.meta[2]
+    
+    
+def test_slots():
+    '''Test copying objects with `__slots__`, including missing ones.'''
+    slotted = Slotted()
+    slotted.a = [1]
+    slotted.b = slotted
+    new_slotted = copy_tools.deepcopy(slotted)
+    assert new_slotted.b is new_slotted
+    assert new_slotted.a == [1]
+    assert new_slotted.a is not slotted.a
+    
+    other_slotted = Slotted()
+    other_slotted.a = 3
+    new_other_slotted = copy_tools.deepcopy(other_slotted)
+    assert new_other_slotted.a == 3
+    assert not hasattr(new_other_slotted, 'b')
+    
+    
+def test_immutables():
+    '''Immutable things that don't need copying are returned as they are.'''
+    for thing in (1, 'meow', None, (1, 'a', (2, 3)), frozenset((1, (2,))),
+                  Node, len):
+        assert copy_tools.deepcopy(thing) is thing
+    
+    thing = (1, [2])
+    new_thing = copy_tools.deepcopy(thing)
+    assert new_thing == thing
+    assert new_thing is not thing
+    assert new_thing[1] is not thing[1]
+    
+    
+def test_cycles():
+    '''Test cycles, including ones that go through tuples.'''
+    list_ = []
+    tuple_ = (list_,)
+    list_.append(tuple_)
+    new_tuple = copy_tools.deepcopy(tuple_)
+    assert new_tuple[0] is not list_
+    assert new_tuple[0][0] is new_tuple
+    
+    dict_ = {}
+    dict_['self'] = dict_
+    new_dict = copy_tools.deepcopy(dict_)
+    assert new_dict['self'] is new_dict is not dict_
+    
+    
+def test_hashing():
+    '''Objects are filled before they're put in sets or used as keys.'''
+    thing = {HashedByKey(3): 'x', 'y': [HashedByKey(4)],
+             'z': {HashedByKey(5)}}
+    new_thing = copy_tools.deepcopy(thing)
+    assert new_thing == thing
+    assert HashedByKey(3) in new_thing
+    assert HashedByKey(5) in new_thing['z']
+    assert next(iter(new_thing)) is not next(iter(thing))
+    
+    
+def test_hashing_before_building():
+    '''
+    Objects are filled before frozensets or custom copiers can reach them.
+    '''
+    key = ('a', 3)
+    hashed = HashedByKey(key)
+    new_frozenset = copy_tools.deepcopy(frozenset({hashed}))
+    assert new_frozenset == frozenset({hashed})
+    assert next(iter(new_frozenset)) is not hashed
+    
+    holder = Node(frozenset({hashed}))
+    new_holder = copy_tools.deepcopy(holder)
+    assert new_holder.value == holder.value
+    assert next(iter(new_holder.value)) is not hashed
+    
+    things = [collections.OrderedDict([(hashed, 1)]), hashed]
+    new_things = copy_tools.deepcopy(things)
+    assert new_things == copy.deepcopy(things)
+    assert next(iter(new_things[0])) is new_things[1] is not hashed
+    
+    # `Persistent.__deepcopy__` uses this engine too:
+    persistent = Persistent()
+    persistent.things = [frozenset({hashed}), holder, things]
+    new_persistent = copy.deepcopy(persistent)
+    assert new_persistent.things[0] == frozenset({hashed})
+    assert new_persistent.things[1].value == holder.value
+    assert new_persistent.things[2] == things
+    
+    
+def test_same_as_copy():
+    '''Things that aren't copied here are copied like `copy.deepcopy` does.'''
+    ordered_dict = collections.OrderedDict(a=[1])
+    things = [datetime.datetime.now(), ordered_dict, bytearray(b'ab'),
+              Node.__init__, {1, 2}, ValueError('meow', [1])]
+    new_things = copy_tools.deepcopy(things)
+    assert new_things[:5] == things[:5]
+    assert new_things[1]['a'] is not ordered_dict['a']
+    assert new_things[5].args == ('meow', [1])
+    
+    memo = {}
+    new_list = copy_tools.deepcopy([ordered_dict, ordered_dict['a']], memo)
+    assert new_list[0]['a'] is new_list[1]
+    assert copy.deepcopy(ordered_dict, memo) is new_list[0]
+    
+    
+def test_deep():
+    '''There's no recursion limit.'''
+    head = cursor = Node(0)
+    for i in range(10000):
+        node = Node(i)
+        cursor.children.append(node)
+        cursor = node
+    new_head = copy_tools.deepcopy(head)
+    depth = 0
+    while new_head.children:
+        (new_head,) = new_head.children
+        depth += 1
+    assert depth == 10000
+    
+    
+def test_copy_modes():
+    '''`Persistent` objects are passed through under `DontCopyPersistent`.'''
+    persistent = Persistent()
+    cross_process_persistent = CrossProcessPersistent()
+    things = [persistent, persistent, cross_process_persistent]
+    
+    new_things = copy_tools.deepcopy(things, DontCopyPersistent())
+    assert new_things[0] is new_things[1] is persistent
+    assert new_things[2] is cross_process_persistent
+    
+    new_things = copy_tools.deepcopy(things)
+    assert new_things[0] is new_things[1] is not persistent
+    assert new_things[2] is not cross_process_persistent
+    
+    class Copier:
+        def __deepcopy__(self, memo):
+            return type(memo)
+    (copy_mode,) = copy_tools.deepcopy([Copier()], DontCopyPersistent())
+    assert copy_mode is DontCopyPersistent
@@ -0,0 +1,73 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''Testing module for `python_toolbox.copy_tools.Snapshotter`.'''
+
+from python_toolbox import copy_tools
+from python_toolbox.persistent import Persistent, DontCopyPersistent
+
+
+class Thing:
+    def __init__(self, name, items):
+        self.name = name
+        self.items = items
+        
+        
+def test():
+    '''Unchanged parts are shared between snapshots.'''
+    model = {'a': Thing('a', [1, 2]), 'b': Thing('b', [3]),
+             'c': [Thing('c', [])]}
+    snapshotter = copy_tools.Snapshotter()
+    first_snapshot = snapshotter.snapshot(model)
+    assert first_snapshot is not model
+    assert first_snapshot['a'] is not model['a']
+    assert first_snapshot['a'].items == [1, 2]
+    assert snapshotter.snapshot(model) is first_snapshot
+    
+    model['b'].items.append(4)
+    second_snapshot = snapshotter.snapshot(model)
+    assert second_snapshot is not first_snapshot
+    assert second_snapshot['a'] is first_snapshot['a']
+    assert second_snapshot['c'] is first_snapshot['c']
+    assert second_snapshot['b'] is not first_snapshot['b']
+    assert second_snapshot['b'].items == [3, 4]
+    assert first_snapshot['b'].items == [3]
+    
+    model['a'].name = 'A'
+    third_snapshot = snapshotter.snapshot(model)
+    assert third_snapshot['a'].name == 'A'
+    assert second_snapshot['a'].name == 'a'
+    assert third_snapshot['a'].items is second_snapshot['a'].items
+    assert third_snapshot['b'] is second_snapshot['b']
+    
+    model['c'][0] = Thing('c', [])
+    fourth_snapshot = snapshotter.snapshot(model)
+    assert fourth_snapshot['c'] is not third_snapshot['c']
+    assert fourth_snapshot['a'] is third_snapshot['a']
+    
+    
+def test_cycles():
+    '''A change in a cycle makes the whole cycle be copied again.'''
+    x = []
+    y = [x]
+    x.append(y)
+    snapshotter = copy_tools.Snapshotter()
+    first_snapshot = snapshotter.snapshot(x)
+    assert first_snapshot[0][0] is first_snapshot
+    assert snapshotter.snapshot(x) is first_snapshot
+    
+    y.append(1)
+    second_snapshot = snapshotter.snapshot(x)
+    assert second_snapshot is not first_snapshot
+    assert second_snapshot[0][0] is second_snapshot
+    assert second_snapshot[0] == [second_snapshot, 1]
+    assert first_snapshot[0] == [first_snapshot]
+    
+    
+def test_copy_mode():
+    '''Test snapshots in a copy mode.'''
+    persistent = Persistent()
+    snapshotter = copy_tools.Snapshotter(DontCopyPersistent)
+    snapshot = snapshotter.snapshot([persistent, [1]])
+    assert snapshot[0] is persistent
+    assert snapshotter.snapshot([persistent])[0] is persistent
@@ -0,0 +1,75 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''Testing module for `python_toolbox.cute_inspect.binding`.'''
+
+import inspect
+
+from python_toolbox import cute_inspect
+from python_toolbox import gc_tools
+from python_toolbox import cute_testing
+
+
+def f(a, b=2, *args, c, d=4, **kwargs):
+    pass
+
+
+def test_bind():
+    '''Test binding arguments, with defaults and keyword-only parameters.'''
+    binder = cute_inspect.get_binder(f)
+    assert binder.arg_names == ('a', 'b', 'c', 'd')
+    assert binder.n_positional_args == 2
+    assert (binder.star_args_name, binder.star_kwargs_name) == \
+                                                            ('args', 'kwargs')
+    assert binder.bind(1, c=3) == ([1, 2, 3, 4], (), {})
+    assert binder.bind(1, 5, 6, 7, d=8, c=3, e=9) == \
+                                             ([1, 5, 3, 8], (6, 7), {'e': 9})
+    assert binder.bind(c=3, a=1) == ([1, 2, 3, 4], (), {})
+    
+    
+def test_errors():
+    '''Test that bad arguments raise `TypeError` like a call would.'''
+    def g(a, b=2):
+        pass
+    for binder in (cute_inspect.get_binder(f), cute_inspect.get_binder(g)):
+        with cute_testing.RaiseAssertor(TypeError):
+            binder.bind()
+        with cute_testing.RaiseAssertor(TypeError):
+            binder.bind(1, a=1, c=3)
+    with cute_testing.RaiseAssertor(TypeError):
+        cute_inspect.get_binder(f).bind(1) # Missing keyword-only `c`.
+    with cute_testing.RaiseAssertor(TypeError):
+        cute_inspect.get_binder(g).bind(1, 2, 3)
+    with cute_testing.RaiseAssertor(TypeError):
+        cute_inspect.get_binder(g).bind(1, z=3)
+    
+    
+def test_getcallargs():
+    '''Test that `getcallargs` gives what `inspect.getcallargs` gives.'''
+    class A:
+        def method(self, x, *args, y=3):
+            pass
+    a = A()
+    calls = [
+        (f, (1,), {'c': 3}),
+        (f, (1, 5, 6), {'c': 3, 'e': 9}),
+        (A.method, (a, 1), {}),
+        (a.method, (1, 2), {'y': 4}),
+    ]
+    for function, args, kwargs in calls:
+        assert cute_inspect.getcallargs(function, *args, **kwargs) == \
+                                 inspect.getcallargs(function, *args, **kwargs)
+    
+    
+def test_cache():
+    '''Test that a binder is made once per function and dropped with it.'''
+    def g(x):
+        pass
+    binder = cute_inspect.get_binder(g)
+    assert cute_inspect.get_binder(g) is binder
+    assert binder.name == 'g'
+    function_id = id(g)
+    assert function_id in cute_inspect.binding._binders
+    del g
+    gc_tools.collect()
+    assert function_id not in cute_inspect.binding._binders
@@ -4,12 +4,14 @@
 '''Testing module for `python_toolbox.cute_profile`.'''
 
 import dummy_threading
+import pstats
 import time
 
 from python_toolbox import cute_profile
 from python_toolbox import temp_value_setting
 from python_toolbox import temp_file_tools
 from python_toolbox import cute_testing
+from python_toolbox.locking import instrumentation as lock_instrumentation
 
 from .shared import call_and_check_if_profiled
 
@@ -256,3 +258,163 @@ def test_folder_handler():
             assert len(list(temp_folder.iterdir())) == 2
             
 
+
+
+def _spin(duration):
+    '''Keep the CPU busy for `duration` seconds.'''
+    end_time = time.perf_counter() + duration
+    while time.perf_counter() < end_time:
+        pass
+    
+    
+def test_sampling_profile():
+    '''Test that `SamplingProfile` collects collapsed stacks of the call.'''
+    def outer():
+        _spin(0.1)
+        return 7
+    
+    profile = cute_profile.SamplingProfile(0.001)
+    assert profile.runcall(outer) == 7
+    assert profile.n_samples >= 1
+    assert profile.n_samples == sum(profile.stacks.values())
+    assert profile.duration >= 0.1
+    for stack in profile.stacks:
+        assert stack[0].startswith('outer ')
+    collapsed_stacks = profile.get_collapsed_stacks()
+    assert any(line.startswith('outer (') and ';_spin (' in line and
+               line.rsplit(' ', 1)[1].isdigit()
+               for line in collapsed_stacks.splitlines())
+    
+    with cute_testing.RaiseAssertor(ValueError):
+        cute_profile.SamplingProfile(0)
+        
+        
+def test_sampling_excludes_sampler():
+    '''Test that `runcall`'s own calls to the sampler aren't sampled.'''
+    profile = cute_profile.SamplingProfile(0.0001)
+    end_time = time.perf_counter() + 0.5
+    while time.perf_counter() < end_time:
+        profile.runcall(_spin, 0)
+    assert profile.n_samples >= 1
+    for stack in profile.stacks:
+        assert stack[0].startswith('_spin ')
+        
+        
+def test_sampling_percentage():
+    '''Test `profile_ready` with `sampling_interval` and `sample_percentage`.'''
+    with temp_value_setting.TempValueSetter((cute_profile.profile_handling,
+                                             'threading'), dummy_threading):
+        with temp_file_tools.create_temp_folder(
+                              suffix='_python_toolbox_testing') as temp_folder:
+            f = cute_profile.profile_ready(
+                profile_handler=temp_folder, sampling_interval=0.001,
+                sample_percentage=100
+            )(lambda: _spin(0.02))
+            f()
+            (path,) = temp_folder.iterdir()
+            assert path.name.endswith('.collapsed')
+            assert '_spin (' in path.read_text()
+            
+            time.sleep(0.01) # To make for a different filename.
+            f.sample_percentage = 0
+            f()
+            assert len(list(temp_folder.iterdir())) == 1
+            
+            f.profiling_on = True
+            f()
+            assert len(list(temp_folder.iterdir())) == 2
+
+            
+            
+def _get_n_calls(path, function_name):
+    '''Get the number of calls to a function in a saved profile.'''
+    stats = pstats.Stats(str(path)).stats
+    return sum(n_calls for (_, _, name), (_, n_calls, _, _, _) in
+               stats.items() if name == function_name)
+            
+            
+def test_aggregating_handler():
+    '''Test that `AggregatingProfileHandler` merges and rotates profiles.'''
+    with temp_file_tools.create_temp_folder(
+                              suffix='_python_toolbox_testing') as temp_folder:
+        handler = cute_profile.AggregatingProfileHandler(
+            temp_folder, n_calls=3, max_files=2
+        )
+        f = cute_profile.profile_ready(condition=True, off_after=False,
+                                       profile_handler=handler)(func)
+        for _ in range(3):
+            assert f(1, 2) == (1, 2, 3)
+        handler.flush()
+        (path,) = handler.paths
+        assert path.name.endswith('.profile')
+        assert _get_n_calls(path, 'func') == 3
+        
+        for _ in range(4):
+            f(1, 2)
+        handler.flush()
+        assert len(handler.paths) == 2
+        assert sorted(temp_folder.iterdir()) == sorted(handler.paths)
+        assert not path.exists()
+        assert [_get_n_calls(path, 'func') for path in handler.paths] == \
+                                                                        [3, 1]
+        
+        handler.flush() # Nothing new to save.
+        assert len(list(temp_folder.iterdir())) == 2
+        
+        
+def test_aggregating_handler_lock_reports():
+    '''Test that `AggregatingProfileHandler` rotates lock reports too.'''
+    lock_instrumentation.enable()
+    try:
+        with temp_file_tools.create_temp_folder(
+                              suffix='_python_toolbox_testing') as temp_folder:
+            handler = cute_profile.AggregatingProfileHandler(
+                temp_folder, n_calls=1, max_files=3
+            )
+            f = cute_profile.profile_ready(condition=True, off_after=False,
+                                           profile_handler=handler)(func)
+            for _ in range(3):
+                f(1, 2)
+                handler.flush()
+            assert len(handler.paths) == 3
+            assert sorted(temp_folder.iterdir()) == sorted(handler.paths)
+            assert handler.paths[-1].name.endswith('.locks.txt')
+    finally:
+        lock_instrumentation.disable()
+        
+        
+def test_aggregating_handler_sampling():
+    '''Test `AggregatingProfileHandler` with a window and a sample rate.'''
+    with temp_file_tools.create_temp_folder(
+                              suffix='_python_toolbox_testing') as temp_folder:
+        handler = cute_profile.AggregatingProfileHandler(
+            temp_folder, n_calls=None, window=0.05, sample_rate=0
+        )
+        f = cute_profile.profile_ready(profile_handler=handler,
+                                       sampling_interval=0.001)(
+                                                       lambda: _spin(0.02))
+        for _ in range(3):
+            f()
+        handler.flush()
+        assert not handler.paths
+        
+        handler.sample_rate = 1
+        for _ in range(3):
+            f()
+        for _ in range(100):
+            if handler.paths:
+                break
+            time.sleep(0.05) # Waiting for the window to pass.
+        (path,) = handler.paths
+        assert path.name.endswith('.collapsed')
+        n_samples = sum(int(line.rsplit(' ', 1)[1]) for line in
+                        path.read_text().splitlines())
+        assert n_samples >= 3
+        
+        
+def test_aggregating_handler_arguments():
+    '''Test that `AggregatingProfileHandler` rejects bad arguments.'''
+    for kwargs in ({'n_calls': 0}, {'window': 0}, {'sample_rate': 1.5},
+                   {'max_files': 0}):
+        with cute_testing.RaiseAssertor(ValueError):
+            cute_profile.AggregatingProfileHandler('.', **kwargs)
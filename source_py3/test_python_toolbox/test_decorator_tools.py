@@ -0,0 +1,75 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''Testing module for `python_toolbox.decorator_tools`.'''
+
+import inspect
+
+from python_toolbox import decorator_tools
+from python_toolbox import cute_testing
+
+
+def _record_call(function, *args, **kwargs):
+    return (function.__name__, args, kwargs, function(*args, **kwargs))
+
+
+def test_decorator():
+    '''The decorated function has the signature and details of the original.'''
+    def f(a, b: int=2, *args, c, d=4, **kwargs) -> tuple:
+        '''Meow.'''
+        return (a, b, args, c, d, kwargs)
+    f.attribute = 7
+    
+    decorated_f = decorator_tools.decorator(_record_call, f)
+    assert decorated_f(1, c=3) == \
+           ('f', (1, 2), {'c': 3, 'd': 4}, (1, 2, (), 3, 4, {}))
+    assert decorated_f(1, 5, 6, c=3, e=7) == \
+           ('f', (1, 5, 6), {'c': 3, 'd': 4, 'e': 7},
+            (1, 5, (6,), 3, 4, {'e': 7}))
+    
+    assert inspect.signature(decorated_f) == inspect.signature(f)
+    assert inspect.getfullargspec(decorated_f) == inspect.getfullargspec(f)
+    assert decorated_f.__name__ == decorated_f.__code__.co_name == 'f'
+    assert decorated_f.__qualname__ == f.__qualname__
+    assert decorated_f.__doc__ == 'Meow.'
+    assert decorated_f.__module__ == __name__
+    assert decorated_f.attribute == 7
+    assert decorated_f.__wrapped__ is f
+    with cute_testing.RaiseAssertor(TypeError):
+        decorated_f(1)
+        
+        
+def test_shapes_are_shared():
+    '''Functions with the same signature shape share their code.'''
+    def f(x, y=1):
+        return x + y
+    def g(x, y=2):
+        return x * y
+    decorated_f = decorator_tools.decorator(_record_call, f)
+    decorated_g = decorator_tools.decorator(_record_call, g)
+    assert decorated_f(3) == ('f', (3, 1), {}, 4)
+    assert decorated_g(3) == ('g', (3, 2), {}, 6)
+    assert decorated_f.__code__.co_code == decorated_g.__code__.co_code
+    assert decorated_f.__defaults__ == (1,)
+    assert decorated_g.__defaults__ == (2,)
+    
+    
+def test_fallback():
+    '''Parameters that clash with our names go through `FunctionMaker`.'''
+    def f(_func_):
+        pass
+    with cute_testing.RaiseAssertor(NameError):
+        decorator_tools.decorator(_record_call, f)
+        
+        
+def test_caller_to_decorator():
+    '''Test converting a caller into a decorator.'''
+    record_call = decorator_tools.decorator(_record_call)
+    assert record_call.__name__ == '_record_call'
+    assert list(inspect.signature(record_call).parameters) == ['function']
+    
+    @record_call
+    def f(x=1):
+        return x
+    assert f() == ('f', (1,), {}, 1)
+    assert f(x=5) == ('f', (5,), {}, 5)
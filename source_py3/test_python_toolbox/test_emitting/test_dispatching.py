@@ -0,0 +1,202 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+import asyncio
+import threading
+import time
+
+from python_toolbox import cute_testing
+
+from python_toolbox import emitting
+
+
+def test_inline():
+    '''Test the inline `Dispatcher`, which only collects metrics.'''
+    calls = []
+    dispatcher = emitting.Dispatcher(name='inline')
+    emitter = emitting.Emitter()
+    emitter.add_output(lambda: calls.append(1), dispatcher=dispatcher)
+    emitter.emit()
+    emitter.emit()
+    assert calls == [1, 1]
+
+    metrics = dispatcher.get_metrics()
+    assert metrics.n_calls == 2
+    assert metrics.queue_depth == metrics.max_queue_depth == 0
+    assert metrics.max_latency >= metrics.mean_latency >= 0
+    assert emitter.get_dispatch_metrics().keys() == {dispatcher}
+
+    def f():
+        raise ZeroDivisionError
+    emitter.add_output(f, dispatcher=dispatcher)
+    with cute_testing.RaiseAssertor(ZeroDivisionError):
+        emitter.emit()
+    assert dispatcher.get_metrics().n_failed == 1
+
+    emitter.remove_output(f)
+    emitter.emit()
+    dispatcher.reset_metrics()
+    assert dispatcher.get_metrics().n_calls == 0
+
+    with cute_testing.RaiseAssertor(ValueError):
+        emitter.add_output(emitting.Emitter(), dispatcher=dispatcher)
+
+
+def test_thread_pool():
+    '''Test `ThreadPoolDispatcher` doesn't stall the emitting thread.'''
+    calls = []
+    event = threading.Event()
+    def slow_function():
+        event.wait()
+        calls.append(threading.current_thread())
+    dispatcher = emitting.ThreadPoolDispatcher()
+    emitter = emitting.Emitter()
+    emitter.add_output(slow_function, dispatcher=dispatcher)
+    for _ in range(5):
+        emitter.emit()
+    assert not calls
+    assert dispatcher.get_metrics().queue_depth >= 4
+    event.set()
+    dispatcher.join()
+    assert len(calls) == 5
+    assert threading.current_thread() not in calls
+    metrics = dispatcher.get_metrics()
+    assert metrics.n_calls == 5
+    assert metrics.queue_depth == 0
+    assert metrics.max_queue_depth >= 4
+    dispatcher.shutdown()
+    with cute_testing.RaiseAssertor(RuntimeError):
+        emitter.emit()
+
+
+def test_thread_pool_overflow():
+    '''Test the `'drop'` and `'block'` overflow policies.'''
+    event = threading.Event()
+    calls = []
+    def slow_function():
+        event.wait()
+        calls.append(None)
+
+    dropping_dispatcher = emitting.ThreadPoolDispatcher(queue_size=2,
+                                                        overflow='drop')
+    emitter = emitting.Emitter()
+    emitter.add_output(slow_function, dispatcher=dropping_dispatcher)
+    for _ in range(10):
+        emitter.emit()
+    # One call is running and two are queued:
+    assert 7 <= dropping_dispatcher.get_metrics().n_dropped <= 8
+    event.set()
+    dropping_dispatcher.join()
+    assert 2 <= len(calls) <= 3
+    dropping_dispatcher.shutdown()
+
+    event.clear()
+    del calls[:]
+    blocking_dispatcher = emitting.ThreadPoolDispatcher(queue_size=2)
+    emitter = emitting.Emitter()
+    emitter.add_output(slow_function, dispatcher=blocking_dispatcher)
+    thread = threading.Thread(target=emitter.emit_many, args=(10,))
+    thread.start()
+    time.sleep(0.1)
+    assert thread.is_alive() # Blocked on the full queue.
+    event.set()
+    thread.join()
+    blocking_dispatcher.join()
+    assert len(calls) == 10
+    assert blocking_dispatcher.get_metrics().n_dropped == 0
+    blocking_dispatcher.shutdown()
+
+    with cute_testing.RaiseAssertor(ValueError):
+        emitting.ThreadPoolDispatcher(overflow='meow')
+    with cute_testing.RaiseAssertor(ValueError):
+        emitting.ThreadPoolDispatcher(queue_size=0)
+
+
+def test_thread_pool_exceptions():
+    '''Test that exceptions in worker threads go to `exception_handler`.'''
+    failed_functions = []
+    def f():
+        raise ZeroDivisionError
+    dispatcher = emitting.ThreadPoolDispatcher(
+        exception_handler=failed_functions.append
+    )
+    emitter = emitting.Emitter()
+    emitter.add_output(f, dispatcher=dispatcher)
+    emitter.emit()
+    dispatcher.join()
+    assert failed_functions == [f]
+    assert dispatcher.get_metrics().n_failed == 1
+    dispatcher.shutdown()
+
+
+def test_asyncio():
+    '''Test `AsyncioDispatcher` calls the callable outputs in the loop.'''
+    loop = asyncio.new_event_loop()
+    try:
+        calls = []
+        dispatcher = emitting.AsyncioDispatcher(loop, queue_size=3,
+                                                overflow='drop')
+        emitter = emitting.Emitter()
+        emitter.add_output(lambda: calls.append(threading.current_thread()),
+                           dispatcher=dispatcher)
+        emitter.emit_many(5)
+        assert not calls
+        assert dispatcher.get_metrics().queue_depth == 3
+        assert dispatcher.get_metrics().n_dropped == 2
+
+        loop.call_soon(loop.stop)
+        loop.run_forever()
+        assert calls == [threading.current_thread()] * 3
+        assert dispatcher.get_metrics().queue_depth == 0
+
+        # Emitting from another thread while the loop runs, even one that set
+        # the loop as its event loop:
+        del calls[:]
+        loop_thread = threading.Thread(target=loop.run_forever)
+        loop_thread.start()
+        asyncio.set_event_loop(loop)
+        try:
+            blocking_dispatcher = emitting.AsyncioDispatcher(loop,
+                                                             queue_size=1)
+            emitter = emitting.Emitter()
+            emitter.add_output(lambda: calls.append(time.sleep(0.001)),
+                               dispatcher=blocking_dispatcher)
+            emitter.emit_many(20)
+        finally:
+            asyncio.set_event_loop(None)
+            loop.call_soon_threadsafe(loop.stop)
+            loop_thread.join()
+        assert len(calls) == 20
+        assert blocking_dispatcher.get_metrics().max_queue_depth == 1
+    finally:
+        loop.close()
+
+
+def test_asyncio_closed_loop():
+    '''Test that failing to schedule a call doesn't take up room.'''
+    loop = asyncio.new_event_loop()
+    loop.close()
+    dispatcher = emitting.AsyncioDispatcher(loop, queue_size=1,
+                                            overflow='drop')
+    for _ in range(3):
+        with cute_testing.RaiseAssertor(RuntimeError):
+            dispatcher.dispatch(lambda: None)
+    assert dispatcher.get_metrics().queue_depth == 0
+    assert dispatcher.get_metrics().n_dropped == 0
+
+
+def test_emitter_system():
+    '''Test getting the dispatch metrics of an emitter system.'''
+    emitter_system = emitting.EmitterSystem()
+    dispatcher_1 = emitting.Dispatcher()
+    dispatcher_2 = emitting.Dispatcher()
+    a = emitter_system.make_emitter()
+    b = emitter_system.make_emitter()
+    a.add_output(lambda: None, dispatcher=dispatcher_1)
+    b.add_output(lambda: None, dispatcher=dispatcher_2)
+    b.add_output(lambda: None)
+    emitter_system.top_emitter.emit()
+    metrics = emitter_system.get_dispatch_metrics()
+    assert metrics.keys() == {dispatcher_1, dispatcher_2}
+    assert metrics[dispatcher_1].n_calls == metrics[dispatcher_2].n_calls == 1
+    assert not emitter_system.bottom_emitter.get_dispatch_metrics()
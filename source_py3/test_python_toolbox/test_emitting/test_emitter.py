@@ -2,8 +2,11 @@
 # This program is distributed under the MIT license.
 
 from python_toolbox import misc_tools
+from python_toolbox import cute_testing
+from python_toolbox import gc_tools
 
 from python_toolbox import emitting
+from python_toolbox.emitting import emitter as emitter_module
 
 
 def test():
@@ -38,3 +41,343 @@ def test():
     assert my_function.call_counter == 8
 
 
+    
+    
+def _get_reachable_callables(emitter):
+    '''
+    Get the callables reachable from `emitter`, the slow and sure way.
+    
+    Returns a list in the order in which they should be called.
+    '''
+    reachable_emitters = {emitter}
+    emitters_to_visit = [emitter]
+    serial_numbers = {}
+    while emitters_to_visit:
+        visited_emitter = emitters_to_visit.pop()
+        for output in visited_emitter.get_outputs():
+            if isinstance(output, emitting.Emitter):
+                if output not in reachable_emitters:
+                    reachable_emitters.add(output)
+                    emitters_to_visit.append(output)
+            else:
+                serial_number = \
+                      visited_emitter._callable_output_serial_numbers[output]
+                serial_numbers[output] = min(
+                    serial_numbers.get(output, serial_number),
+                    serial_number
+                )
+    return sorted(serial_numbers, key=serial_numbers.__getitem__)
+
+
+def _assert_caches_correct(emitters):
+    for emitter in emitters:
+        assert list(emitter.get_total_callable_outputs()) == \
+                                              _get_reachable_callables(emitter)
+
+
+def test_diamond():
+    '''Test removing a callable from a diamond-shaped emitter graph.'''
+    # `top` has inputs `a` and `b`, and `a` has input `b`:
+    top = emitting.Emitter()
+    a = emitting.Emitter(outputs=(top,))
+    b = emitting.Emitter(outputs=(top, a))
+    f = lambda: None
+    g = lambda: None
+    top.add_output(f)
+    a.add_output(g)
+    _assert_caches_correct((top, a, b))
+    assert set(b.get_total_callable_outputs()) == {f, g}
+    
+    top.remove_output(f)
+    _assert_caches_correct((top, a, b))
+    assert set(b.get_total_callable_outputs()) == {g}
+    
+    a.remove_output(g)
+    b.add_output(g)
+    _assert_caches_correct((top, a, b))
+    a.remove_output(top)
+    _assert_caches_correct((top, a, b))
+    
+    
+def test_cycle():
+    '''Test emitters connected in a cycle.'''
+    a = emitting.Emitter()
+    b = emitting.Emitter(inputs=(a,))
+    c = emitting.Emitter(inputs=(b,), outputs=(a,))
+    d = emitting.Emitter(outputs=(a,))
+    f = lambda: None
+    c.add_output(f)
+    _assert_caches_correct((a, b, c, d))
+    assert set(a.get_total_callable_outputs()) == \
+           set(b.get_total_callable_outputs()) == \
+           set(d.get_total_callable_outputs()) == {f}
+    
+    c.remove_output(f)
+    _assert_caches_correct((a, b, c, d))
+    assert not d.get_total_callable_outputs()
+    
+    b.add_output(f)
+    a.add_output(a)
+    _assert_caches_correct((a, b, c, d))
+    b.remove_input(a)
+    _assert_caches_correct((a, b, c, d))
+    assert set(a.get_total_callable_outputs()) == set()
+    assert set(b.get_total_callable_outputs()) == {f}
+    assert set(c.get_total_callable_outputs()) == set()
+    
+    
+def test_random_graphs():
+    '''Test random sequences of changes against a brute-force calculation.'''
+    import random
+    random_generator = random.Random(0)
+    emitters = [emitting.Emitter() for _ in range(12)]
+    callables = [(lambda: None) for _ in range(6)]
+    for _ in range(400):
+        emitter = random_generator.choice(emitters)
+        if random_generator.random() < 0.6:
+            if random_generator.random() < 0.5:
+                emitter.add_output(random_generator.choice(emitters))
+            else:
+                emitter.add_output(random_generator.choice(callables))
+        elif emitter.get_outputs():
+            emitter.remove_output(
+                random_generator.choice(list(emitter.get_outputs()))
+            )
+        _assert_caches_correct(emitters)
+        
+    for emitter in emitters:
+        emitter.disconnect_from_all()
+    _assert_caches_correct(emitters)
+    assert not any(emitter.get_total_callable_outputs() for emitter in emitters)
+    
+    
+def test_emitter_system():
+    '''Test building an emitter system while freezing cache rebuilding.'''
+    emitter_system = emitting.EmitterSystem()
+    f = lambda: None
+    g = lambda: None
+    with emitter_system.cache_rebuilding_freezer:
+        a = emitter_system.make_emitter(outputs=(f,))
+        b = emitter_system.make_emitter(inputs=(a,), outputs=(g,))
+        assert not a.get_total_callable_outputs()
+    _assert_caches_correct(emitter_system.emitters)
+    assert set(a.get_total_callable_outputs()) == {f, g}
+    assert set(emitter_system.top_emitter.get_total_callable_outputs()) == \
+                                                                         {f, g}
+    
+    emitter_system.remove_emitter(b)
+    _assert_caches_correct(emitter_system.emitters)
+    assert set(a.get_total_callable_outputs()) == {f}
+    
+    
+def test_order():
+    '''Test that callable outputs are called in the order they were added.'''
+    calls = []
+    a = emitting.Emitter()
+    b = emitting.Emitter(outputs=(a,))
+    functions = [(lambda i=i: calls.append(i)) for i in range(20)]
+    for function in functions[:10]:
+        a.add_output(function)
+    for function in functions[10:]:
+        b.add_output(function)
+    b.emit()
+    assert calls == list(range(20))
+    assert b.get_total_callable_outputs() == tuple(functions)
+    
+    # Adding an existing output again doesn't change its place:
+    a.add_output(functions[0])
+    assert b.get_total_callable_outputs() == tuple(functions)
+    
+    # Removing an output and adding it again puts it at the end:
+    a.remove_output(functions[0])
+    a.add_output(functions[0])
+    assert a.get_total_callable_outputs() == \
+                                        tuple(functions[1:10] + functions[:1])
+    
+    # A callable reachable in more than one way takes its earliest place:
+    b.add_output(functions[0])
+    del calls[:]
+    b.emit()
+    assert calls == list(range(1, 10)) + list(range(10, 20)) + [0]
+    c = emitting.Emitter(outputs=(functions[5],))
+    c.add_output(b)
+    assert c.get_total_callable_outputs()[0] is functions[1]
+    assert c.get_total_callable_outputs().index(functions[5]) == 4
+    
+    
+def test_collect_exceptions():
+    '''Test that `collect_exceptions` lets all callable outputs run.'''
+    calls = []
+    def f():
+        calls.append('f')
+        raise ZeroDivisionError
+    def g():
+        calls.append('g')
+    def h():
+        calls.append('h')
+        raise KeyError
+    
+    emitter = emitting.Emitter(outputs=(f, g, h))
+    with cute_testing.RaiseAssertor(ZeroDivisionError):
+        emitter.emit()
+    assert calls == ['f']
+    
+    del calls[:]
+    emitter.collect_exceptions = True
+    with cute_testing.RaiseAssertor(emitting.EmitFailure) as raise_assertor:
+        emitter.emit()
+    assert calls == ['f', 'g', 'h']
+    exceptions = raise_assertor.exception.exceptions
+    assert len(exceptions) == 2
+    assert isinstance(exceptions[0], ZeroDivisionError)
+    assert isinstance(exceptions[1], KeyError)
+    
+    emitter.remove_output(f)
+    emitter.remove_output(h)
+    del calls[:]
+    emitter.emit()
+    assert calls == ['g']
+    
+    
+def test_coalescing():
+    '''Test collapsing many emits into one using `coalescing_freezer`.'''
+    
+    @misc_tools.set_attributes(call_counter=0)
+    def my_function():
+        my_function.call_counter += 1
+        
+    emitter = emitting.Emitter(outputs=(my_function,))
+    with emitter.coalescing_freezer:
+        for _ in range(1000):
+            emitter.emit()
+        with emitter.coalescing_freezer:
+            emitter.emit_many(50)
+        assert my_function.call_counter == 0
+    assert my_function.call_counter == 1
+    
+    with emitter.coalescing_freezer:
+        pass
+    assert my_function.call_counter == 1
+    
+    with emitter.coalescing_freezer:
+        emitter.emit_many(0)
+    assert my_function.call_counter == 1
+    
+    emitter.emit_many(3)
+    assert my_function.call_counter == 4
+    
+    with cute_testing.RaiseAssertor(ValueError):
+        emitter.emit_many(-1)
+        
+    # Coalescing is per emitter, so emits from inputs go through:
+    input_emitter = emitting.Emitter(outputs=(emitter,))
+    with emitter.coalescing_freezer:
+        input_emitter.emit()
+        assert my_function.call_counter == 5
+        emitter.emit()
+        assert my_function.call_counter == 5
+    assert my_function.call_counter == 6
+    
+    
+def test_weak():
+    '''Test weak callable outputs, which are removed when they die.'''
+    calls = []
+    
+    class Subscriber:
+        def __init__(self, name):
+            self.name = name
+        def on_emit(self):
+            calls.append(self.name)
+            
+    a = emitting.Emitter()
+    b = emitting.Emitter(outputs=(a,))
+    subscribers = [Subscriber(i) for i in range(5)]
+    for subscriber in subscribers:
+        a.add_output(subscriber.on_emit, weak=True)
+    del subscriber
+    f = lambda: calls.append('f')
+    b.add_output(f, weak=True)
+    b.emit()
+    assert calls == [0, 1, 2, 3, 4, 'f']
+    assert len(b.get_total_callable_outputs()) == 6
+    
+    del subscribers[1:4]
+    gc_tools.collect()
+    del calls[:]
+    b.emit()
+    assert calls == [0, 4, 'f']
+    assert len(a.get_outputs()) == 2
+    assert len(b.get_total_callable_outputs()) == 3
+    _assert_caches_correct((a, b))
+    
+    # Removing by the callable itself:
+    b.remove_output(f)
+    a.remove_output(subscribers[0].on_emit)
+    del calls[:]
+    b.emit()
+    assert calls == [4]
+    
+    # Adding the same method strongly and weakly gives two outputs, and the
+    # strong one keeps the object alive, while `subscribers[0]` dies:
+    subscribers.append(Subscriber(5))
+    a.add_output(subscribers[-1].on_emit, weak=True)
+    a.add_output(subscribers[-1].on_emit)
+    a.add_output(subscribers[-1].on_emit, weak=True)
+    assert len(a.get_outputs()) == 3
+    del subscribers[:]
+    gc_tools.collect()
+    del calls[:]
+    b.emit()
+    assert calls == [5, 5]
+    assert len(a.get_outputs()) == 2
+    _assert_caches_correct((a, b))
+    
+    with cute_testing.RaiseAssertor(ValueError):
+        a.add_output(emitting.Emitter(), weak=True)
+        
+        
+def test_weak_batched_pruning():
+    '''Test that many weak callable outputs dying are pruned in one go.'''
+    emitters = [emitting.Emitter() for _ in range(10)]
+    for input, output in zip(emitters, emitters[1:]):
+        input.add_output(output)
+    functions = [(lambda: None) for _ in range(100)]
+    for i, function in enumerate(functions):
+        emitters[i % 10].add_output(function, weak=True)
+    assert len(emitters[0].get_total_callable_outputs()) == 100
+    
+    recalculations = []
+    original_recalculate = emitter_module._recalculate_total_callable_outputs
+    def recalculate(emitters):
+        recalculations.append(None)
+        return original_recalculate(emitters)
+    emitter_module._recalculate_total_callable_outputs = recalculate
+    try:
+        del functions[:90]
+        gc_tools.collect()
+        assert not recalculations
+        emitters[0].emit()
+        assert len(recalculations) == 1
+    finally:
+        emitter_module._recalculate_total_callable_outputs = \
+                                                          original_recalculate
+    assert len(emitters[0].get_total_callable_outputs()) == 10
+    _assert_caches_correct(emitters)
+    
+    
+def test_weak_emitter_system():
+    '''Test weak callable outputs dying while cache rebuilding is frozen.'''
+    emitter_system = emitting.EmitterSystem()
+    a = emitter_system.make_emitter()
+    f = lambda: None
+    g = lambda: None
+    a.add_output(f, weak=True)
+    a.add_output(g, weak=True)
+    with emitter_system.cache_rebuilding_freezer:
+        del f
+        gc_tools.collect()
+        assert len(a.get_outputs()) == 2 # Including `bottom_emitter`.
+    _assert_caches_correct(emitter_system.emitters)
+    assert a.get_total_callable_outputs() == \
+                   emitter_system.top_emitter.get_total_callable_outputs()
+    assert len(a.get_total_callable_outputs()) == 1
@@ -87,4 +87,35 @@ def test_exception():
     assert my_freezer.freeze_counter == my_freezer.thaw_counter == 1
             
             
-        
\ No newline at end of file
+            
+    
+def test_thaw_handler_exception():
+    '''Test that a freezer is thawed even if `thaw_handler` raises.'''
+    class FailingFreezer(MyFreezer):
+        def thaw_handler(self):
+            MyFreezer.thaw_handler(self)
+            raise MyException
+        
+    failing_freezer = FailingFreezer()
+    with cute_testing.RaiseAssertor(MyException):
+        with failing_freezer:
+            with failing_freezer:
+                assert failing_freezer.frozen == 2
+            assert failing_freezer.frozen == 1
+    assert failing_freezer.frozen == 0
+    assert failing_freezer.freeze_counter == failing_freezer.thaw_counter == 1
+    with cute_testing.RaiseAssertor(MyException):
+        with failing_freezer:
+            pass
+    assert failing_freezer.freeze_counter == failing_freezer.thaw_counter == 2
+    
+    
+def test_many_entries():
+    '''Test entering and exiting a freezer many times.'''
+    my_freezer = MyFreezer()
+    for _ in range(10000):
+        with my_freezer:
+            with my_freezer:
+                pass
+    assert not my_freezer.frozen
+    assert my_freezer.freeze_counter == my_freezer.thaw_counter == 10000
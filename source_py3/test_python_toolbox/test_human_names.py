@@ -6,4 +6,5 @@ from python_toolbox import human_names
 
 def test():
     assert 'John' in human_names.name_list
-    assert 'Janet' in human_names.name_list
\ No newline at end of file
+    assert 'Janet' in human_names.name_list
+    assert isinstance(human_names.name_list, tuple)
@@ -0,0 +1,141 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''Testing module for the emitting collections in `nifty_collections`.'''
+
+from python_toolbox import emitting
+from python_toolbox import gc_tools
+from python_toolbox.nifty_collections import (EmittingOrderedSet,
+                                              EmittingWeakKeyDefaultDict,
+                                              ChangeSet)
+
+
+class WeakreffableObject:
+    ''' '''
+
+
+def _make_recording_emitter(get_collection):
+    '''Make an emitter that records the collection's `last_change`.'''
+    emitter = emitting.Emitter()
+    changes = []
+    emitter.add_output(lambda: changes.append(get_collection().last_change))
+    return emitter, changes
+
+
+def test_ordered_set():
+    '''Test that `EmittingOrderedSet` emits once per bulk operation.'''
+    emit_counter = []
+    counting_emitter = emitting.Emitter(
+        outputs=(lambda: emit_counter.append(None),)
+    )
+    EmittingOrderedSet(counting_emitter, range(3))
+    assert len(emit_counter) == 1
+
+    emitter, changes = _make_recording_emitter(lambda: ordered_set)
+    ordered_set = EmittingOrderedSet(None, range(3))
+    ordered_set.set_emitter(emitter)
+    ordered_set.add(3)
+    ordered_set.add(3)
+    ordered_set.discard(7)
+    ordered_set.discard(0)
+    assert changes == [ChangeSet(frozenset({3}), frozenset(), frozenset()),
+                       ChangeSet(frozenset(), frozenset({0}), frozenset())]
+    assert ordered_set.last_change is None
+
+    del changes[:]
+    ordered_set.update(range(10000))
+    assert len(changes) == 1
+    assert changes[0].added == frozenset(range(10000)) - {1, 2, 3}
+
+    del changes[:]
+    ordered_set -= range(5000)
+    ordered_set |= {'meow'}
+    ordered_set &= set(range(9000))
+    assert len(changes) == 3
+    assert changes[0].removed == frozenset(range(5000))
+    assert changes[2].removed == frozenset(range(9000, 10000)) | {'meow'}
+    assert list(ordered_set) == list(range(5000, 9000))
+
+    del changes[:]
+    with ordered_set.batch():
+        ordered_set.add('a')
+        ordered_set.discard('a')
+        ordered_set.discard(5000)
+        ordered_set.add(5000) # Moves it to the end.
+        ordered_set.add('b')
+        assert not changes
+    assert changes == [ChangeSet(frozenset({'b'}), frozenset(),
+                                 frozenset({5000}))]
+    assert list(ordered_set)[-2:] == [5000, 'b']
+
+    del changes[:]
+    with ordered_set.batch():
+        ordered_set.add('c')
+        ordered_set.discard('c')
+    assert not changes
+
+    ordered_set.discard('b')
+    del changes[:]
+    ordered_set.sort()
+    assert list(ordered_set) == list(range(5000, 9000))
+    assert changes == [ChangeSet(frozenset(), frozenset(),
+                                 frozenset(range(5000, 9000)))]
+
+    del changes[:]
+    ordered_set.clear()
+    assert changes == [ChangeSet(frozenset(), frozenset(range(5000, 9000)),
+                                 frozenset())]
+
+    del changes[:]
+    del ordered_set
+    gc_tools.collect()
+    assert not changes
+
+
+def test_weak_key_default_dict():
+    '''Test that `EmittingWeakKeyDefaultDict` emits once per bulk operation.'''
+    emitter, changes = _make_recording_emitter(lambda: wkd_dict)
+    keys = [WeakreffableObject() for _ in range(10)]
+    wkd_dict = EmittingWeakKeyDefaultDict(emitter, lambda: 7,
+                                          {keys[0]: 0})
+    assert not changes
+
+    wkd_dict.update((key, 1) for key in keys)
+    assert changes == [ChangeSet(frozenset(keys[1:]), frozenset(),
+                                 frozenset(keys[:1]))]
+    assert wkd_dict.last_change is None
+
+    del changes[:]
+    wkd_dict[keys[1]] = 2
+    del wkd_dict[keys[2]]
+    assert wkd_dict.pop(keys[3]) == 1
+    assert wkd_dict.pop(keys[3], 'default') == 'default'
+    assert changes == [
+        ChangeSet(frozenset(), frozenset(), frozenset(keys[1:2])),
+        ChangeSet(frozenset(), frozenset(keys[2:3]), frozenset()),
+        ChangeSet(frozenset(), frozenset(keys[3:4]), frozenset()),
+    ]
+
+    del changes[:]
+    new_key = WeakreffableObject()
+    assert wkd_dict[new_key] == 7
+    assert wkd_dict.setdefault(new_key, 8) == 7
+    assert changes == [ChangeSet(frozenset({new_key}), frozenset(),
+                                 frozenset())]
+
+    del changes[:]
+    with wkd_dict.batch():
+        wkd_dict[keys[2]] = 3
+        del wkd_dict[keys[2]]
+        del wkd_dict[keys[4]]
+        wkd_dict[keys[4]] = 4
+        wkd_dict[keys[5]] = 5
+    assert changes == [ChangeSet(frozenset(), frozenset(),
+                                 frozenset(keys[4:6]))]
+
+    del changes[:]
+    remaining_keys = set(wkd_dict.keys())
+    wkd_dict.clear()
+    assert changes == [ChangeSet(frozenset(), frozenset(remaining_keys),
+                                 frozenset())]
+    assert not wkd_dict
@@ -165,4 +165,103 @@ def test_finite_iterator():
 
 def test_immutable_sequence():
     '''Test that `LazyTuple` is considered an immutable sequence.'''
-    assert sequence_tools.is_immutable_sequence(LazyTuple([1, 2, 3]))
\ No newline at end of file
+    assert sequence_tools.is_immutable_sequence(LazyTuple([1, 2, 3]))
+    
+    
+def test_chunk_size():
+    '''Test that `LazyTuple` collects items in chunks of `chunk_size`.'''
+    self_aware_uuid_iterator = SelfAwareUuidIterator()
+    lazy_tuple = LazyTuple(self_aware_uuid_iterator, chunk_size=10)
+    assert lazy_tuple.known_length == 0
+    lazy_tuple[0]
+    assert lazy_tuple.known_length == 10
+    lazy_tuple[9]
+    assert lazy_tuple.known_length == 10
+    lazy_tuple[10]
+    assert lazy_tuple.known_length == 20
+    assert lazy_tuple[:25] == tuple(self_aware_uuid_iterator.data[:25])
+    assert lazy_tuple.known_length == 30
+    
+    lazy_tuple = LazyTuple(iter(range(15)), chunk_size=10)
+    assert lazy_tuple[12] == 12
+    assert lazy_tuple.is_exhausted
+    assert lazy_tuple == tuple(range(15))
+    
+    with cute_testing.RaiseAssertor(ValueError):
+        LazyTuple(iter(range(15)), chunk_size=0)
+        
+        
+def test_prefetch():
+    '''Test that `LazyTuple` prefetches items in a background thread.'''
+    lazy_tuple = LazyTuple(itertools.count(), prefetch=50)
+    assert lazy_tuple.known_length == 0
+    assert lazy_tuple[3] == 3
+    lazy_tuple._prefetch_thread.join()
+    assert lazy_tuple.known_length == 54
+    assert lazy_tuple[:54] == tuple(range(54))
+    
+    def crashing_generator():
+        yield from range(5)
+        raise ZeroDivisionError
+        
+    lazy_tuple = LazyTuple(crashing_generator(), prefetch=10)
+    assert lazy_tuple[0] == 0
+    lazy_tuple._prefetch_thread.join()
+    assert lazy_tuple.known_length == 5
+    assert lazy_tuple[4] == 4
+    with cute_testing.RaiseAssertor(ZeroDivisionError):
+        lazy_tuple[5]
+    
+    
+def test_many_threads():
+    '''Test that many threads reading a `LazyTuple` get consistent results.'''
+    import threading
+    
+    lock = threading.Lock()
+    n_calls = [0]
+    def slow_counting_generator():
+        for i in range(1000):
+            with lock:
+                n_calls[0] += 1
+            yield i
+            
+    for kwargs in ({}, {'chunk_size': 7}, {'prefetch': 30},
+                   {'chunk_size': 7, 'prefetch': 30}):
+        n_calls[0] = 0
+        lazy_tuple = LazyTuple(slow_counting_generator(), **kwargs)
+        results = []
+        def read():
+            results.append(tuple(lazy_tuple))
+        threads = [threading.Thread(target=read) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(results) == 10
+        assert all(result == tuple(range(1000)) for result in results)
+        assert lazy_tuple.collected_data == list(range(1000))
+        assert n_calls[0] == 1000
+        
+        
+def test_producer():
+    '''Test running the iterator in a producer thread or process.'''
+    for producer in ('thread', 'process'):
+        lazy_tuple = LazyTuple(iter(range(100)), producer=producer,
+                               producer_queue_size=10)
+        assert lazy_tuple[5] == 5
+        assert lazy_tuple == tuple(range(100))
+        assert lazy_tuple.is_exhausted
+        
+        @LazyTuple.factory(producer=producer)
+        def crashing_generator():
+            yield from range(3)
+            raise ZeroDivisionError
+        
+        lazy_tuple = crashing_generator()
+        assert lazy_tuple[:3] == (0, 1, 2)
+        with cute_testing.RaiseAssertor(ZeroDivisionError):
+            lazy_tuple[3]
+        assert lazy_tuple.known_length == 3
+        
+    with cute_testing.RaiseAssertor(ValueError):
+        LazyTuple(iter(range(3)), producer='fairy')
@@ -0,0 +1,87 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''Testing module for `python_toolbox.nifty_collections.SpillingLazyTuple`.'''
+
+import itertools
+
+from python_toolbox import cute_testing
+
+from python_toolbox.nifty_collections import (SpillingLazyTuple,
+                                              ForgottenItemError)
+
+
+def test():
+    '''Test that spilled items can still be accessed.'''
+    lazy_tuple = SpillingLazyTuple(itertools.count(), memory_window=10,
+                                   spill_chunk_size=4)
+    assert repr(lazy_tuple) == '<SpillingLazyTuple: (...)>'
+    assert lazy_tuple[100] == 100
+    assert lazy_tuple.known_length == 101
+    assert len(lazy_tuple.collected_data._memory) < 14
+    assert lazy_tuple[3] == 3
+    assert lazy_tuple[97] == 97
+    assert lazy_tuple[:101] == tuple(range(101))
+    assert lazy_tuple[95:5:-7] == tuple(range(95, 5, -7))
+    assert repr(lazy_tuple).startswith('<SpillingLazyTuple: [..., ')
+    assert repr(lazy_tuple).endswith(', 100]...>')
+
+
+def test_finite():
+    '''Test a finite `SpillingLazyTuple`.'''
+    lazy_tuple = SpillingLazyTuple(iter(range(50)), memory_window=5)
+    assert len(lazy_tuple) == 50
+    assert lazy_tuple.is_exhausted
+    assert lazy_tuple == tuple(range(50))
+    assert lazy_tuple[-50] == 0
+    assert list(reversed(lazy_tuple)) == list(range(49, -1, -1))
+    with cute_testing.RaiseAssertor(IndexError):
+        lazy_tuple[50]
+
+    empty_lazy_tuple = SpillingLazyTuple(iter(()))
+    assert not empty_lazy_tuple
+    assert repr(empty_lazy_tuple) == '<SpillingLazyTuple: []>'
+
+    with cute_testing.RaiseAssertor(ValueError):
+        SpillingLazyTuple(iter(()), memory_window=0)
+
+
+def test_struct_format():
+    '''Test spilling items as fixed-width records.'''
+    lazy_tuple = SpillingLazyTuple(iter(range(100)), memory_window=10,
+                                   struct_format='<q')
+    assert lazy_tuple == tuple(range(100))
+    assert lazy_tuple[7] == 7
+
+    lazy_tuple = SpillingLazyTuple(((i, i / 2) for i in range(100)),
+                                   memory_window=10, struct_format='<qd')
+    assert lazy_tuple[1] == (1, 0.5)
+    assert lazy_tuple == tuple((i, i / 2) for i in range(100))
+
+
+def test_forgetting():
+    '''Test forgetting items, explicitly and with `spill=False`.'''
+    lazy_tuple = SpillingLazyTuple(itertools.count(), memory_window=10,
+                                   spill_chunk_size=5)
+    lazy_tuple[50]
+    lazy_tuple.forget_before(20)
+    assert lazy_tuple[20] == 20
+    with cute_testing.RaiseAssertor(ForgottenItemError):
+        lazy_tuple[19]
+    lazy_tuple.forget_before(48)
+    assert lazy_tuple.collected_data._file is None
+    assert lazy_tuple[48:52] == (48, 49, 50, 51)
+    with cute_testing.RaiseAssertor(ForgottenItemError):
+        lazy_tuple[47]
+
+    streaming_lazy_tuple = SpillingLazyTuple(iter(range(100)),
+                                             memory_window=10, spill=False)
+    assert streaming_lazy_tuple[99] == 99
+    assert streaming_lazy_tuple.collected_data._file is None
+    assert streaming_lazy_tuple[-10:] == tuple(range(90, 100))
+    with cute_testing.RaiseAssertor(ForgottenItemError):
+        streaming_lazy_tuple[0]
+
+    already_sequence = SpillingLazyTuple((1, 2, 3))
+    already_sequence.forget_before(2)
+    assert already_sequence[0] == 1
@@ -0,0 +1,65 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''Testing module for `python_toolbox.nifty_collections.SegmentSet`.'''
+
+import random
+
+from python_toolbox import cute_testing
+from python_toolbox import segment_tools
+
+from python_toolbox.nifty_collections import SegmentSet
+
+
+def test():
+    '''Test the basic workings of `SegmentSet`.'''
+    segment_set = SegmentSet([(0, 10), (4, 16)])
+    assert tuple(segment_set) == ((0, 16),)
+    segment_set.add((16, 17))
+    segment_set.add((30, 40))
+    segment_set.add((20, 22))
+    assert tuple(segment_set) == ((0, 17), (20, 22), (30, 40))
+    assert len(segment_set) == 3
+    assert (20, 22) in segment_set
+    assert (20, 21) not in segment_set
+    assert 'meow' not in segment_set
+    assert repr(segment_set) == 'SegmentSet([(0, 17), (20, 22), (30, 40)])'
+    
+    segment_set.add((18, 35))
+    assert tuple(segment_set) == ((0, 17), (18, 40))
+    
+    assert segment_set.covers(0)
+    assert segment_set.covers(17)
+    assert not segment_set.covers(17.5)
+    assert not segment_set.covers(-1)
+    assert not segment_set.covers(41)
+    
+    assert segment_set.overlapping((17, 18)) == ((0, 17), (18, 40))
+    assert segment_set.overlapping((17.2, 17.8)) == ()
+    assert segment_set.overlapping((-5, 1)) == ((0, 17),)
+    assert segment_set.overlapping((50, 60)) == ()
+    
+    segment_set.remove_segment((5, 7))
+    assert tuple(segment_set) == ((0, 5), (7, 17), (18, 40))
+    segment_set.remove_segment((17, 18))
+    assert tuple(segment_set) == ((0, 5), (7, 17), (18, 40))
+    segment_set.remove_segment((3, 30))
+    assert tuple(segment_set) == ((0, 3), (30, 40))
+    segment_set.remove_segment((-10, 100))
+    assert tuple(segment_set) == ()
+    
+    with cute_testing.RaiseAssertor(ValueError):
+        segment_set.add((5, 3))
+        
+        
+def test_random():
+    '''Test that adding segments one by one matches `merge_segments`.'''
+    random_generator = random.Random(0)
+    segments = []
+    segment_set = SegmentSet()
+    for _ in range(300):
+        start = random_generator.randint(0, 1000)
+        segment = (start, start + random_generator.randint(0, 20))
+        segments.append(segment)
+        segment_set.add(segment)
+        assert tuple(segment_set) == segment_tools.merge_segments(segments)
@@ -0,0 +1,61 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''Testing module for `python_toolbox.nifty_collections.TimestampedDict`.'''
+
+import itertools
+
+from python_toolbox import cute_testing
+
+from python_toolbox.nifty_collections import TimestampedDict
+
+
+def test():
+    '''Test the basic workings of `TimestampedDict`.'''
+    timestamped_dict = TimestampedDict()
+    timestamped_dict.set('meow', 1, timestamp=30)
+    timestamped_dict.set('woof', 2, timestamp=10)
+    timestamped_dict.set('frr', 3, timestamp=20)
+    timestamped_dict.set('zzz', 4, timestamp=20)
+    assert list(timestamped_dict) == ['woof', 'frr', 'zzz', 'meow']
+    assert timestamped_dict['frr'] == 3
+    assert timestamped_dict.get_timestamp('frr') == 20
+    assert len(timestamped_dict) == 4
+    assert 'frr' in timestamped_dict
+    assert repr(timestamped_dict) == \
+             "TimestampedDict({'woof': 2, 'frr': 3, 'zzz': 4, 'meow': 1})"
+    
+    assert timestamped_dict.items_in_range(15, 30) == \
+                                          [('frr', 3), ('zzz', 4), ('meow', 1)]
+    assert timestamped_dict.items_in_range(11, 19) == []
+    
+    timestamped_dict.set('woof', 5, timestamp=40)
+    assert list(timestamped_dict) == ['frr', 'zzz', 'meow', 'woof']
+    
+    with cute_testing.RaiseAssertor(TypeError):
+        timestamped_dict['meow'] = 7
+    
+    assert timestamped_dict.pop_until(20) == [('frr', 3), ('zzz', 4)]
+    assert list(timestamped_dict.items()) == [('meow', 1), ('woof', 5)]
+    assert timestamped_dict.pop_until(0) == []
+    
+    del timestamped_dict['meow']
+    assert list(timestamped_dict) == ['woof']
+    with cute_testing.RaiseAssertor(KeyError):
+        del timestamped_dict['meow']
+    timestamped_dict.clear()
+    assert not timestamped_dict
+    
+    
+def test_timestamp_function():
+    '''Test setting items with a `timestamp_function`.'''
+    counter = itertools.count()
+    timestamped_dict = TimestampedDict(timestamp_function=lambda: -next(counter))
+    timestamped_dict['a'] = 1
+    timestamped_dict['b'] = 2
+    timestamped_dict['c'] = 3
+    assert list(timestamped_dict) == ['c', 'b', 'a']
+    assert timestamped_dict.get_timestamp('a') == 0
+    timestamped_dict['a'] = 4
+    assert list(timestamped_dict) == ['a', 'c', 'b']
+    assert timestamped_dict['a'] == 4
@@ -67,4 +67,36 @@ def test():
     assert wkd_dict[weakreffable_object_4] == 222
     
     wkd_dict.update({weakreffable_object_5: 444,})
-    assert wkd_dict[weakreffable_object_5] == 444
\ No newline at end of file
+    assert wkd_dict[weakreffable_object_5] == 444
+    
+    
+def test_key_dying_during_iteration():
+    '''Test that keys dying while iterating are removed after iterating.'''
+    wkd_dict = WeakKeyDefaultDict(default_factory=lambda: 7)
+    keys = [WeakreffableObject() for _ in range(10)]
+    for key in keys:
+        wkd_dict[key]
+    
+    iterator = wkd_dict.iteritems()
+    first_key, _ = next(iterator)
+    survivors = set(keys[:3] + [first_key])
+    del keys, key
+    gc_tools.collect()
+    assert len(wkd_dict) == len(survivors)
+    assert len(wkd_dict.data) == 10
+    list(iterator)
+    assert len(wkd_dict.data) == len(wkd_dict) == len(survivors)
+    
+    
+def test_deepcopy():
+    '''Test that deep-copying keeps the default factory.'''
+    import copy
+    wkd_dict = WeakKeyDefaultDict(default_factory=list)
+    key = WeakreffableObject()
+    wkd_dict[key].append(1)
+    key_copy, wkd_dict_copy = copy.deepcopy((key, wkd_dict))
+    assert wkd_dict_copy.default_factory is list
+    assert list(wkd_dict_copy.keys()) == [key_copy]
+    assert key_copy is not key
+    assert wkd_dict_copy[key_copy] == [1]
+    assert wkd_dict_copy[WeakreffableObject()] == []
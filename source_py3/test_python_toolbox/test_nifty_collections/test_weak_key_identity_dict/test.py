@@ -5,6 +5,7 @@
 
 import nose
 
+from python_toolbox import gc_tools
 from python_toolbox.nifty_collections import WeakKeyIdentityDict
 
 
@@ -31,4 +32,61 @@ def test():
     del wki_dict[my_weakreffable_list]
     assert my_weakreffable_list not in wki_dict
     nose.tools.assert_raises(KeyError,
-                             lambda: wki_dict[my_weakreffable_list])
\ No newline at end of file
+                             lambda: wki_dict[my_weakreffable_list])
+    
+    
+def test_key_dying_during_iteration():
+    '''Test that keys dying while iterating are removed after iterating.'''
+    wki_dict = WeakKeyIdentityDict()
+    keys = [WeakreffableList([i]) for i in range(10)]
+    for i, key in enumerate(keys):
+        wki_dict[key] = i
+    
+    iterator = wki_dict.iteritems()
+    first_key, _ = next(iterator)
+    survivors = {id(key): key for key in keys[:3] + [first_key]}
+    del keys, key
+    gc_tools.collect()
+    assert len(wki_dict) == len(survivors)
+    assert len(wki_dict.data) == 10
+    list(iterator)
+    assert len(wki_dict.data) == len(wki_dict) == len(survivors)
+    
+    
+def test_mutating_during_iteration():
+    '''Test adding and removing keys while keys die during iteration.'''
+    wki_dict = WeakKeyIdentityDict()
+    keys = [WeakreffableList([i]) for i in range(10)]
+    for i, key in enumerate(keys):
+        wki_dict[key] = i
+    del key
+    
+    iterator = wki_dict.iterkeys()
+    first_key = next(iterator)
+    del keys[5:]
+    gc_tools.collect()
+    new_keys = [WeakreffableList([i]) for i in range(10, 15)]
+    for i, new_key in enumerate(new_keys, start=10):
+        wki_dict[new_key] = i
+    del wki_dict[keys[0]]
+    list(iterator)
+    del iterator
+    
+    survivors = {id(key): key for key in [first_key] + keys + new_keys}
+    del survivors[id(keys[0])]
+    assert len(wki_dict) == len(survivors)
+    assert len(list(wki_dict.keys())) == len(survivors)
+    for survivor in survivors.values():
+        assert survivor in wki_dict
+        assert wki_dict[survivor] == survivor[0]
+    assert keys[0] not in wki_dict
+    
+    items_iterator = wki_dict.iteritems()
+    first_item = next(items_iterator)
+    remaining_keys = [key for key in wki_dict.keys()
+                      if key is not first_item[0]]
+    del wki_dict[remaining_keys[0]]
+    rest = list(items_iterator)
+    assert len(rest) == len(remaining_keys) - 1
+    assert all(key is not remaining_keys[0] and value == key[0]
+               for key, value in rest)
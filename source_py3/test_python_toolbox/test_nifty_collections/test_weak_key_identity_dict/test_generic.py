@@ -208,6 +208,9 @@ class MappingTestCase(TestBase):
         # when the iterkeys() loop goes around to try comparing the next
         # key.  After this was fixed, it just deletes the last object *our*
         # "for o in obj" loop would have gotten to.
+        #
+        # `WeakKeyIdentityDict` looks keys up by identity, so it never calls
+        # `C.__eq__`, and all four objects get deleted one by one.
         mutate = True
         count = 0
         for o in objs:
@@ -215,7 +218,7 @@ class MappingTestCase(TestBase):
             del d[o]
         gc_tools.collect()
         self.assertEqual(len(d), 0)
-        self.assertEqual(count, 2)
+        self.assertEqual(count, 4)
 
         
 class WeakKeyIdentityDictTestCase(
@@ -0,0 +1,101 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''Testing module for `python_toolbox.persistent.Library`.'''
+
+import pickle
+
+from python_toolbox import cute_testing
+from python_toolbox import gc_tools
+
+from python_toolbox.persistent import CrossProcessPersistent, Library
+from python_toolbox.persistent import cross_process_persistent
+
+
+def _receive(pickled_thing):
+    '''Unpickle as if in another process that's never seen the object.'''
+    return pickle.loads(pickled_thing)
+
+
+def test_weak():
+    '''Test that the library doesn't keep objects alive.'''
+    library = cross_process_persistent.library
+    gc_tools.collect()
+    thing = CrossProcessPersistent()
+    uuid = thing._CrossProcessPersistent__uuid
+    assert library[uuid] is thing
+    n_objects = library.get_statistics().n_objects
+    del thing
+    gc_tools.collect()
+    assert uuid not in library
+    assert library.get_statistics().n_objects == n_objects - 1
+    
+    
+def test_recent():
+    '''Test the strong tier of recently received objects.'''
+    library = cross_process_persistent.library
+    assert library.recent_size == 0
+    library.reset_statistics()
+    
+    thing = CrossProcessPersistent()
+    pickled_thing = pickle.dumps(thing, protocol=2)
+    assert _receive(pickled_thing) is thing
+    assert library.get_statistics().n_hits == 1
+    # Simulating receiving it in another process, after it died there:
+    del thing
+    gc_tools.collect()
+    received_thing = _receive(pickled_thing)
+    assert library.get_statistics().n_misses == 1
+    del received_thing
+    gc_tools.collect()
+    assert library.get_statistics().n_recent == 0
+    
+    library.recent_size = 2
+    try:
+        received_things_ids = []
+        for _ in range(3):
+            received_thing = _receive(pickled_thing)
+            received_things_ids.append(id(received_thing))
+            del received_thing
+            gc_tools.collect()
+        # It's kept alive by the library now, so it's the same object:
+        assert len(set(received_things_ids)) == 1
+        statistics = library.get_statistics()
+        assert statistics.n_recent == 1
+        assert statistics.n_hits == 3 and statistics.n_misses == 2
+        
+        other_things = [CrossProcessPersistent() for _ in range(2)]
+        for other_thing in _receive(pickle.dumps(other_things, protocol=2)):
+            pass
+        # The first object was pushed out by these two:
+        assert library.get_statistics().n_recent == 2
+        assert library.get_statistics().n_evictions == 1
+        del other_things, other_thing
+        library.recent_size = 1
+        assert library.get_statistics().n_recent == 1
+        assert library.get_statistics().n_evictions == 2
+        
+        with cute_testing.RaiseAssertor(ValueError):
+            library.recent_size = -1
+        with cute_testing.RaiseAssertor(ValueError):
+            Library(recent_size=-1)
+    finally:
+        library.recent_size = 0
+        
+        
+def test_library_mapping():
+    '''Test `Library` as a mapping.'''
+    class Thing:
+        pass
+    library = Library(recent_size=1)
+    thing = Thing()
+    library['a'] = thing
+    assert list(library) == ['a'] and len(library) == 1 and 'a' in library
+    library.add_received('b', Thing())
+    assert 'b' in library
+    assert repr(library) == '<Library: 2 objects, 1 recent>'
+    library.clear_recent()
+    gc_tools.collect()
+    assert 'b' not in library
+    del library['a']
+    assert not library
@@ -4,8 +4,10 @@
 '''Testing module for `python_toolbox.persistent.personality.Personality`.'''
 
 import colorsys
+import pickle
 
-from python_toolbox.persistent import CrossProcessPersistent
+from python_toolbox.persistent import (CrossProcessPersistent, Personality,
+                                      personality_for, personalities_for)
 
 
 def test():
@@ -48,4 +50,41 @@ def test():
            (human_name_3, light_color_3, dark_color_3) != \
            (human_name_1, light_color_1, dark_color_1)
     
-    
\ No newline at end of file
+    
+    
+def test_cached_per_uuid():
+    '''Objects with the same UUID get the same `Personality` object.'''
+    cpp = CrossProcessPersistent()
+    same_cpp = pickle.loads(pickle.dumps(cpp))
+    assert same_cpp is cpp
+    assert personality_for(cpp) is cpp.personality
+    
+    del cpp.personality
+    personality = personality_for(cpp)
+    assert personality is cpp.personality
+    
+    fresh_personality = Personality(cpp)
+    assert fresh_personality is not personality
+    assert (fresh_personality.human_name, fresh_personality.light_color,
+            fresh_personality.dark_color) == \
+           (personality.human_name, personality.light_color,
+            personality.dark_color)
+    
+    
+def test_personalities_for():
+    '''Test getting the personalities of many objects in a batch.'''
+    cpps = [CrossProcessPersistent() for _ in range(50)]
+    old_personality = cpps[3].personality
+    
+    personalities = personalities_for(iter(cpps))
+    assert len(personalities) == 50
+    assert personalities[3] is old_personality
+    for cpp, personality in zip(cpps, personalities):
+        assert cpp.personality is personality
+        expected_personality = Personality(cpp)
+        assert personality.human_name == expected_personality.human_name
+        assert personality.light_color == expected_personality.light_color
+        assert personality.dark_color == expected_personality.dark_color
+        
+    assert personalities_for([]) == []
+    assert personalities_for(cpps[::-1]) == personalities[::-1]
@@ -0,0 +1,85 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''Testing module for `CrossProcessPersistent.shares_memory`.'''
+
+import multiprocessing
+import pickle
+
+import nose
+
+from python_toolbox import gc_tools
+
+from python_toolbox.persistent import CrossProcessPersistent
+from python_toolbox.persistent import shared_memory_transfer
+
+
+class Table(CrossProcessPersistent):
+    '''A cross-process persistent with a big state, in shared memory.'''
+    shares_memory = True
+    
+    def __init__(self, size):
+        self.data = bytearray(range(256)) * (size // 256)
+        self.name = 'meow'
+        
+        
+def _describe_tables(input_queue, output_queue):
+    '''Describe the tables we get, and whether they're ones we've seen.'''
+    tables = []
+    for table in iter(input_queue.get, None):
+        is_known = any(table is known_table for known_table in tables)
+        tables.append(table)
+        output_queue.put((table.name, len(table.data), table.data[:3],
+                          is_known))
+    
+    
+def test_fallback():
+    '''Test that `shares_memory` objects can be pickled in any case.'''
+    table = Table(1024)
+    assert pickle.loads(pickle.dumps(table, protocol=2)) is table
+    assert pickle.loads(pickle.dumps(table, protocol=-1)) is table
+    if not shared_memory_transfer.is_available:
+        assert table.__reduce_ex__(2)[0] is not \
+                                           shared_memory_transfer._reconstruct
+    
+    
+def test_process_passing():
+    '''Test passing a `shares_memory` object to another process.'''
+    if not shared_memory_transfer.is_available:
+        raise nose.SkipTest('Shared memory needs Python 3.8 or upwards.')
+    from multiprocessing import shared_memory
+    
+    table = Table(1024 * 1024)
+    input_queue = multiprocessing.Queue()
+    output_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_describe_tables,
+                                      args=(input_queue, output_queue))
+    process.start()
+    try:
+        input_queue.put(table)
+        assert output_queue.get(timeout=10) == \
+                             ('meow', 1024 * 1024, bytearray(b'\0\1\2'), False)
+        
+        # The second time, only the UUID and the block's name are sent:
+        function, args = table.__reduce_ex__(4)
+        assert function is shared_memory_transfer._reconstruct
+        assert len(pickle.dumps(table, protocol=4)) < 1000
+        input_queue.put(table)
+        assert output_queue.get(timeout=10) == \
+                              ('meow', 1024 * 1024, bytearray(b'\0\1\2'), True)
+    finally:
+        input_queue.put(None)
+        process.join()
+    
+    # The other process is gone, so dropping the last reference unlinks the
+    # block:
+    block_name = args[2]
+    shared_memory.SharedMemory(name=block_name).close()
+    del table, function, args
+    gc_tools.collect()
+    try:
+        shared_memory.SharedMemory(name=block_name)
+    except FileNotFoundError:
+        pass
+    else:
+        raise AssertionError('The shared memory block was not unlinked.')
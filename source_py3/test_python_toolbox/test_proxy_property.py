@@ -85,4 +85,87 @@ def test_dot():
             y = 'y'
             x = ProxyProperty('y')
             
-    
\ No newline at end of file
+                
+            
+def test_subscript():
+    '''Test a `ProxyProperty` whose path isn't just dotted names.'''
+    class A:
+        def __init__(self):
+            self.items = [Object(), Object()]
+            self.items[1].z = 'z'
+        z_proxy = ProxyProperty('.items[1].z')
+        
+    a = A()
+    assert a.z_proxy == 'z'
+    a.z_proxy = 'meow'
+    assert a.items[1].z == 'meow'
+    
+    
+def test_cache_intermediate():
+    '''Test caching the intermediate object of a nested `ProxyProperty`.'''
+    class A:
+        def __init__(self):
+            self.obj = Object()
+            self.obj.inner = Object()
+            self.obj.inner.z = 'z'
+            self.obj.inner.w = 'w'
+        z_proxy = ProxyProperty('.obj.inner.z', cache_intermediate=True)
+        w_proxy = ProxyProperty('.obj.inner.w', cache_intermediate=True)
+        
+    a = A()
+    original_inner = a.obj.inner
+    assert a.z_proxy == 'z'
+    assert a.w_proxy == 'w'
+    
+    # The intermediate object is cached, so replacing it isn't noticed:
+    a.obj.inner = Object()
+    a.obj.inner.z = 'new z'
+    a.obj.inner.w = 'new w'
+    assert a.z_proxy == 'z'
+    assert a.w_proxy == 'w'
+    
+    A.z_proxy.invalidate_cache(a)
+    assert a.z_proxy == 'new z'
+    assert a.w_proxy == 'new w' # The cache is shared.
+    
+    # Setting invalidates the cache:
+    a.obj.inner = original_inner
+    a.w_proxy = 'meow'
+    assert original_inner.w == 'meow'
+    assert a.z_proxy == 'z'
+    
+    
+def test_proxy_attributes():
+    '''Test the `proxy_attributes` class decorator.'''
+    from python_toolbox.misc_tools import proxy_attributes
+    
+    @proxy_attributes('._inner', ('x', 'y', 'upper'))
+    class Wrapper:
+        def __init__(self, inner):
+            self._inner = inner
+        def y(self):
+            return 'my own y'
+    
+    inner = Object()
+    inner.x = 1
+    inner.y = 2
+    inner.upper = lambda: 'UPPER'
+    wrapper = Wrapper(inner)
+    assert isinstance(Wrapper.x, ProxyProperty)
+    assert wrapper.x == 1
+    assert wrapper.y() == 'my own y'
+    assert wrapper.upper() == 'UPPER'
+    wrapper.x = 7
+    assert inner.x == 7
+    
+    @proxy_attributes('.obj', 'a, b', cache_intermediate=True)
+    class Other:
+        def __init__(self):
+            self.obj = Object()
+            self.obj.a = 'a'
+            self.obj.b = 'b'
+    other = Other()
+    assert (other.a, other.b) == ('a', 'b')
+    
+    with cute_testing.RaiseAssertor(Exception):
+        proxy_attributes('_inner', ('x',))
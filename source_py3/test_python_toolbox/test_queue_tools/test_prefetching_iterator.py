@@ -0,0 +1,96 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''Testing module for `queue_tools.PrefetchingIterator`.'''
+
+import gc
+import time
+import itertools
+import threading
+
+from python_toolbox import cute_testing
+
+from python_toolbox import queue_tools
+
+
+def test():
+    '''Test that items are prefetched up to the queue size.'''
+    produced = []
+    def generator():
+        for i in itertools.count():
+            produced.append(i)
+            yield i
+            
+    prefetching_iterator = queue_tools.PrefetchingIterator(generator(),
+                                                           queue_size=5)
+    for _ in range(50):
+        if len(produced) >= 6:
+            break
+        time.sleep(0.01)
+    time.sleep(0.05)
+    # Five items in the queue and one waiting to be put:
+    assert len(produced) == 6
+    assert list(itertools.islice(prefetching_iterator, 10)) == list(range(10))
+    prefetching_iterator.close()
+    assert list(prefetching_iterator) == []
+    
+    
+def test_finite():
+    '''Test a finite iterable, with threads and with processes.'''
+    for use_process in (False, True):
+        prefetching_iterator = queue_tools.PrefetchingIterator(
+            range(300), queue_size=10, use_process=use_process
+        )
+        assert list(prefetching_iterator) == list(range(300))
+        assert prefetching_iterator.is_finished
+        assert list(prefetching_iterator) == []
+    
+    
+def test_exception():
+    '''Test that exceptions are propagated after the items before them.'''
+    def crashing_generator():
+        yield from range(3)
+        raise ZeroDivisionError
+    
+    for use_process in (False, True):
+        prefetching_iterator = queue_tools.PrefetchingIterator(
+            crashing_generator(), use_process=use_process
+        )
+        assert [next(prefetching_iterator) for _ in range(3)] == [0, 1, 2]
+        with cute_testing.RaiseAssertor(ZeroDivisionError):
+            next(prefetching_iterator)
+        assert list(prefetching_iterator) == []
+    
+    
+def test_garbage_collection():
+    '''Test that the producer is stopped when the iterator is collected.'''
+    closed = threading.Event()
+    def generator():
+        try:
+            yield from itertools.count()
+        finally:
+            closed.set()
+    
+    prefetching_iterator = queue_tools.PrefetchingIterator(generator(),
+                                                           queue_size=2)
+    producer = prefetching_iterator._producer
+    assert next(prefetching_iterator) == 0
+    del prefetching_iterator
+    gc.collect()
+    producer.join(timeout=5)
+    assert not producer.is_alive()
+    assert closed.is_set()
+    
+    
+def test_close_process():
+    '''Test that a producer process is dead after `close`.'''
+    items = (bytes(100000) for _ in itertools.count())
+    prefetching_iterator = queue_tools.PrefetchingIterator(
+        items, queue_size=10, use_process=True
+    )
+    producer = prefetching_iterator._producer
+    assert len(next(prefetching_iterator)) == 100000
+    time.sleep(0.5) # Letting the producer fill the queue.
+    prefetching_iterator.close()
+    assert not producer.is_alive()
+    assert list(prefetching_iterator) == []
@@ -1,6 +1,11 @@
 # Copyright 2009-2015 Ram Rachum.
 # This program is distributed under the MIT license.
 
+import threading
+import time
+
+from python_toolbox import cute_testing
+
 from python_toolbox.locking import ReadWriteLock
 
 
@@ -34,4 +39,207 @@ def test():
                                 with read_write_lock.read:
                                     pass
                                 
-    
\ No newline at end of file
+    
+
+def test_release_unheld():
+    '''Test that releasing a lock that isn't held raises `ValueError`.'''
+    read_write_lock = ReadWriteLock()
+    with cute_testing.RaiseAssertor(ValueError):
+        read_write_lock.release()
+    with cute_testing.RaiseAssertor(ValueError):
+        ReadWriteLock(policy='meow')
+
+
+def test_timeout():
+    '''Test that acquiring raises `RuntimeError` when the timeout passes.'''
+    read_write_lock = ReadWriteLock()
+    _run_in_thread(read_write_lock.acquire_write)
+    with cute_testing.RaiseAssertor(RuntimeError):
+        read_write_lock.acquire_read(timeout=0)
+    with cute_testing.RaiseAssertor(RuntimeError):
+        read_write_lock.acquire_read(timeout=0.01)
+    with cute_testing.RaiseAssertor(RuntimeError):
+        read_write_lock.acquire_write(timeout=0.01)
+    assert 'write-locked, 0 waiting' in repr(read_write_lock)
+
+
+def test_upgrade():
+    '''Test upgrading a read lock while another thread reads.'''
+    read_write_lock = ReadWriteLock()
+    release_event = threading.Event()
+    def read_until_released():
+        with read_write_lock.read:
+            release_event.wait()
+    thread = threading.Thread(target=read_until_released)
+    thread.start()
+    _wait_for(lambda: read_write_lock._readers)
+    with read_write_lock.read:
+        with cute_testing.RaiseAssertor(RuntimeError):
+            read_write_lock.acquire_write(timeout=0.01)
+        # After timing out we're still a reader:
+        assert len(read_write_lock._readers) == 2
+        release_event.set()
+        with read_write_lock.write:
+            assert read_write_lock._writer == threading.get_ident()
+        thread.join()
+    assert 'unlocked' in repr(read_write_lock)
+
+
+def test_upgrade_dead_lock():
+    '''Test that a second concurrent upgrade raises `ValueError`.'''
+    read_write_lock = ReadWriteLock()
+    upgrading_event = threading.Event()
+    def read_and_upgrade():
+        with read_write_lock.read:
+            upgrading_event.set()
+            with read_write_lock.write:
+                pass
+    with read_write_lock.read:
+        thread = threading.Thread(target=read_and_upgrade)
+        thread.start()
+        upgrading_event.wait()
+        _wait_for(lambda: read_write_lock._upgrader)
+        with cute_testing.RaiseAssertor(ValueError):
+            read_write_lock.acquire_write()
+    thread.join()
+
+
+def test_writer_fifo():
+    '''Test that waiting writers get the lock in the order they asked.'''
+    read_write_lock = ReadWriteLock()
+    order = []
+    def write(i):
+        with read_write_lock.write:
+            order.append(i)
+    threads = []
+    with read_write_lock.read:
+        for i in range(10):
+            thread = threading.Thread(target=write, args=(i,))
+            thread.start()
+            threads.append(thread)
+            _wait_for(lambda: len(read_write_lock._waiting_writers) == i + 1)
+    for thread in threads:
+        thread.join()
+    assert order == list(range(10))
+
+
+def _check_policy(policy):
+    '''
+    Get who gets the lock after a writer, when a writer and a reader wait.
+
+    The lock is held by a writer, then another writer starts waiting, then a
+    reader. Returns the order in which the waiting writer and reader got it.
+    '''
+    read_write_lock = ReadWriteLock(policy=policy)
+    order = []
+    def write():
+        with read_write_lock.write:
+            order.append('writer')
+    def read():
+        with read_write_lock.read:
+            order.append('reader')
+    with read_write_lock.write:
+        writer_thread = threading.Thread(target=write)
+        writer_thread.start()
+        _wait_for(lambda: read_write_lock._waiting_writers)
+        reader_thread = threading.Thread(target=read)
+        reader_thread.start()
+        _wait_for(lambda: read_write_lock._waiting_readers)
+    writer_thread.join()
+    reader_thread.join()
+    return order
+
+
+def test_policies():
+    '''Test the order in which the policies let waiting threads in.'''
+    assert _check_policy('writers') == ['writer', 'reader']
+    assert _check_policy('fair') == ['reader', 'writer']
+    assert _check_policy('readers') == ['reader', 'writer']
+
+    # With the `'readers'` policy, a new reader doesn't wait for a writer
+    # that waits for other readers:
+    read_write_lock = ReadWriteLock(policy='readers')
+    with read_write_lock.read:
+        writer_thread = threading.Thread(target=read_write_lock.acquire_write)
+        writer_thread.start()
+        _wait_for(lambda: read_write_lock._waiting_writers)
+        read_lock_acquired = []
+        def read():
+            read_write_lock.acquire_read(timeout=0)
+            read_lock_acquired.append(True)
+            read_write_lock.release()
+        _run_in_thread(read)
+        assert read_lock_acquired
+    writer_thread.join()
+
+    # With the others, it does:
+    read_write_lock = ReadWriteLock(policy='fair')
+    with read_write_lock.read:
+        writer_thread = threading.Thread(target=_write_and_release,
+                                         args=(read_write_lock,))
+        writer_thread.start()
+        _wait_for(lambda: read_write_lock._waiting_writers)
+        def read():
+            with cute_testing.RaiseAssertor(RuntimeError):
+                read_write_lock.acquire_read(timeout=0)
+        _run_in_thread(read)
+    writer_thread.join()
+
+
+def test_contention():
+    '''
+    Test many threads reading and writing, checking the lock's invariants.
+
+    Readers must never overlap a writer, and writers must never overlap each
+    other.
+    '''
+    for policy in ReadWriteLock.policies:
+        read_write_lock = ReadWriteLock(policy=policy)
+        state = {'readers': 0, 'writers': 0}
+        state_lock = threading.Lock()
+        errors = []
+        def work(thread_number):
+            for i in range(200):
+                if (i + thread_number) % 8:
+                    with read_write_lock.read:
+                        with state_lock:
+                            state['readers'] += 1
+                            if state['writers']:
+                                errors.append('reader with writer')
+                        with state_lock:
+                            state['readers'] -= 1
+                else:
+                    with read_write_lock.write:
+                        with state_lock:
+                            state['writers'] += 1
+                            if state['writers'] > 1 or state['readers']:
+                                errors.append('writer with others')
+                        with state_lock:
+                            state['writers'] -= 1
+        threads = [threading.Thread(target=work, args=(i,))
+                   for i in range(32)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors
+        assert 'unlocked, 0 waiting' in repr(read_write_lock)
+
+
+def _write_and_release(read_write_lock):
+    with read_write_lock.write:
+        pass
+
+
+def _run_in_thread(function):
+    thread = threading.Thread(target=function)
+    thread.start()
+    thread.join()
+
+
+def _wait_for(condition):
+    for _ in range(1000):
+        if condition():
+            return
+        time.sleep(0.005)
+    raise Exception('Condition was never met.')
@@ -0,0 +1,147 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+import asyncio
+
+from python_toolbox import cute_testing
+
+from python_toolbox.locking import AsyncReadWriteLock
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test():
+    '''Test nesting, upgrading and releasing an `AsyncReadWriteLock`.'''
+    async def f():
+        read_write_lock = AsyncReadWriteLock()
+        async with read_write_lock.read as enter_return_value:
+            assert enter_return_value is read_write_lock
+        async with read_write_lock.read:
+            async with read_write_lock.read:
+                async with read_write_lock.write:
+                    async with read_write_lock.write:
+                        async with read_write_lock.read:
+                            pass
+        assert 'unlocked' in repr(read_write_lock)
+        with cute_testing.RaiseAssertor(ValueError):
+            read_write_lock.release()
+    _run(f())
+
+
+def test_tasks():
+    '''Test that readers share the lock and writers wait for them.'''
+    async def f():
+        read_write_lock = AsyncReadWriteLock()
+        events = []
+        async def read(i):
+            async with read_write_lock.read:
+                events.append(('read', i))
+                await asyncio.sleep(0.01)
+                events.append(('done reading', i))
+        async def write(i):
+            async with read_write_lock.write:
+                events.append(('write', i))
+                await asyncio.sleep(0.01)
+                events.append(('done writing', i))
+        tasks = [asyncio.ensure_future(coroutine) for coroutine in
+                 (read(0), read(1), write(2), write(3), read(4))]
+        await asyncio.wait(tasks)
+        return events
+    events = _run(f())
+    assert events[:4] == [('read', 0), ('read', 1), ('done reading', 0),
+                          ('done reading', 1)]
+    # Writers are FIFO, and with the fair policy the waiting reader goes in
+    # right after the first writer:
+    assert events[4:] == [('write', 2), ('done writing', 2), ('read', 4),
+                          ('done reading', 4), ('write', 3),
+                          ('done writing', 3)]
+
+
+def test_timeout_and_cancel():
+    '''Test timeouts and cancelling a waiting task.'''
+    async def f():
+        read_write_lock = AsyncReadWriteLock()
+        release_event = asyncio.Event()
+        async def write_until_released():
+            async with read_write_lock.write:
+                await release_event.wait()
+        writer = asyncio.ensure_future(write_until_released())
+        await asyncio.sleep(0)
+        with cute_testing.RaiseAssertor(RuntimeError):
+            await read_write_lock.acquire_read(timeout=0)
+        with cute_testing.RaiseAssertor(RuntimeError):
+            await read_write_lock.acquire_write(timeout=0.01)
+
+        waiting_reader = asyncio.ensure_future(read_write_lock.acquire_read())
+        await asyncio.sleep(0)
+        assert '1 waiting' in repr(read_write_lock)
+        waiting_reader.cancel()
+        with cute_testing.RaiseAssertor(asyncio.CancelledError):
+            await waiting_reader
+        assert '0 waiting' in repr(read_write_lock)
+
+        release_event.set()
+        await writer
+        assert 'unlocked' in repr(read_write_lock)
+    _run(f())
+
+
+def test_upgrade():
+    '''Test upgrading, including two tasks upgrading at once.'''
+    async def f():
+        read_write_lock = AsyncReadWriteLock()
+        release_event = asyncio.Event()
+        async def read_and_upgrade():
+            async with read_write_lock.read:
+                await release_event.wait()
+                async with read_write_lock.write:
+                    pass
+        other_task = asyncio.ensure_future(read_and_upgrade())
+        await asyncio.sleep(0)
+        async with read_write_lock.read:
+            release_event.set()
+            await asyncio.sleep(0) # The other task starts upgrading.
+            with cute_testing.RaiseAssertor(ValueError):
+                await read_write_lock.acquire_write()
+        await other_task
+        assert 'unlocked' in repr(read_write_lock)
+    _run(f())
+
+
+def test_cancel_granted_upgrade():
+    '''Test cancelling a task right after its upgrade was granted.'''
+    async def f():
+        read_write_lock = AsyncReadWriteLock()
+        release_event = asyncio.Event()
+        states = []
+        async def read_and_upgrade():
+            async with read_write_lock.read:
+                try:
+                    await read_write_lock.acquire_write()
+                except asyncio.CancelledError:
+                    # Back to being a reader:
+                    states.append(repr(read_write_lock))
+                    await release_event.wait()
+                else:
+                    read_write_lock.release()
+        await read_write_lock.acquire_read()
+        upgrader = asyncio.ensure_future(read_and_upgrade())
+        await asyncio.sleep(0) # The other task starts upgrading.
+        assert '1 waiting' in repr(read_write_lock)
+        read_write_lock.release() # Granting the upgrade...
+        upgrader.cancel() # ...and cancelling before the task resumes.
+        await asyncio.sleep(0)
+        assert len(states) == 1
+        assert 'read-locked by 1 owners' in states[0]
+        async with read_write_lock.read: # Other readers may come in.
+            pass
+        release_event.set()
+        await upgrader
+        assert 'unlocked' in repr(read_write_lock)
+    _run(f())
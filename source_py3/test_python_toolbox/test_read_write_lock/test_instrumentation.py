@@ -0,0 +1,110 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+import threading
+import time
+
+from python_toolbox import cute_testing
+from python_toolbox import temp_file_tools
+
+from python_toolbox.locking import ReadWriteLock, instrumentation
+
+
+def test_enable():
+    '''Test that `ReadWriteLock()` is instrumented only while enabled.'''
+    assert not instrumentation.is_enabled()
+    assert type(ReadWriteLock()) is ReadWriteLock
+    instrumentation.enable()
+    try:
+        assert instrumentation.is_enabled()
+        read_write_lock = ReadWriteLock(name='meow')
+        assert type(read_write_lock) is \
+                                      instrumentation.InstrumentedReadWriteLock
+        assert read_write_lock.name == 'meow'
+        assert read_write_lock in instrumentation.get_instrumented_locks()
+    finally:
+        instrumentation.disable()
+    assert type(ReadWriteLock()) is ReadWriteLock
+
+
+def _hold_write_lock(read_write_lock, holding_event, release_event):
+    with read_write_lock.write:
+        holding_event.set()
+        release_event.wait()
+
+
+def test_statistics():
+    '''Test the statistics that an instrumented lock collects.'''
+    read_write_lock = instrumentation.InstrumentedReadWriteLock(name='woof')
+    with read_write_lock.read:
+        with read_write_lock.write: # Upgrade
+            pass
+    statistics = read_write_lock.statistics
+    assert statistics.wait_times.n == 2
+    assert statistics.hold_times.n == 1
+    assert statistics.n_upgrades == 1
+    assert statistics.n_contended == statistics.n_timeouts == 0
+
+    holding_event = threading.Event()
+    release_event = threading.Event()
+    thread = threading.Thread(
+        target=_hold_write_lock,
+        args=(read_write_lock, holding_event, release_event)
+    )
+    thread.start()
+    holding_event.wait()
+    with cute_testing.RaiseAssertor(RuntimeError):
+        read_write_lock.acquire_read(timeout=0.01)
+    assert statistics.n_timeouts == 1
+    threading.Timer(0.05, release_event.set).start()
+    with read_write_lock.read: # This line waits.
+        pass
+    thread.join()
+
+    assert statistics.n_contended == 2
+    assert statistics.hold_times.n == 3
+    assert statistics.hold_times.max >= 0.04
+    # The `with` waited longer than the acquire that timed out:
+    ((file_name, line_number, function_name), n_waits, wait_time), _ = \
+                                        statistics.get_top_waiting_call_sites()
+    assert file_name == __file__.replace('.pyc', '.py')
+    assert function_name == 'test_statistics'
+    assert n_waits == 1
+    assert wait_time >= 0.04
+    assert 'test_statistics: 1 waits' in statistics.format()
+
+    read_write_lock.reset_statistics()
+    assert read_write_lock.statistics.wait_times.n == 0
+
+
+def test_report():
+    '''Test getting and writing a report of all instrumented locks.'''
+    busy_lock = instrumentation.InstrumentedReadWriteLock(name='busy')
+    idle_lock = instrumentation.InstrumentedReadWriteLock(name='idle')
+    with busy_lock.write:
+        time.sleep(0.01)
+    report = instrumentation.get_report()
+    assert "'busy'" in report and "'idle'" in report
+    assert 'hold times:\n    mean' in report
+    assert 'top waiting call sites:\n    (none)' in report
+
+    with temp_file_tools.create_temp_folder() as temp_folder:
+        path = instrumentation.write_report(temp_folder)
+        assert path.parent == temp_folder
+        assert path.name.endswith('.locks.txt')
+        assert "'busy'" in path.read_text()
+
+    instrumentation.reset()
+    assert busy_lock.statistics.hold_times.n == 0
+
+
+def test_histogram():
+    '''Test `Histogram`'s power-of-2 buckets.'''
+    histogram = instrumentation.Histogram()
+    assert histogram.mean == 0
+    for duration in (0.0000001, 0.000003, 0.000003, 0.5):
+        histogram.add(duration)
+    assert histogram.counts == {0: 1, 2: 2, 19: 1}
+    assert histogram.n == 4
+    assert histogram.max == 0.5
+    assert '<   524.3ms:        1' in histogram.format()
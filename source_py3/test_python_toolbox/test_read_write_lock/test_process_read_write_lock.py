@@ -0,0 +1,90 @@
+# Copyright 2009-2015 Ram Rachum.
+# This program is distributed under the MIT license.
+
+import multiprocessing
+import threading
+
+from python_toolbox import cute_testing
+
+from python_toolbox.locking import ProcessReadWriteLock
+
+
+def test():
+    '''Test nesting, upgrading and releasing a `ProcessReadWriteLock`.'''
+    read_write_lock = ProcessReadWriteLock()
+    with read_write_lock.read as enter_return_value:
+        assert enter_return_value is read_write_lock
+    with read_write_lock.read:
+        with read_write_lock.read:
+            with read_write_lock.write:
+                with read_write_lock.write:
+                    with read_write_lock.read:
+                        pass
+    with read_write_lock.write:
+        with read_write_lock.read:
+            pass
+    assert repr(read_write_lock).startswith(
+        '<ProcessReadWriteLock readers=0, writer=False'
+    )
+    with cute_testing.RaiseAssertor(ValueError):
+        read_write_lock.release()
+    with cute_testing.RaiseAssertor(ValueError):
+        ProcessReadWriteLock(policy='fair')
+
+
+def test_timeout():
+    '''Test that acquiring raises `RuntimeError` when the timeout passes.'''
+    read_write_lock = ProcessReadWriteLock()
+    reading_event = threading.Event()
+    release_event = threading.Event()
+    def read_until_released():
+        with read_write_lock.read:
+            reading_event.set()
+            release_event.wait()
+    with read_write_lock.read:
+        thread = threading.Thread(target=read_until_released)
+        thread.start()
+        reading_event.wait()
+        with cute_testing.RaiseAssertor(RuntimeError):
+            read_write_lock.acquire_write(timeout=0.01)
+        # After a failed upgrade we're still a reader:
+        with read_write_lock.read:
+            pass
+        release_event.set()
+        thread.join()
+
+    with read_write_lock.write:
+        def try_to_read():
+            with cute_testing.RaiseAssertor(RuntimeError):
+                read_write_lock.acquire_read(timeout=0.01)
+        thread = threading.Thread(target=try_to_read)
+        thread.start()
+        thread.join()
+
+
+def _increment(read_write_lock, shared_value, n):
+    for _ in range(n):
+        with read_write_lock.read:
+            old_value = shared_value.value
+        with read_write_lock.write:
+            shared_value.value += 1
+        with read_write_lock.read:
+            assert shared_value.value >= old_value
+
+
+def test_processes():
+    '''Test that writers in different processes exclude each other.'''
+    read_write_lock = ProcessReadWriteLock()
+    shared_value = multiprocessing.Value('l', 0, lock=False)
+    processes = [
+        multiprocessing.Process(target=_increment,
+                                args=(read_write_lock, shared_value, 200))
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    _increment(read_write_lock, shared_value, 200)
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    assert shared_value.value == 1000
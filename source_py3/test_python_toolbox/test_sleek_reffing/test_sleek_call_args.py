@@ -62,4 +62,75 @@ def test_unhashable():
     gc_tools.collect()
     # Not GCed because all objects in `kwargs` are not weakreffable:
     assert len(sca_dict) == 1
-    
\ No newline at end of file
+        
+    
+def g(a, b=2, *args, **kwargs): pass
+
+
+def test_args():
+    '''Test the `args`, `star_args` and `star_kwargs` of `SleekCallArgs`.'''
+    sca_dict = {}
+    a = A()
+    sca = SleekCallArgs(sca_dict, g, a, 3, 4, [5], y=6, x=7)
+    assert sca.args == {'a': a, 'b': 3}
+    assert sca.star_args == (4, [5])
+    assert sca.star_kwargs == {'x': 7, 'y': 6}
+    
+    sca = SleekCallArgs(sca_dict, g, b=3, a=a)
+    assert sca.args == {'a': a, 'b': 3}
+    assert sca.star_args == ()
+    assert sca.star_kwargs == {}
+    
+    assert not hasattr(sca, '__dict__')
+    assert not hasattr(SleekRef(a), '__dict__')
+    
+    
+def test_equality():
+    '''Test that equal call args are equal, however they're passed.'''
+    sca_dict = {}
+    a = A()
+    sca = SleekCallArgs(sca_dict, g, a, 2, x=[1])
+    equal_scas = [
+        SleekCallArgs(sca_dict, g, a, x=[1]),
+        SleekCallArgs(sca_dict, g, b=2, a=a, x=[1]),
+    ]
+    for equal_sca in equal_scas:
+        assert sca == equal_sca
+        assert hash(sca) == hash(equal_sca)
+    different_scas = [
+        SleekCallArgs(sca_dict, g, a, 3, x=[1]),
+        SleekCallArgs(sca_dict, g, a, x=[2]),
+        SleekCallArgs(sca_dict, g, a, y=[1]),
+        SleekCallArgs(sca_dict, g, a, 2, [1]),
+        SleekCallArgs(sca_dict, g, A(), x=[1]),
+        SleekCallArgs(sca_dict, f, a, 2, x=[1]),
+    ]
+    for different_sca in different_scas:
+        assert sca != different_sca
+    assert sca != 7
+    
+    
+def test_dead_arg():
+    '''Test that a `SleekCallArgs` with a dead argument equals nothing.'''
+    sca_dict = {}
+    a = A()
+    sca = SleekCallArgs(sca_dict, g, a)
+    other_sca = SleekCallArgs(sca_dict, g, a)
+    sca_dict[sca] = 'meow'
+    assert sca == other_sca
+    del a
+    gc_tools.collect()
+    assert not sca_dict
+    assert sca != other_sca
+    
+    
+def test_keyword_only():
+    '''Test `SleekCallArgs` on a function with keyword-only arguments.'''
+    def h(a, *, b=2, c):
+        pass
+    sca_dict = {}
+    a = A()
+    sca = SleekCallArgs(sca_dict, h, a, c=3)
+    assert sca.args == {'a': a, 'b': 2, 'c': 3}
+    assert sca == SleekCallArgs(sca_dict, h, c=3, b=2, a=a)
+    assert sca != SleekCallArgs(sca_dict, h, a, b=3, c=3)